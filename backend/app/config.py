@@ -5,7 +5,7 @@ from dotenv import load_dotenv
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 
-from sentence_transformers import SentenceTransformer
+from app.utils.model_registry import ModelRegistry
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -16,6 +16,36 @@ class QdrantCollection(Enum):
     EMPLOYERS = "employers"
 
 
+class MatchMode(Enum):
+    CLIENT = "client"  # N поисков по векторам, агрегация в приложении
+    # Один запрос с prefetch, RRF и group_by в Qdrant. score ранговый,
+    # поэтому режим только для сравнения выдачи и в matches не сохраняется
+    SERVER = "server"
+
+
+class SearchCacheBackend(Enum):
+    MEMORY = "memory"  # LRU в памяти процесса, инвалидация видна только ему
+    SQLITE = "sqlite"  # общий для воркеров файл
+
+
+class QuantizationMode(Enum):
+    NONE = "none"
+    SCALAR = "scalar"  # int8, в 4 раза меньше памяти
+    BINARY = "binary"  # 1 бит на измерение, в 32 раза меньше памяти
+
+
+class MatchEventType(Enum):
+    UPSERTED = "upserted"
+    DELETED = "deleted"
+
+
+class VectorizationJobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class MembersDataType(Enum):
     CANDIDATE = "candidate"
     EMPLOYER = "employer"
@@ -26,8 +56,8 @@ class MembersDataType(Enum):
     SUMMARY = "summary_norm"
 
 
-SOFT_MODEL = SentenceTransformer("ai-forever/ru-en-RoSBERTa")
-HARD_MODEL = SentenceTransformer("sentence-transformers/multi-qa-MiniLM-L6-cos-v1")
+SOFT_MODEL_NAME = "ai-forever/ru-en-RoSBERTa"
+HARD_MODEL_NAME = "sentence-transformers/multi-qa-MiniLM-L6-cos-v1"
 
 
 class Settings(BaseSettings):
@@ -42,12 +72,67 @@ class Settings(BaseSettings):
 
     # Qdrant
     QDRANT_URL: str = "http://localhost:6333"
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_POOL_SIZE: int = 20  # соединений в пуле общего клиента
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100
+    QDRANT_INDEXING_THRESHOLD: int = 20_000  # KB, меньшие сегменты ищутся перебором
+    # Квантизация и хранение оригиналов векторов на диске, по именованным векторам
+    QDRANT_SOFT_QUANTIZATION: QuantizationMode = QuantizationMode.NONE
+    QDRANT_HARD_QUANTIZATION: QuantizationMode = QuantizationMode.NONE
+    QDRANT_SOFT_ON_DISK: bool = False
+    QDRANT_HARD_ON_DISK: bool = False
+    QDRANT_QUANTIZATION_RESCORE: bool = True  # пересчет score по оригиналам
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 2.0
 
     # Auth
     SECRET_KEY: str = ""
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: float = 30.0
 
+    # Embeddings
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "embedding_cache.sqlite3"  # пусто - только память
+    EMBEDDING_CACHE_SIZE: int = 50_000
+    EMBEDDING_STUB: bool = False  # детерминированный энкодер без загрузки моделей
+    EMBEDDING_WARMUP: bool = True  # загрузить модели при старте приложения
+    EMBEDDING_WORKERS: int = 2  # потоки пула векторизации
+    EMBEDDING_TORCH_THREADS: int = 0  # 0 - значение torch по умолчанию
+    EMBEDDING_COALESCE_MAX_BATCH: int = 64  # максимум текстов в батче запросов
+    EMBEDDING_COALESCE_MAX_WAIT_MS: float = 5.0  # ожидание соседних запросов
+
+    # Списки матчей /matches/*
+    MATCH_PAGE_SIZE: int = 50  # матчей на странице по умолчанию
+    MATCH_MAX_PAGE_SIZE: int = 200
+
+    # Поиск резюме/вакансий
+    SEARCH_PAGE_SIZE: int = 100  # результатов на странице по умолчанию
+    SEARCH_MAX_PAGE_SIZE: int = 500
+    SEARCH_MAX_RESULTS: int = 500  # вакансий/резюме в полном наборе выдачи
+    SEARCH_PREFETCH_LIMIT: int = 1000  # точек в каждом из hard/soft поисков
+    SEARCH_RESULT_CACHE_TTL: float = 300.0  # секунд жизни набора для курсоров
+    SEARCH_RESULT_CACHE_SIZE: int = 256  # наборов в памяти процесса
+    SEARCH_CACHE_ENABLED: bool = True  # кэш выдачи по нормализованному запросу
+    SEARCH_CACHE_BACKEND: SearchCacheBackend = SearchCacheBackend.MEMORY
+    SEARCH_CACHE_PATH: str = "search_cache.sqlite3"
+    SEARCH_CACHE_TTL: float = 60.0
+    SEARCH_CACHE_SIZE: int = 1024
+
+    # Фоновая векторизация резюме/вакансий
+    VECTORIZATION_WORKER_ENABLED: bool = True
+    VECTORIZATION_BATCH_SIZE: int = 32  # задач в одном батче векторизации
+    VECTORIZATION_POLL_INTERVAL: float = 1.0  # секунд между опросами очереди
+    VECTORIZATION_MAX_ATTEMPTS: int = 3
+    VECTORIZATION_JOB_TIMEOUT: int = (
+        300  # через сколько секунд зависшая задача снова в очереди
+    )
+
+    # Инкрементальное обновление матчей
+    MATCH_EVENTS_ENABLED: bool = True
+    MATCH_EVENTS_QUEUE_SIZE: int = 10_000
+    MATCH_EVENTS_WORKERS: int = 2
+    MATCH_REVERSE_TOP_K: int = 50  # кандидатов на обратное обновление
+
     model_config = ConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -57,3 +142,17 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
+
+# Модели загружаются при первом обращении
+model_registry = ModelRegistry(use_stub=settings.EMBEDDING_STUB)
+model_registry.register(SOFT_MODEL_NAME, dimension=1024)
+model_registry.register(HARD_MODEL_NAME, dimension=384)
+
+
+def __getattr__(name: str):
+    """Ленивый доступ к config.SOFT_MODEL / config.HARD_MODEL"""
+    if name == "SOFT_MODEL":
+        return model_registry.get(SOFT_MODEL_NAME)
+    if name == "HARD_MODEL":
+        return model_registry.get(HARD_MODEL_NAME)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
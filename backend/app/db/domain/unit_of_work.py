@@ -10,6 +10,7 @@ from app.db.infrastructure.repositories import (
     VacancySkillRepository,
     MatchRepository,
     UserRepository,
+    VectorizationJobRepository,
 )
 
 
@@ -25,6 +26,7 @@ class UnitOfWork:
         self.vacancy_skills = VacancySkillRepository(session)
         self.matches = MatchRepository(session)
         self.user = UserRepository(session)
+        self.vectorization_jobs = VectorizationJobRepository(session)
 
     @asynccontextmanager
     async def transaction(self):
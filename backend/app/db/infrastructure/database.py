@@ -4,10 +4,8 @@ from typing import Any
 
 from dotenv import load_dotenv
 from numpy import ndarray
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http.models import (
-    VectorParams,
-    Distance,
     PointStruct,
     Record,
     models,
@@ -17,7 +15,9 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, Asyn
 from sympy.tensor.tensor import Tensor
 
 
-from app.config import MembersDataType, QdrantCollection
+from app.config import MembersDataType, QdrantCollection, settings
+from app.db.infrastructure.qdrant_schema import collection_schemas, reconcile_collection
+from app.utils.filter.search_cache import search_cache
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -60,17 +60,13 @@ class QdrantAPI:
             raise ValueError(e)
 
     def create_collection(self, collection_name: str) -> bool:
-        """Создание коллекции"""
+        """Создание коллекции по схеме (без payload-индексов, см. qdrant_schema)"""
+        schema = collection_schemas()[QdrantCollection(collection_name)]
         return self.client.create_collection(
             collection_name=collection_name,
-            vectors_config={
-                MembersDataType.HARD_SKILL.value: VectorParams(
-                    size=384, distance=Distance.COSINE
-                ),
-                MembersDataType.SOFT_SKILL.value: VectorParams(
-                    size=1024, distance=Distance.COSINE
-                ),
-            },
+            vectors_config=schema.vectors,
+            hnsw_config=schema.hnsw_config,
+            optimizers_config=schema.optimizers_config,
         )
 
     def add_vectors(self, collection_name: str, vectors: list[PointStruct]):
@@ -80,6 +76,7 @@ class QdrantAPI:
             wait=True,
             points=vectors,
         )
+        search_cache.invalidate(collection_name)
 
     def search(
         self,
@@ -175,6 +172,182 @@ class QdrantAPI:
             collection_name=collection_name,
             points_selector=models.FilterSelector(filter=models.Filter(must=must)),
         )
+        search_cache.invalidate(collection_name)
 
 
 qdrant_api = QdrantAPI()
+
+
+def _match_filter(conditions: dict) -> Filter:
+    """Фильтр Qdrant из пар поле=значение"""
+    return Filter(
+        must=[
+            models.FieldCondition(key=key, match=models.MatchValue(value=value))
+            for key, value in conditions.items()
+        ]
+    )
+
+
+class AsyncQdrantAPI:
+    """
+    Асинхронный доступ к Qdrant.
+
+    Один экземпляр на приложение: клиент держит пул соединений
+    (HTTP или gRPC) и переиспользуется всеми запросами.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        prefer_grpc: bool = False,
+        pool_size: int | None = None,
+    ):
+        try:
+            self.client = AsyncQdrantClient(
+                url=url, prefer_grpc=prefer_grpc, pool_size=pool_size
+            )
+        except Exception as e:
+            logger.error(f"Ошибка подключения к Qdrant: {e}")
+            raise ValueError(e)
+
+    async def create_collection(self, collection_name: str):
+        """Создание коллекции по схеме вместе с payload-индексами"""
+        await reconcile_collection(
+            self.client, collection_schemas()[QdrantCollection(collection_name)]
+        )
+
+    async def add_vectors(self, collection_name: str, vectors: list[PointStruct]):
+        """Добавить вектор в БД"""
+        await self.client.upsert(
+            collection_name=collection_name,
+            wait=True,
+            points=vectors,
+        )
+        await search_cache.ainvalidate(collection_name)
+
+    async def scroll(
+        self, collection_name: str, limit: int, **kwargs
+    ) -> tuple[list[Record], int | str | None | Any]:
+        """Скролл по коллекции"""
+        return await self.client.scroll(
+            collection_name=collection_name,
+            scroll_filter=_match_filter(kwargs),
+            limit=limit,
+            with_payload=True,
+            with_vectors=True,
+        )
+
+    async def retrieve(
+        self, collection_name: str, member_uuid: list[int | str]
+    ) -> list[Record]:
+        """Получить записи по uuid"""
+        return await self.client.retrieve(
+            collection_name=collection_name, ids=member_uuid, with_vectors=True
+        )
+
+    async def entity_payloads(
+        self, collection_name: str, page_size: int = 256, **conditions
+    ) -> dict[str, dict]:
+        """payload всех точек, подходящих под условия, по id точки (без векторов)"""
+        payloads: dict[str, dict] = {}
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=_match_filter(conditions),
+                limit=page_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            for record in records:
+                payloads[str(record.id)] = record.payload or {}
+            if offset is None:
+                return payloads
+
+    async def scroll_all(
+        self,
+        collection_name: str,
+        scroll_filter: Filter | None,
+        with_payload: bool | models.PayloadSelector = True,
+        with_vectors: bool | list[str] = False,
+        page_size: int = 256,
+    ) -> list[Record]:
+        """Все точки под фильтром, постранично (без ограничения в одну страницу)"""
+        points: list[Record] = []
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=scroll_filter,
+                limit=page_size,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=with_vectors,
+            )
+            points.extend(records)
+            if offset is None:
+                return points
+
+    async def overwrite_payloads(self, collection_name: str, payloads: dict[str, dict]):
+        """Заменить payload точек одним запросом, не трогая векторы"""
+        await self.client.batch_update_points(
+            collection_name=collection_name,
+            update_operations=[
+                models.OverwritePayloadOperation(
+                    overwrite_payload=models.SetPayload(payload=payload, points=[id_])
+                )
+                for id_, payload in payloads.items()
+            ],
+            wait=True,
+        )
+        await search_cache.ainvalidate(collection_name)
+
+    async def delete_points(self, collection_name: str, ids: list[str]):
+        """Удаление точек по id"""
+        points: list[models.ExtendedPointId] = list(ids)
+        await self.client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=points),
+        )
+        await search_cache.ainvalidate(collection_name)
+
+    async def remove_employer_skills(self, employer_id: int, vacancy_id: int):
+        """Удаление навыков работодателя"""
+        await self._remove_points(
+            collection_name=QdrantCollection.EMPLOYERS.value,
+            employer_id=employer_id,
+            vacancy_id=vacancy_id,
+        )
+
+    async def remove_candidate_skills(self, candidate_id: int, resume_id: int):
+        """Удаление навыков кандидата"""
+        await self._remove_points(
+            collection_name=QdrantCollection.CANDIDATES.value,
+            user_id=candidate_id,
+            resume_id=resume_id,
+        )
+
+    async def _remove_points(self, collection_name: str, **kwargs):
+        """Удаление записей (soft и hard) по условию"""
+        await self.client.delete(
+            collection_name=collection_name,
+            points_selector=models.FilterSelector(filter=_match_filter(kwargs)),
+        )
+        await search_cache.ainvalidate(collection_name)
+
+    async def close(self):
+        """Закрыть соединения"""
+        await self.client.close()
+
+
+async_qdrant_api = AsyncQdrantAPI(
+    url=QDRANT_URL,
+    prefer_grpc=settings.QDRANT_PREFER_GRPC,
+    pool_size=settings.QDRANT_POOL_SIZE,
+)
+
+
+def get_qdrant_api() -> AsyncQdrantAPI:
+    """Dependency для получения общего клиента Qdrant"""
+    return async_qdrant_api
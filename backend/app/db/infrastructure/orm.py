@@ -10,6 +10,8 @@ from sqlalchemy import (
     Float,
     DateTime,
     Boolean,
+    Index,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import DeclarativeBase, relationship
 
@@ -54,7 +56,9 @@ class CandidateORM(Base):
 class ResumeORM(Base):
     __tablename__ = "resumes"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"))
+    candidate_id = Column(
+        Integer, ForeignKey("candidates.id", ondelete="CASCADE"), index=True
+    )
     title = Column(String(100), nullable=False)  # например "Backend Developer"
     summary = Column(Text, nullable=True)  # soft skills описание
     experience_age = Column(Integer, nullable=True)
@@ -74,7 +78,9 @@ class ResumeORM(Base):
 class ResumeSkillORM(Base):
     __tablename__ = "resume_skills"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"))
+    resume_id = Column(
+        Integer, ForeignKey("resumes.id", ondelete="CASCADE"), index=True
+    )
     skill_name = Column(String(50), nullable=False)
     experience_age = Column(Integer, nullable=True)
     description = Column(Text, nullable=True)  # что делал с этим навыком
@@ -104,7 +110,9 @@ class EmployerORM(Base):
 class VacancyORM(Base):
     __tablename__ = "vacancies"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    employer_id = Column(Integer, ForeignKey("employers.id", ondelete="CASCADE"))
+    employer_id = Column(
+        Integer, ForeignKey("employers.id", ondelete="CASCADE"), index=True
+    )
     title = Column(String(100), nullable=False)  # например "Middle Python Developer"
     summary = Column(Text, nullable=True)  # soft skills / культура / команда
     experience_age_from = Column(Integer, nullable=True)
@@ -125,7 +133,9 @@ class VacancyORM(Base):
 class VacancySkillORM(Base):
     __tablename__ = "vacancy_skills"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    vacancy_id = Column(Integer, ForeignKey("vacancies.id", ondelete="CASCADE"))
+    vacancy_id = Column(
+        Integer, ForeignKey("vacancies.id", ondelete="CASCADE"), index=True
+    )
     skill_name = Column(String(50), nullable=False)
     experience_age = Column(Integer, nullable=True)
     description = Column(Text, nullable=True)  # Будут отображены кандидатам
@@ -136,6 +146,12 @@ class VacancySkillORM(Base):
 
 class MatchORM(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        UniqueConstraint("resume_id", "vacancy_id", name="uq_matches_resume_vacancy"),
+        # Списки матчей резюме/вакансии по убыванию score
+        Index("ix_matches_resume_id_score", "resume_id", "score"),
+        Index("ix_matches_vacancy_id_score", "vacancy_id", "score"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"))
     vacancy_id = Column(Integer, ForeignKey("vacancies.id", ondelete="CASCADE"))
@@ -159,3 +175,17 @@ class FavoriteVacancyORM(Base):
     user_id = Column(Integer, ForeignKey("candidates.id"))
     vacancy_id = Column(Integer, ForeignKey("vacancies.id"))
     created_at = Column(DateTime, default=datetime.now())
+
+
+class VectorizationJobORM(Base):
+    __tablename__ = "vectorization_jobs"
+    __table_args__ = (Index("ix_vectorization_jobs_status_id", "status", "id"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    collection = Column(String(20), nullable=False)  # candidates / employers
+    owner_id = Column(Integer, nullable=False)  # кандидат / работодатель
+    entity_id = Column(Integer, nullable=False)  # резюме / вакансия
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
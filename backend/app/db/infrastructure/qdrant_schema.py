@@ -0,0 +1,292 @@
+# Схема коллекций Qdrant: векторы, payload-индексы, настройки HNSW
+import asyncio
+import logging
+import re
+from dataclasses import dataclass, field
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    PayloadIndexInfo,
+    PayloadSchemaType,
+    QuantizationConfig,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    TextIndexParams,
+    TextIndexType,
+    TokenizerType,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+from app import config
+from app.config import MembersDataType, QdrantCollection, QuantizationMode, settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Полнотекстовый индекс для MatchText по нормализованным текстам.
+# Токены - по пробелам: WORD отбрасывает пунктуацию, и "c++", "c#" стали бы "c".
+# Пунктуацию между словами убирает normalize_index_text - и в payload, и в запросе
+TEXT_INDEX = TextIndexParams(
+    type=TextIndexType.TEXT,
+    tokenizer=TokenizerType.WHITESPACE,
+    lowercase=True,
+    min_token_len=1,
+)
+
+# Слово - буквы и цифры вместе с "+", "#" и "." (c++, c#, .net, node.js, 3.11)
+_INDEX_TOKEN = re.compile(r"[\w+#.]+")
+
+
+def normalize_index_text(text: str) -> str:
+    """
+    Текст для полей с TEXT_INDEX: нижний регистр, слова через пробел.
+
+    Запятые, скобки, "/" и прочие разделители заменяются пробелами, точка
+    в конце слова отбрасывается: "Python/Django, C++." -> "python django c++"
+    """
+    tokens = (token.rstrip(".") for token in _INDEX_TOKEN.findall(text.lower()))
+    return " ".join(token for token in tokens if token)
+
+
+PayloadIndex = PayloadSchemaType | TextIndexParams
+
+
+@dataclass
+class CollectionSchema:
+    """Желаемое состояние коллекции"""
+
+    name: str
+    vectors: dict[str, VectorParams]
+    payload_indexes: dict[str, PayloadIndex] = field(default_factory=dict)
+    hnsw_config: HnswConfigDiff | None = None
+    optimizers_config: OptimizersConfigDiff | None = None
+
+
+def vector_storage(vector_name: str) -> tuple[QuantizationMode, bool]:
+    """Режим квантизации и хранение оригиналов на диске для именованного вектора"""
+    if vector_name == MembersDataType.SOFT_SKILL.value:
+        return settings.QDRANT_SOFT_QUANTIZATION, settings.QDRANT_SOFT_ON_DISK
+    return settings.QDRANT_HARD_QUANTIZATION, settings.QDRANT_HARD_ON_DISK
+
+
+def quantization_config(mode: QuantizationMode) -> QuantizationConfig | None:
+    """Квантизованные векторы всегда держим в RAM, оригиналы - по on_disk"""
+    match mode:
+        case QuantizationMode.SCALAR:
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        case QuantizationMode.BINARY:
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def search_params(vector_name: str) -> SearchParams | None:
+    """Параметры поиска по вектору: rescoring по оригиналам при квантизации"""
+    mode, _ = vector_storage(vector_name)
+    if mode is QuantizationMode.NONE:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+            oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+        )
+    )
+
+
+def _vector_params(model_name: str, vector_name: str) -> VectorParams:
+    mode, on_disk = vector_storage(vector_name)
+    return VectorParams(
+        size=config.model_registry.dimension(model_name),
+        distance=Distance.COSINE,
+        on_disk=on_disk,
+        quantization_config=quantization_config(mode),
+    )
+
+
+def _vectors() -> dict[str, VectorParams]:
+    return {
+        MembersDataType.HARD_SKILL.value: _vector_params(
+            config.HARD_MODEL_NAME, MembersDataType.HARD_SKILL.value
+        ),
+        MembersDataType.SOFT_SKILL.value: _vector_params(
+            config.SOFT_MODEL_NAME, MembersDataType.SOFT_SKILL.value
+        ),
+    }
+
+
+def _hnsw_config() -> HnswConfigDiff:
+    return HnswConfigDiff(
+        m=settings.QDRANT_HNSW_M,
+        ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+        # Дополнительные связи графа внутри групп payload - для поиска с фильтрами
+        payload_m=settings.QDRANT_HNSW_M,
+    )
+
+
+def _optimizers_config() -> OptimizersConfigDiff:
+    return OptimizersConfigDiff(
+        indexing_threshold=settings.QDRANT_INDEXING_THRESHOLD,
+    )
+
+
+# Поля, по которым строятся фильтры в QdrantFilterBuilder, матчинге и удалении
+COMMON_INDEXES: dict[str, PayloadIndex] = {
+    "type": PayloadSchemaType.KEYWORD,
+    "location": PayloadSchemaType.KEYWORD,
+    "employment_type_norm": PayloadSchemaType.KEYWORD,
+    "skill_name_norm": TEXT_INDEX,
+    "summary_norm": TEXT_INDEX,
+    "description_norm": TEXT_INDEX,
+    "experience_age": PayloadSchemaType.INTEGER,
+    "salary_from": PayloadSchemaType.INTEGER,
+    "salary_to": PayloadSchemaType.INTEGER,
+}
+
+
+def collection_schemas() -> dict[QdrantCollection, CollectionSchema]:
+    """Схемы всех коллекций"""
+    return {
+        QdrantCollection.CANDIDATES: CollectionSchema(
+            name=QdrantCollection.CANDIDATES.value,
+            vectors=_vectors(),
+            payload_indexes={
+                **COMMON_INDEXES,
+                "user_id": PayloadSchemaType.INTEGER,
+                "resume_id": PayloadSchemaType.INTEGER,
+                "status": PayloadSchemaType.KEYWORD,
+                "age": PayloadSchemaType.INTEGER,
+            },
+            hnsw_config=_hnsw_config(),
+            optimizers_config=_optimizers_config(),
+        ),
+        QdrantCollection.EMPLOYERS: CollectionSchema(
+            name=QdrantCollection.EMPLOYERS.value,
+            vectors=_vectors(),
+            payload_indexes={
+                **COMMON_INDEXES,
+                "employer_id": PayloadSchemaType.INTEGER,
+                "vacancy_id": PayloadSchemaType.INTEGER,
+                "work_mode": PayloadSchemaType.KEYWORD,
+                "experience_age_from": PayloadSchemaType.INTEGER,
+                "experience_age_to": PayloadSchemaType.INTEGER,
+                "description_hidden_norm": TEXT_INDEX,
+            },
+            hnsw_config=_hnsw_config(),
+            optimizers_config=_optimizers_config(),
+        ),
+    }
+
+
+def _index_type(index: PayloadIndex) -> PayloadSchemaType:
+    if isinstance(index, TextIndexParams):
+        return PayloadSchemaType.TEXT
+    return index
+
+
+def _index_matches(current: PayloadIndexInfo, index: PayloadIndex) -> bool:
+    """Совпадает ли индекс в коллекции со схемой: тип, а для текста - токенизатор"""
+    if current.data_type != _index_type(index):
+        return False
+    if isinstance(index, TextIndexParams):
+        params = current.params
+        return (
+            isinstance(params, TextIndexParams) and params.tokenizer == index.tokenizer
+        )
+    return True
+
+
+async def reconcile_collection(client: AsyncQdrantClient, schema: CollectionSchema):
+    """
+    Привести коллекцию к схеме.
+
+    Отсутствующая коллекция создается, у существующей обновляются
+    настройки HNSW/оптимизатора, квантизация и on_disk векторов,
+    создаются недостающие payload-индексы.
+    Индекс с другим типом или токенизатором пересоздается. Размерность векторов не меняется -
+    расхождение только логируется, т.к. требует переиндексации данных.
+    """
+    if not await client.collection_exists(schema.name):
+        await client.create_collection(
+            collection_name=schema.name,
+            vectors_config=schema.vectors,
+            hnsw_config=schema.hnsw_config,
+            optimizers_config=schema.optimizers_config,
+        )
+        logger.info(f"Коллекция {schema.name} создана")
+        existing_indexes: dict[str, PayloadIndexInfo] = {}
+    else:
+        info = await client.get_collection(schema.name)
+
+        vectors = info.config.params.vectors
+        vectors_diff: dict[str, VectorParamsDiff] = {}
+        if isinstance(vectors, dict):
+            for name, params in schema.vectors.items():
+                current_params = vectors.get(name)
+                if current_params is None or current_params.size != params.size:
+                    logger.error(
+                        f"Коллекция {schema.name}: вектор {name} не совпадает со схемой"
+                    )
+                    continue
+                if bool(current_params.on_disk) != bool(params.on_disk) or type(
+                    current_params.quantization_config
+                ) is not type(params.quantization_config):
+                    vectors_diff[name] = VectorParamsDiff(
+                        on_disk=params.on_disk,
+                        quantization_config=params.quantization_config
+                        or Disabled.DISABLED,
+                    )
+
+        await client.update_collection(
+            collection_name=schema.name,
+            vectors_config=vectors_diff or None,
+            hnsw_config=schema.hnsw_config,
+            optimizers_config=schema.optimizers_config,
+        )
+        for name in vectors_diff:
+            logger.info(f"Коллекция {schema.name}: обновлено хранение вектора {name}")
+        existing_indexes = info.payload_schema or {}
+
+    for field_name, index in schema.payload_indexes.items():
+        current = existing_indexes.get(field_name)
+        if current is not None and _index_matches(current, index):
+            continue
+        if current is not None:
+            await client.delete_payload_index(schema.name, field_name, wait=True)
+        await client.create_payload_index(
+            collection_name=schema.name,
+            field_name=field_name,
+            field_schema=index,
+            wait=True,
+        )
+        logger.info(f"Коллекция {schema.name}: создан индекс {field_name}")
+
+
+async def reconcile_collections(client: AsyncQdrantClient):
+    """Привести все коллекции к схеме (при старте приложения)"""
+    for schema in collection_schemas().values():
+        await reconcile_collection(client, schema)
+
+
+if __name__ == "__main__":
+    # Использование: python -m app.db.infrastructure.qdrant_schema
+    async def main():
+        client = AsyncQdrantClient(url=settings.QDRANT_URL)
+        try:
+            await reconcile_collections(client)
+        finally:
+            await client.close()
+
+    asyncio.run(main())
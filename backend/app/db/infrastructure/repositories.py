@@ -1,6 +1,22 @@
-from sqlalchemy import delete, select
+from datetime import datetime
+from typing import cast
+
+from sqlalchemy import (
+    CursorResult,
+    Select,
+    and_,
+    case,
+    delete,
+    func,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import selectinload
 
+from app.config import VectorizationJobStatus
 from app.db.domain.repositories import BaseRepository
 from app.db.infrastructure.orm import (
     ResumeORM,
@@ -11,6 +27,7 @@ from app.db.infrastructure.orm import (
     CandidateORM,
     MatchORM,
     UserORM,
+    VectorizationJobORM,
 )
 
 
@@ -35,10 +52,36 @@ class ResumeRepository(BaseRepository[ResumeORM]):
 
     async def get_by_user_id(self, user_id: int):
         """Выбрат всех пользователей по id"""
-        stmt = select(ResumeORM).where(ResumeORM.user_id == user_id)
+        stmt = (
+            select(ResumeORM).join(CandidateORM).where(CandidateORM.user_id == user_id)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_for_vectorization(self, ids: list[int]):
+        """Резюме с кандидатом и скиллами для векторизации"""
+        stmt = (
+            select(ResumeORM)
+            .where(ResumeORM.id.in_(ids))
+            .options(selectinload(ResumeORM.candidate), selectinload(ResumeORM.skills))
+        )
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_existing_ids(self, ids: list[int]) -> set[int]:
+        """Какие из ids еще есть в БД"""
+        stmt: Select = select(ResumeORM.id).where(ResumeORM.id.in_(ids))
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
+
+    async def get_candidate_ids(self, ids: list[int]) -> dict[int, int]:
+        """Кандидаты резюме из ids: {id резюме: id кандидата}"""
+        stmt: Select = select(ResumeORM.id, ResumeORM.candidate_id).where(
+            ResumeORM.id.in_(ids)
+        )
+        result = await self.session.execute(stmt)
+        return {id_: owner_id for id_, owner_id in result.all()}
+
     async def get_resumes_skills(self, user_id: int):
         """Получить все скиллы по резюме"""
         stmt = (
@@ -60,7 +103,7 @@ class ResumeSkillRepository(BaseRepository[ResumeSkillORM]):
     async def remove_skills_by_resume_id(self, resume_id: int):
         """Удалить скиллы по id резюме"""
         stmt = delete(ResumeSkillORM).where(ResumeSkillORM.resume_id == resume_id)
-        result = await self.session.execute(stmt)
+        result = cast(CursorResult, await self.session.execute(stmt))
         return result.rowcount > 0
 
     async def get_all_by_resume_id(self, resume_id: int):
@@ -89,6 +132,30 @@ class VacancyRepository(BaseRepository[VacancyORM]):
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_for_vectorization(self, ids: list[int]):
+        """Вакансии с работодателем и скиллами для векторизации"""
+        stmt = (
+            select(VacancyORM)
+            .where(VacancyORM.id.in_(ids))
+            .options(selectinload(VacancyORM.employer), selectinload(VacancyORM.skills))
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_existing_ids(self, ids: list[int]) -> set[int]:
+        """Какие из ids еще есть в БД"""
+        stmt: Select = select(VacancyORM.id).where(VacancyORM.id.in_(ids))
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
+
+    async def get_employer_ids(self, ids: list[int]) -> dict[int, int]:
+        """Работодатели вакансий из ids: {id вакансии: id работодателя}"""
+        stmt: Select = select(VacancyORM.id, VacancyORM.employer_id).where(
+            VacancyORM.id.in_(ids)
+        )
+        result = await self.session.execute(stmt)
+        return {id_: owner_id for id_, owner_id in result.all()}
+
     async def get_vacancies_skills(self, user_id: int):
         """Получить скиллы вакансии"""
         stmt = (
@@ -107,7 +174,7 @@ class VacancySkillRepository(BaseRepository[VacancySkillORM]):
     async def remove_skills_by_vacancy_id(self, vacancy_id: int):
         """Удалить скиллы по вакансии id"""
         stmt = delete(VacancySkillORM).where(VacancySkillORM.vacancy_id == vacancy_id)
-        result = await self.session.execute(stmt)
+        result = cast(CursorResult, await self.session.execute(stmt))
         return result.rowcount > 0
 
     async def get_skills_by_vacancy_id(self, vacancy_id: int):
@@ -120,6 +187,135 @@ class VacancySkillRepository(BaseRepository[VacancySkillORM]):
 class MatchRepository(BaseRepository[MatchORM]):
     orm_model = MatchORM
 
+    # Ограничение на число параметров в одном запросе
+    UPSERT_CHUNK_SIZE = 1000
+
+    async def upsert_many(self, matches: list, score_delta: float = 0.0) -> int:
+        """
+        Вставить/обновить пачку матчей одним запросом на чанк (INSERT ... ON CONFLICT).
+        Существующий матч обновляется, только если score изменился больше score_delta
+        """
+        # В одном INSERT ... ON CONFLICT пара (resume_id, vacancy_id) должна быть уникальной
+        rows = {(m.resume_id, m.vacancy_id): m for m in matches}
+        if not rows:
+            return 0
+
+        now = datetime.now()
+        values = [
+            {
+                "resume_id": m.resume_id,
+                "vacancy_id": m.vacancy_id,
+                "score": m.score,
+                "is_new": m.is_new,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for m in rows.values()
+        ]
+
+        dialect = self.session.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+        affected = 0
+        for start in range(0, len(values), self.UPSERT_CHUNK_SIZE):
+            stmt = insert(MatchORM).values(
+                values[start : start + self.UPSERT_CHUNK_SIZE]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[MatchORM.resume_id, MatchORM.vacancy_id],
+                set_={
+                    "score": stmt.excluded.score,
+                    "is_new": True,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+                where=or_(
+                    MatchORM.score.is_(None),
+                    func.abs(MatchORM.score - stmt.excluded.score) > score_delta,
+                ),
+            )
+            result = await self.session.execute(stmt)
+            affected += result.rowcount
+        return affected
+
+    async def get_vacancy_ids_for_resume_except(
+        self, resume_id: int, vacancy_ids: list[int]
+    ) -> list[int]:
+        """Вакансии матчей резюме не из vacancy_ids"""
+        return await self._get_except(
+            MatchORM.resume_id, resume_id, MatchORM.vacancy_id, vacancy_ids
+        )
+
+    async def get_resume_ids_for_vacancy_except(
+        self, vacancy_id: int, resume_ids: list[int]
+    ) -> list[int]:
+        """Резюме матчей вакансии не из resume_ids"""
+        return await self._get_except(
+            MatchORM.vacancy_id, vacancy_id, MatchORM.resume_id, resume_ids
+        )
+
+    async def _get_except(self, column, id_: int, counterpart, keep_ids: list[int]):
+        stmt = select(counterpart).where(column == id_)
+        if keep_ids:
+            stmt = stmt.where(counterpart.not_in(keep_ids))
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def delete_for_resume_except(
+        self, resume_id: int, vacancy_ids: list[int], keep_top_k: int | None = None
+    ) -> list[int]:
+        """
+        Удалить матчи резюме с вакансиями не из vacancy_ids, вернуть эти вакансии.
+        С keep_top_k матч остается, если входит в keep_top_k лучших матчей вакансии
+        """
+        return await self._delete_except(
+            MatchORM.resume_id, resume_id, MatchORM.vacancy_id, vacancy_ids, keep_top_k
+        )
+
+    async def delete_for_vacancy_except(
+        self, vacancy_id: int, resume_ids: list[int], keep_top_k: int | None = None
+    ) -> list[int]:
+        """
+        Удалить матчи вакансии с резюме не из resume_ids, вернуть эти резюме.
+        С keep_top_k матч остается, если входит в keep_top_k лучших матчей резюме
+        """
+        return await self._delete_except(
+            MatchORM.vacancy_id, vacancy_id, MatchORM.resume_id, resume_ids, keep_top_k
+        )
+
+    async def _delete_except(
+        self,
+        column,
+        id_: int,
+        counterpart,
+        keep_ids: list[int],
+        keep_top_k: int | None = None,
+    ):
+        stmt = delete(MatchORM).where(column == id_)
+        if keep_ids:
+            stmt = stmt.where(counterpart.not_in(keep_ids))
+        if keep_top_k is not None:
+            # Матч из top_k встречной стороны нужен ей самой
+            ranked = (
+                select(
+                    MatchORM.id,
+                    func.row_number()
+                    .over(
+                        partition_by=counterpart,
+                        order_by=MatchORM.score.desc().nulls_last(),
+                    )
+                    .label("rank"),
+                )
+                .where(counterpart.in_(select(counterpart).where(column == id_)))
+                .subquery()
+            )
+            stmt = stmt.where(
+                MatchORM.id.not_in(
+                    select(ranked.c.id).where(ranked.c.rank <= keep_top_k)
+                )
+            )
+        result = await self.session.execute(stmt.returning(counterpart))
+        return list(result.scalars().all())
+
     async def get_by_resume_vacancy(self, resume_id: int, vacancy_id: int):
         """Получить мать для резюме + вакансии"""
         stmt = (
@@ -131,6 +327,127 @@ class MatchRepository(BaseRepository[MatchORM]):
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_vacancy_score_floors(
+        self, vacancy_ids: list[int], top_k: int
+    ) -> dict[int, float]:
+        """score top_k-го матча вакансий, у которых уже есть top_k матчей"""
+        return await self._get_score_floors(MatchORM.vacancy_id, vacancy_ids, top_k)
+
+    async def get_resume_score_floors(
+        self, resume_ids: list[int], top_k: int
+    ) -> dict[int, float]:
+        """score top_k-го матча резюме, у которых уже есть top_k матчей"""
+        return await self._get_score_floors(MatchORM.resume_id, resume_ids, top_k)
+
+    async def _get_score_floors(self, column, ids: list[int], top_k: int):
+        if not ids:
+            return {}
+        ranked = (
+            select(
+                column.label("owner_id"),
+                MatchORM.score,
+                func.row_number()
+                .over(partition_by=column, order_by=MatchORM.score.desc())
+                .label("rank"),
+            )
+            .where(column.in_(ids))
+            .subquery()
+        )
+        stmt = select(ranked.c.owner_id, ranked.c.score).where(ranked.c.rank == top_k)
+        result = await self.session.execute(stmt)
+        return {owner_id: score for owner_id, score in result.all()}
+
+    # Колонки матча в списках, имена - как у полей MatchRecord
+    MATCH_COLUMNS = (
+        MatchORM.id,
+        MatchORM.resume_id,
+        MatchORM.vacancy_id,
+        MatchORM.score,
+        MatchORM.created_at,
+        MatchORM.updated_at,
+        MatchORM.is_new,
+    )
+
+    async def list_vacancies_for_resume(
+        self,
+        resume_id: int,
+        limit: int,
+        after: tuple[float, int] | None = None,
+        is_new: bool | None = None,
+    ):
+        """Страница матчей резюме с краткими данными вакансий, по убыванию score"""
+        stmt: Select = (
+            select(
+                *self.MATCH_COLUMNS,
+                VacancyORM.title,
+                VacancyORM.location,
+                VacancyORM.salary_from,
+                VacancyORM.salary_to,
+                VacancyORM.employment_type,
+                VacancyORM.work_mode,
+                EmployerORM.company_name,
+            )
+            .join(VacancyORM, VacancyORM.id == MatchORM.vacancy_id)
+            .outerjoin(EmployerORM, EmployerORM.id == VacancyORM.employer_id)
+            .where(MatchORM.resume_id == resume_id)
+        )
+        return await self._list_page(stmt, limit, after, is_new)
+
+    async def list_resumes_for_vacancy(
+        self,
+        vacancy_id: int,
+        limit: int,
+        after: tuple[float, int] | None = None,
+        is_new: bool | None = None,
+    ):
+        """Страница матчей вакансии с краткими данными резюме, по убыванию score"""
+        stmt: Select = (
+            select(
+                *self.MATCH_COLUMNS,
+                ResumeORM.title,
+                ResumeORM.location,
+                ResumeORM.experience_age,
+                ResumeORM.salary_from,
+                ResumeORM.salary_to,
+                ResumeORM.employment_type,
+                ResumeORM.status,
+                CandidateORM.first_name,
+                CandidateORM.last_name,
+            )
+            .join(ResumeORM, ResumeORM.id == MatchORM.resume_id)
+            .outerjoin(CandidateORM, CandidateORM.id == ResumeORM.candidate_id)
+            .where(MatchORM.vacancy_id == vacancy_id)
+        )
+        return await self._list_page(stmt, limit, after, is_new)
+
+    async def _list_page(
+        self,
+        stmt,
+        limit: int,
+        after: tuple[float, int] | None,
+        is_new: bool | None,
+    ):
+        """
+        Keyset-пагинация по (score, id): следующая страница начинается
+        сразу после последнего отданного матча, без OFFSET.
+        Идет по индексам (resume_id, score) / (vacancy_id, score),
+        матчи без score в списки не попадают
+        """
+        stmt = stmt.where(MatchORM.score.is_not(None))
+        if is_new is not None:
+            stmt = stmt.where(MatchORM.is_new == is_new)
+        if after is not None:
+            score, id_ = after
+            stmt = stmt.where(
+                or_(
+                    MatchORM.score < score,
+                    and_(MatchORM.score == score, MatchORM.id < id_),
+                )
+            )
+        stmt = stmt.order_by(MatchORM.score.desc(), MatchORM.id.desc()).limit(limit)
+        result = await self.session.execute(stmt)
+        return result.mappings().all()
+
     async def get_resumes_by_vacancy_id(self, vacancy_id: int):
         """Получить матч резюме по id вакансии"""
         stmt = select(MatchORM).where(MatchORM.vacancy_id == vacancy_id)
@@ -144,6 +461,78 @@ class MatchRepository(BaseRepository[MatchORM]):
         return result.scalars().all()
 
 
+class VectorizationJobRepository(BaseRepository[VectorizationJobORM]):
+    orm_model = VectorizationJobORM
+
+    async def claim_pending(self, limit: int):
+        """
+        Забрать задачи из очереди и пометить их выполняемыми.
+        SKIP LOCKED - параллельные воркеры не ждут и не берут одни и те же задачи
+        """
+        claimable: Select = (
+            select(VectorizationJobORM.id)
+            .where(VectorizationJobORM.status == VectorizationJobStatus.PENDING.value)
+            .order_by(VectorizationJobORM.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(VectorizationJobORM)
+            .where(VectorizationJobORM.id.in_(claimable.scalar_subquery()))
+            .values(
+                status=VectorizationJobStatus.RUNNING.value,
+                attempts=VectorizationJobORM.attempts + 1,
+                updated_at=datetime.now(),
+            )
+            .returning(VectorizationJobORM)
+        )
+        result = await self.session.execute(stmt)
+        return sorted(result.scalars().all(), key=lambda job: job.id)
+
+    async def finish(self, ids: list[int]):
+        """Пометить задачи выполненными"""
+        stmt = (
+            update(VectorizationJobORM)
+            .where(VectorizationJobORM.id.in_(ids))
+            .values(
+                status=VectorizationJobStatus.DONE.value,
+                error=None,
+                updated_at=datetime.now(),
+            )
+        )
+        await self.session.execute(stmt)
+
+    async def fail(self, ids: list[int], error: str, max_attempts: int):
+        """Вернуть задачи в очередь или пометить упавшими после max_attempts попыток"""
+        stmt = (
+            update(VectorizationJobORM)
+            .where(VectorizationJobORM.id.in_(ids))
+            .values(
+                status=case(
+                    (
+                        VectorizationJobORM.attempts >= literal(max_attempts),
+                        VectorizationJobStatus.FAILED.value,
+                    ),
+                    else_=VectorizationJobStatus.PENDING.value,
+                ),
+                error=error,
+                updated_at=datetime.now(),
+            )
+        )
+        await self.session.execute(stmt)
+
+    async def requeue_stale(self, older_than: datetime) -> int:
+        """Вернуть в очередь задачи, зависшие в работе (например, после падения воркера)"""
+        stmt = (
+            update(VectorizationJobORM)
+            .where(VectorizationJobORM.status == VectorizationJobStatus.RUNNING.value)
+            .where(VectorizationJobORM.updated_at < literal(older_than))
+            .values(status=VectorizationJobStatus.PENDING.value)
+        )
+        result = cast(CursorResult, await self.session.execute(stmt))
+        return result.rowcount
+
+
 class UserRepository(BaseRepository[UserORM]):
     orm_model = UserORM
 
@@ -6,10 +6,17 @@ from fastapi import FastAPI
 from sqlalchemy import text
 from starlette.middleware.cors import CORSMiddleware
 
-from app.db.infrastructure.database import engine
+from app.db.infrastructure.database import engine, async_qdrant_api
+from app.db.infrastructure.qdrant_schema import reconcile_collections
 from app.db.infrastructure.orm import Base
 from app.routers import api_router
-from app.config import settings
+from app.config import settings, model_registry
+from app.services.match_events import match_event_bus
+from app.services.vectorization_worker import vectorization_worker
+from app.utils.embedding_executor import embedding_executor
+from app.utils.embeddings import embedding_cache
+from app.utils.filter.search_cache import search_cache
+from app.utils.responses import FastJSONResponse
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,10 +37,39 @@ async def lifespan(app: FastAPI):
         logger.info(f"❌ Ошибка подключения к БД: {e}")
         raise
 
+    # Коллекции Qdrant и payload-индексы по схеме
+    try:
+        await reconcile_collections(async_qdrant_api.client)
+        logger.info("✅ Коллекции Qdrant проверены")
+    except Exception as e:
+        logger.info(f"❌ Ошибка подготовки коллекций Qdrant: {e}")
+        raise
+
+    # Загружаем модели векторизации заранее, чтобы не платить за это в первом запросе
+    if settings.EMBEDDING_WARMUP:
+        await embedding_executor.run(model_registry.warm_up)
+
+    # Фоновое обновление матчей при изменении резюме/вакансий
+    if settings.MATCH_EVENTS_ENABLED:
+        await match_event_bus.start()
+
+    # Фоновая векторизация резюме/вакансий из очереди задач
+    if settings.VECTORIZATION_WORKER_ENABLED:
+        await vectorization_worker.start()
+
     yield
 
+    await vectorization_worker.stop()
+    await match_event_bus.stop()
+    await async_qdrant_api.close()
+    embedding_executor.shutdown()
 
-app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
+
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 # Настройка CORS
 app.add_middleware(
@@ -42,6 +78,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Vectorization-Job-Id"],
 )
 
 app.include_router(api_router, prefix="/api/v1")
@@ -52,6 +89,24 @@ async def root():
     return {"message": "Alive"}
 
 
+@app.get("/health/embedding-cache/")
+async def embedding_cache_stats():
+    """Счетчики попаданий в кэш embeddings"""
+    return embedding_cache.stats()
+
+
+@app.get("/health/search-cache/")
+async def search_cache_stats():
+    """Счетчики попаданий в кэш выдачи поиска"""
+    return search_cache.stats()
+
+
+@app.get("/health/models/")
+async def models_stats():
+    """Загруженные модели и время их загрузки"""
+    return {"stub": model_registry.use_stub, "load_times": model_registry.load_times}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.config import VectorizationJobStatus
+
+
+class VectorizationJobCreate(BaseModel):
+    collection: str
+    owner_id: int
+    entity_id: int
+    status: str = VectorizationJobStatus.PENDING.value
+
+
+class VectorizationJobResponse(BaseModel):
+    id: int
+    collection: str
+    owner_id: int
+    entity_id: int
+    status: str
+    attempts: int = 0
+    error: str | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
@@ -1,3 +1,10 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import ClassVar
+
 from pydantic import BaseModel
 
 from app.models.embeddings import (
@@ -16,6 +23,11 @@ from app.models.embeddings import (
 class CandidateMatch(CandidatePayloadSoft, CandidatePayloadHard):
     """Внутренняя модель для агрегации векторов кандидата"""
 
+    # Поля payload, которые нужны для матчинга
+    match_payload_fields: ClassVar[list[str]] = ["type", "user_id", "resume_id"]
+    # Поля ключа (владелец, сущность) для агрегации
+    key_fields: ClassVar[tuple[str, str]] = ("user_id", "resume_id")
+
     id: str = ""
     score: float = 0
 
@@ -29,6 +41,11 @@ class CandidateMatch(CandidatePayloadSoft, CandidatePayloadHard):
 class EmployerMatch(EmployerPayloadSoft, EmployerPayloadHard):
     """Внутренняя модель для агрегации векторов работодателя"""
 
+    # Поля payload, которые нужны для матчинга
+    match_payload_fields: ClassVar[list[str]] = ["type", "employer_id", "vacancy_id"]
+    # Поля ключа (владелец, сущность) для агрегации
+    key_fields: ClassVar[tuple[str, str]] = ("employer_id", "vacancy_id")
+
     id: str = ""
     score: float = 0
 
@@ -102,6 +119,167 @@ class VacancyMatchResponse(BaseModel):
     score: float = 0.0
 
 
+# ============================================================================
+# ЗАПИСИ ВЫДАЧИ ПОИСКА
+# Те же поля, что у моделей ответа выше, но без валидации pydantic:
+# собираются из payload Qdrant и сериализуются orjson напрямую
+# ============================================================================
+
+
+@dataclass(slots=True)
+class SkillRecord:
+    skill_name: str = ""
+    description: str = ""
+    experience_age: int = 0
+
+
+@dataclass(slots=True)
+class ResumeSearchRecord:
+    user_id: int = 0
+    resume_id: int = 0
+    title: str = ""
+    summary: str = ""
+    age: int = 0
+    location: str = ""
+    salary_from: int = 0
+    salary_to: int = 0
+    employment_type: str = ""
+    experience_age: int = 0
+    status: str = "active"
+    skills: list[SkillRecord] = field(default_factory=list)
+    score: float = 0.0
+
+
+@dataclass(slots=True)
+class VacancySearchRecord:
+    employer_id: int = 0
+    vacancy_id: int = 0
+    title: str = ""
+    summary: str = ""
+    experience_age_from: int = 0
+    experience_age_to: int = 0
+    location: str = ""
+    salary_from: int = 0
+    salary_to: int = 0
+    employment_type: str = ""
+    work_mode: str = ""
+    skills: list[SkillRecord] = field(default_factory=list)
+    score: float = 0.0
+
+
+class MatchResponse(BaseModel):
+    """Матч резюме и вакансии (схема ответа /matches/*)"""
+
+    id: int
+    resume_id: int
+    vacancy_id: int
+    score: float | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    is_new: bool = True
+
+
+@dataclass(slots=True)
+class MatchRecord:
+    """Запись матча для ответа без валидации, поля - как у MatchResponse"""
+
+    id: int
+    resume_id: int
+    vacancy_id: int
+    score: float | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    is_new: bool = True
+
+    @classmethod
+    def from_orm(cls, match) -> "MatchRecord":
+        return cls(
+            id=match.id,
+            resume_id=match.resume_id,
+            vacancy_id=match.vacancy_id,
+            score=match.score,
+            created_at=match.created_at,
+            updated_at=match.updated_at,
+            is_new=match.is_new,
+        )
+
+
+class MatchedVacancyResponse(MatchResponse):
+    """Матч резюме с краткими данными вакансии (схема списка матчей резюме)"""
+
+    title: str
+    location: str | None = None
+    salary_from: int | None = None
+    salary_to: int | None = None
+    employment_type: str | None = None
+    work_mode: str | None = None
+    company_name: str | None = None
+
+
+class MatchedResumeResponse(MatchResponse):
+    """Матч вакансии с краткими данными резюме (схема списка матчей вакансии)"""
+
+    title: str
+    location: str | None = None
+    experience_age: int | None = None
+    salary_from: int | None = None
+    salary_to: int | None = None
+    employment_type: str | None = None
+    status: str | None = None
+    first_name: str | None = None
+    last_name: str | None = None
+
+
+@dataclass(slots=True)
+class MatchedVacancyRecord(MatchRecord):
+    """Запись списка матчей резюме, поля - как у MatchedVacancyResponse"""
+
+    title: str = ""
+    location: str | None = None
+    salary_from: int | None = None
+    salary_to: int | None = None
+    employment_type: str | None = None
+    work_mode: str | None = None
+    company_name: str | None = None
+
+
+@dataclass(slots=True)
+class MatchedResumeRecord(MatchRecord):
+    """Запись списка матчей вакансии, поля - как у MatchedResumeResponse"""
+
+    title: str = ""
+    location: str | None = None
+    experience_age: int | None = None
+    salary_from: int | None = None
+    salary_to: int | None = None
+    employment_type: str | None = None
+    status: str | None = None
+    first_name: str | None = None
+    last_name: str | None = None
+
+
+@dataclass(slots=True)
+class MatchCursor:
+    """Позиция в списке матчей: (score, id) последнего отданного матча"""
+
+    score: float
+    id: int
+
+    def encode(self) -> str:
+        """Непрозрачная строка курсора для клиента"""
+        raw = json.dumps({"s": self.score, "i": self.id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "MatchCursor":
+        """Разобрать курсор, ValueError - если он поврежден"""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return cls(score=float(data["s"]), id=int(data["i"]))
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Некорректный курсор: {e}")
+
+
 # ============================================================================
 # МОДЕЛИ ДЛЯ БД
 # ============================================================================
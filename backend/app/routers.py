@@ -6,6 +6,7 @@ from app.routes.match import router as match_router
 from app.routes.match import recalc_router
 from app.routes.vacancies import router as vacancies_router
 from app.routes.auth import router as auth_router
+from app.routes.jobs import router as jobs_router
 
 api_router = APIRouter()
 
@@ -16,5 +17,6 @@ api_router.include_router(recalc_router)
 api_router.include_router(resumes_router)
 api_router.include_router(vacancies_router)
 api_router.include_router(auth_router)
+api_router.include_router(jobs_router)
 # Временно вынесли наружу
 # api_router.include_router(embeddings_router, tags=["vectorization"])
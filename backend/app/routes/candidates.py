@@ -5,13 +5,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.domain.unit_of_work import UnitOfWork
-from app.db.infrastructure.database import get_db, qdrant_api
+from app.db.infrastructure.database import get_db, get_qdrant_api, AsyncQdrantAPI
 from app.models.auth import TokenData
 from app.models.candidate import (
     CandidateResponse,
     CandidateUpdate,
 )
 from app.services.dependencies import get_current_active_user
+from app.services.match_events import match_event_bus
 
 router = APIRouter(prefix="/candidates", tags=["candidates"])
 
@@ -88,6 +89,7 @@ async def update_candidate(
 @router.delete("/")
 async def delete_candidate(
     db: AsyncSession = Depends(get_db),
+    qdrant_api: AsyncQdrantAPI = Depends(get_qdrant_api),
     current_user: TokenData = Depends(get_current_active_user),
 ):
     """Удалить текущего соискателя (каскад по резюме, избранному, матчам)"""
@@ -105,10 +107,19 @@ async def delete_candidate(
 
         async with uow.transaction():
             resumes = await uow.resumes.get_by_candidate_id(candidate.id)
+            resume_matches = {
+                resume.id: await uow.matches.get_vacancies_by_resume_id(resume.id)
+                for resume in resumes
+            }
             await uow.candidates.remove(id_=candidate.id)
             for resume in resumes:
                 await qdrant_api.remove_candidate_skills(candidate.id, resume.id)
 
+        for resume_id, matches in resume_matches.items():
+            match_event_bus.resume_deleted(
+                candidate.id, resume_id, [m.vacancy_id for m in matches]
+            )
+
         return {"message": "Candidate deleted successfully"}
     except HTTPException:
         raise
@@ -5,13 +5,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.domain.unit_of_work import UnitOfWork
-from app.db.infrastructure.database import get_db, qdrant_api
+from app.db.infrastructure.database import get_db, get_qdrant_api, AsyncQdrantAPI
 from app.models.auth import TokenData
 from app.models.employer import (
     EmployerResponse,
     EmployerUpdate,
 )
 from app.services.dependencies import get_current_active_user
+from app.services.match_events import match_event_bus
 
 router = APIRouter(prefix="/employers", tags=["employers"])
 
@@ -86,6 +87,7 @@ async def update_employer(
 @router.delete("/")
 async def delete_employer(
     db: AsyncSession = Depends(get_db),
+    qdrant_api: AsyncQdrantAPI = Depends(get_qdrant_api),
     current_user: TokenData = Depends(get_current_active_user),
 ):
     """Удалить текущего работодателя (каскад по вакансиям, избранному, матчам)"""
@@ -103,10 +105,19 @@ async def delete_employer(
 
         async with uow.transaction():
             vacancies = await uow.vacancies.get_by_employer_id(employer.id)
+            vacancy_matches = {
+                vacancy.id: await uow.matches.get_resumes_by_vacancy_id(vacancy.id)
+                for vacancy in vacancies
+            }
             await uow.employers.remove(id_=employer.id)
             for vacancy in vacancies:
                 await qdrant_api.remove_employer_skills(employer.id, vacancy.id)
 
+        for vacancy_id, matches in vacancy_matches.items():
+            match_event_bus.vacancy_deleted(
+                employer.id, vacancy_id, [m.resume_id for m in matches]
+            )
+
         return {"message": "Employer deleted successfully"}
     except HTTPException:
         raise
@@ -0,0 +1,42 @@
+# Статус фоновых задач
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import QdrantCollection
+from app.db.domain.unit_of_work import UnitOfWork
+from app.db.infrastructure.database import get_db
+from app.models.auth import TokenData
+from app.models.job import VectorizationJobResponse
+from app.services.dependencies import get_current_active_user
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@router.get("/vectorization/{job_id}", response_model=VectorizationJobResponse)
+async def get_vectorization_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenData = Depends(get_current_active_user),
+):
+    """Статус задачи векторизации резюме/вакансии - только своей"""
+    if not current_user.user_id:
+        raise HTTPException(status_code=401, detail="Invalid token: user_id missing")
+
+    uow = UnitOfWork(db)
+    job = await uow.vectorization_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Задача принадлежит кандидату/работодателю текущего пользователя
+    if job.collection == QdrantCollection.CANDIDATES.value:
+        owner = await uow.candidates.get_by_user_id(user_id=current_user.user_id)
+    else:
+        owner = await uow.employers.get_by_user_id(user_id=current_user.user_id)
+    if not owner or job.owner_id != owner.id:
+        raise HTTPException(status_code=403, detail="Access denied: not your job")
+    return job
@@ -1,12 +1,23 @@
 # Эндпоинт для поиска матчей
 import logging
 
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db.domain.unit_of_work import UnitOfWork
-from app.db.infrastructure.database import get_db, QdrantAPI
+from app.db.infrastructure.database import get_db, get_qdrant_api, AsyncQdrantAPI
+from app.models.match import (
+    MatchCursor,
+    MatchRecord,
+    MatchResponse,
+    MatchedResumeRecord,
+    MatchedResumeResponse,
+    MatchedVacancyRecord,
+    MatchedVacancyResponse,
+)
 from app.services.matching import MatchingService
+from app.utils.responses import FastJSONResponse
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,39 +26,121 @@ router = APIRouter(prefix="/matches", tags=["matches"])
 recalc_router = APIRouter(prefix="/recalc", tags=["recalc"])
 
 
-@router.get("/resumes/{resume_id}")
+@router.get("/resumes/{resume_id}", response_model=list[MatchResponse])
 async def get_resume_matches(resume_id: int, db: AsyncSession = Depends(get_db)):
     """Получить матс резюме"""
     try:
         uow = UnitOfWork(db)
         async with uow.transaction():
             result = await uow.matches.get_vacancies_by_resume_id(resume_id=resume_id)
-        return result
+            records = [MatchRecord.from_orm(match) for match in result]
+        return FastJSONResponse(records)
     except Exception as e:
         logger.error(f"Error getting candidate: {e}")
         raise HTTPException(status_code=500, detail="Error getting candidate")
 
 
-@router.get("/vacancies/{vacancy_id}")
+@router.get("/vacancies/{vacancy_id}", response_model=list[MatchResponse])
 async def get_vacancy_matches(vacancy_id: int, db: AsyncSession = Depends(get_db)):
     """Получить матчи для вакансии"""
     try:
         uow = UnitOfWork(db)
         async with uow.transaction():
             result = await uow.matches.get_resumes_by_vacancy_id(vacancy_id=vacancy_id)
-        return result
+            records = [MatchRecord.from_orm(match) for match in result]
+        return FastJSONResponse(records)
     except Exception as e:
         logger.error(f"Error getting candidate: {e}")
         raise HTTPException(status_code=500, detail="Error getting candidate")
 
 
+def _page_response(rows, record_cls, limit: int) -> FastJSONResponse:
+    """Страница списка матчей, курсор следующей - в заголовке X-Next-Cursor"""
+    records = [record_cls(**row) for row in rows[:limit]]
+    headers = None
+    if len(rows) > limit:
+        last = records[-1]
+        headers = {"X-Next-Cursor": MatchCursor(last.score, last.id).encode()}
+    return FastJSONResponse(records, headers=headers)
+
+
+def _decode_cursor(cursor: str | None) -> tuple[float, int] | None:
+    if cursor is None:
+        return None
+    try:
+        decoded = MatchCursor.decode(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return decoded.score, decoded.id
+
+
+@router.get(
+    "/resumes/{resume_id}/vacancies", response_model=list[MatchedVacancyResponse]
+)
+async def list_resume_matches(
+    resume_id: int,
+    cursor: str | None = None,
+    limit: int = Query(settings.MATCH_PAGE_SIZE, ge=1, le=settings.MATCH_MAX_PAGE_SIZE),
+    is_new: bool | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Вакансии, подобранные резюме, по убыванию score - одним запросом с данными вакансий.
+
+    Следующая страница - тот же запрос с cursor из заголовка X-Next-Cursor
+    """
+    after = _decode_cursor(cursor)
+    try:
+        uow = UnitOfWork(db)
+        async with uow.transaction():
+            # Лишняя запись - признак того, что есть следующая страница
+            rows = await uow.matches.list_vacancies_for_resume(
+                resume_id=resume_id, limit=limit + 1, after=after, is_new=is_new
+            )
+        return _page_response(rows, MatchedVacancyRecord, limit)
+    except Exception as e:
+        logger.error(f"Error listing resume matches: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error listing resume matches")
+
+
+@router.get(
+    "/vacancies/{vacancy_id}/resumes", response_model=list[MatchedResumeResponse]
+)
+async def list_vacancy_matches(
+    vacancy_id: int,
+    cursor: str | None = None,
+    limit: int = Query(settings.MATCH_PAGE_SIZE, ge=1, le=settings.MATCH_MAX_PAGE_SIZE),
+    is_new: bool | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Резюме, подобранные вакансии, по убыванию score - одним запросом с данными резюме.
+
+    Следующая страница - тот же запрос с cursor из заголовка X-Next-Cursor
+    """
+    after = _decode_cursor(cursor)
+    try:
+        uow = UnitOfWork(db)
+        async with uow.transaction():
+            rows = await uow.matches.list_resumes_for_vacancy(
+                vacancy_id=vacancy_id, limit=limit + 1, after=after, is_new=is_new
+            )
+        return _page_response(rows, MatchedResumeRecord, limit)
+    except Exception as e:
+        logger.error(f"Error listing vacancy matches: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error listing vacancy matches")
+
+
 @recalc_router.post("/matches/vacancy/")
 async def recalc_resumes(
-    employer_id: int, vacancy_id: int, db: AsyncSession = Depends(get_db)
+    employer_id: int,
+    vacancy_id: int,
+    db: AsyncSession = Depends(get_db),
+    qdrant_api: AsyncQdrantAPI = Depends(get_qdrant_api),
 ):
     """Пересчитать матчи для соискателя"""
     try:
-        matcher = MatchingService(qdrant_api=QdrantAPI())
+        matcher = MatchingService(qdrant_api=qdrant_api)
         await matcher.recalc_matches_for_vacancy(
             employer_id=employer_id, vacancy_id=vacancy_id, db=db
         )
@@ -59,11 +152,14 @@ async def recalc_resumes(
 
 @recalc_router.post("/matches/resume/")
 async def recalc_vacancies(
-    resume_id: int, user_id: int, db: AsyncSession = Depends(get_db)
+    resume_id: int,
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    qdrant_api: AsyncQdrantAPI = Depends(get_qdrant_api),
 ):
     """Пересчитать матчи для вакансии"""
     try:
-        matcher = MatchingService(qdrant_api=QdrantAPI())
+        matcher = MatchingService(qdrant_api=qdrant_api)
         await matcher.recalc_matches_for_resume(
             resume_id=resume_id, user_id=user_id, db=db
         )
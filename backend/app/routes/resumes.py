@@ -1,10 +1,11 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db.domain.unit_of_work import UnitOfWork
-from app.db.infrastructure.database import get_db, QdrantAPI, qdrant_api
+from app.db.infrastructure.database import get_db, get_qdrant_api, AsyncQdrantAPI
 from app.models.auth import TokenData
 from app.models.candidate import (
     ResumeUpsert,
@@ -17,10 +18,12 @@ from app.models.candidate import (
 )
 from app.models.filter import SearchRequest
 
-from app.models.match import CandidateMatch
+from app.models.match import CandidateMatch, ResumeMatchResponse
 from app.services.dependencies import get_current_active_user
-from app.services.fiter import SearchFilter
+from app.services.fiter import SearchError, SearchFilter
+from app.services.match_events import match_event_bus
 from app.services.storage import upsert_resume
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(prefix="/resumes", tags=["resumes"])
 
@@ -32,6 +35,7 @@ logger = logging.getLogger(__name__)
 async def modify_resume(
     candidate_resume: ResumeUpsert,
     skills: list[ResumeSkillBase],
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: TokenData = Depends(get_current_active_user),
 ):
@@ -51,7 +55,9 @@ async def modify_resume(
         # Устанавливаем candidate_id из токена, игнорируя переданный
         candidate_resume.candidate_id = candidate.id
 
-        new_resume = await upsert_resume(candidate_resume, skills, db)
+        new_resume, job = await upsert_resume(candidate_resume, skills, db)
+        # Векторизация идет в фоне, статус - GET /jobs/vectorization/{job_id}
+        response.headers["X-Vectorization-Job-Id"] = str(job.id)
         return new_resume
     except HTTPException:
         raise
@@ -124,7 +130,8 @@ async def get_my_resumes(
 
             result.resumes.append(resume_list)
 
-        return result
+        # Модель уже провалидирована - без повторной валидации и jsonable_encoder
+        return FastJSONResponse(result)
     except HTTPException:
         raise
     except Exception as e:
@@ -136,6 +143,7 @@ async def get_my_resumes(
 async def delete_resume(
     id_: int,
     db: AsyncSession = Depends(get_db),
+    qdrant_api: AsyncQdrantAPI = Depends(get_qdrant_api),
     current_user: TokenData = Depends(get_current_active_user),
 ):
     """Удалить резюме (каскад: матчи, избранное) - только свое"""
@@ -157,9 +165,15 @@ async def delete_resume(
                 status_code=403, detail="Access denied: not your resume"
             )
 
+        candidate_id = int(resume.candidate_id)
         async with uow.transaction():
-            await uow.resumes.remove(id_=resume.id)
-            await qdrant_api.remove_candidate_skills(resume.candidate_id, resume.id)
+            matches = await uow.matches.get_vacancies_by_resume_id(id_)
+            await uow.resumes.remove(id_=id_)
+            await qdrant_api.remove_candidate_skills(candidate_id, id_)
+
+        match_event_bus.resume_deleted(
+            candidate_id, id_, [m.vacancy_id for m in matches]
+        )
 
         return {"message": "Resume deleted successfully"}
     except HTTPException:
@@ -169,18 +183,30 @@ async def delete_resume(
         raise HTTPException(status_code=500, detail=f"Error deleting resume: {str(e)}")
 
 
-@router.post("/search")
-async def search_resumes(search: SearchRequest):
-    """Поиск соискателей по вакансии"""
+@router.post("/search", response_model=list[ResumeMatchResponse])
+async def search_resumes(
+    search: SearchRequest,
+    cursor: str | None = None,
+    page_size: int | None = Query(None, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE),
+    qdrant_api: AsyncQdrantAPI = Depends(get_qdrant_api),
+):
+    """
+    Поиск соискателей по вакансии.
+
+    Следующая страница - тот же запрос с cursor из заголовка X-Next-Cursor
+    """
     try:
-        matcher = SearchFilter(qdrant_api=QdrantAPI(), entity_cls=CandidateMatch)
-        # Получаем внутренние модели с векторами
-        raw_matches = await matcher.filter_search(
-            search_request=search,
+        matcher = SearchFilter(qdrant_api=qdrant_api, entity_cls=CandidateMatch)
+        page = await matcher.filter_search(
+            search_request=search, cursor=cursor, page_size=page_size
         )
+        headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
 
-        return raw_matches
+        # Записи выдачи - dataclass, orjson сериализует их без jsonable_encoder
+        return FastJSONResponse(page.items, headers=headers)
 
+    except SearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error searching resumes: {e}", exc_info=True)
         raise HTTPException(
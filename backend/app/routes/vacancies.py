@@ -1,10 +1,11 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db.domain.unit_of_work import UnitOfWork
-from app.db.infrastructure.database import get_db, QdrantAPI, qdrant_api
+from app.db.infrastructure.database import get_db, get_qdrant_api, AsyncQdrantAPI
 from app.models.auth import TokenData
 from app.models.employer import (
     EmployerVacancyUpsert,
@@ -16,10 +17,12 @@ from app.models.employer import (
     VacanciesList,
 )
 from app.models.filter import SearchRequest
-from app.models.match import EmployerMatch
+from app.models.match import EmployerMatch, VacancyMatchResponse
 from app.services.dependencies import get_current_active_user
-from app.services.fiter import SearchFilter
+from app.services.fiter import SearchError, SearchFilter
+from app.services.match_events import match_event_bus
 from app.services.storage import upsert_vacancy
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter(prefix="/vacancies", tags=["vacancies"])
 
@@ -31,6 +34,7 @@ logger = logging.getLogger(__name__)
 async def modify_vacancy(
     vacancy: EmployerVacancyUpsert,
     skills: list[VacancySkill],
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: TokenData = Depends(get_current_active_user),
 ):
@@ -50,7 +54,9 @@ async def modify_vacancy(
         # Устанавливаем employer_id из токена, игнорируя переданный
         vacancy.employer_id = employer.id
 
-        new_vacancy = await upsert_vacancy(vacancy, skills, db)
+        new_vacancy, job = await upsert_vacancy(vacancy, skills, db)
+        # Векторизация идет в фоне, статус - GET /jobs/vectorization/{job_id}
+        response.headers["X-Vectorization-Job-Id"] = str(job.id)
         return new_vacancy
     except HTTPException:
         raise
@@ -129,7 +135,8 @@ async def get_my_vacancies(
 
             result.vacancies.append(vacancy_list)
 
-        return result
+        # Модель уже провалидирована - без повторной валидации и jsonable_encoder
+        return FastJSONResponse(result)
     except HTTPException:
         raise
     except Exception as e:
@@ -141,6 +148,7 @@ async def get_my_vacancies(
 async def delete_vacancy(
     id_: int,
     db: AsyncSession = Depends(get_db),
+    qdrant_api: AsyncQdrantAPI = Depends(get_qdrant_api),
     current_user: TokenData = Depends(get_current_active_user),
 ):
     """Удалить вакансию (каскад: матчи, избранное) - только свою"""
@@ -162,9 +170,15 @@ async def delete_vacancy(
                 status_code=403, detail="Access denied: not your vacancy"
             )
 
+        employer_id = int(vacancy.employer_id)
         async with uow.transaction():
+            matches = await uow.matches.get_resumes_by_vacancy_id(id_)
             await uow.vacancies.remove(id_=id_)
-            await qdrant_api.remove_employer_skills(vacancy.employer_id, vacancy.id)
+            await qdrant_api.remove_employer_skills(employer_id, id_)
+
+        match_event_bus.vacancy_deleted(
+            employer_id, id_, [m.resume_id for m in matches]
+        )
 
         return {"message": "Vacancy deleted successfully"}
     except HTTPException:
@@ -174,20 +188,30 @@ async def delete_vacancy(
         raise HTTPException(status_code=500, detail=f"Error deleting vacancy: {str(e)}")
 
 
-@router.post("/search")
-async def search_vacancies(search: SearchRequest):
-    """Поиск вакансий по резюме"""
+@router.post("/search", response_model=list[VacancyMatchResponse])
+async def search_vacancies(
+    search: SearchRequest,
+    cursor: str | None = None,
+    page_size: int | None = Query(None, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE),
+    qdrant_api: AsyncQdrantAPI = Depends(get_qdrant_api),
+):
+    """
+    Поиск вакансий по резюме.
+
+    Следующая страница - тот же запрос с cursor из заголовка X-Next-Cursor
+    """
     try:
-        matcher = SearchFilter(qdrant_api=QdrantAPI(), entity_cls=EmployerMatch)
-        # Получаем внутренние модели с векторами
-        raw_matches = await matcher.filter_search(
-            search_request=search,
+        matcher = SearchFilter(qdrant_api=qdrant_api, entity_cls=EmployerMatch)
+        page = await matcher.filter_search(
+            search_request=search, cursor=cursor, page_size=page_size
         )
-        return raw_matches
-        # Агрегируем данные: объединяем soft + hard векторы в единый ответ
-        # aggregated_results = matcher.aggregate_vacancy_matches(raw_matches)
-        #
-        # return aggregated_results
+        headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+
+        # Записи выдачи - dataclass, orjson сериализует их без jsonable_encoder
+        return FastJSONResponse(page.items, headers=headers)
+
+    except SearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error searching vacancies: {e}", exc_info=True)
         raise HTTPException(
@@ -0,0 +1,253 @@
+# Массовый пересчет матчей для всех вакансий/резюме
+import argparse
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from qdrant_client.http.models import models
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import MembersDataType, QdrantCollection
+from app.db.infrastructure.database import (
+    AsyncQdrantAPI,
+    AsyncSessionLocal,
+    async_qdrant_api,
+)
+from app.models.match import MatchCreate
+from app.services.matching import (
+    MatchingError,
+    MatchingService,
+    RESUME_SCORE_DELTA,
+    VACANCY_SCORE_DELTA,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecalcProgress:
+    """Состояние пересчета, сохраняется в checkpoint"""
+
+    collection: str
+    offset: int | str | None = None
+    processed: int = 0
+    failed: int = 0
+    saved: int = 0
+    done: bool = False
+    errors: list[str] = field(default_factory=list)
+
+
+class BulkRecalcEngine:
+    """
+    Пересчет матчей для всей коллекции.
+
+    Вакансии/резюме читаются из Qdrant через scroll постранично,
+    матчинг по странице идет параллельно (не больше concurrency),
+    результаты страницы сохраняются одной транзакцией.
+    После каждой страницы пишется checkpoint, чтобы продолжить с места остановки.
+    Ошибка одной вакансии/резюме не прерывает пересчет, а попадает в progress.errors.
+    """
+
+    def __init__(
+        self,
+        qdrant_api: AsyncQdrantAPI,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        concurrency: int = 8,
+        page_size: int = 100,
+        checkpoint_path: str | None = None,
+    ):
+        self.qdrant_api = qdrant_api
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.matcher = MatchingService(qdrant_api=qdrant_api)
+
+    async def run(self, collection: QdrantCollection) -> RecalcProgress:
+        """Пересчитать матчи всех сущностей коллекции"""
+        progress = self._load_checkpoint(collection)
+        if progress.done:
+            logger.info(f"Пересчет {collection.value} уже завершен")
+            return progress
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+
+        while True:
+            points, next_offset = await self.qdrant_api.client.scroll(
+                collection_name=collection.value,
+                scroll_filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="type",
+                            match=models.MatchValue(
+                                value=MembersDataType.SOFT_SKILL.value
+                            ),
+                        )
+                    ]
+                ),
+                limit=self.page_size,
+                offset=progress.offset,
+                with_payload=models.PayloadSelectorInclude(
+                    include=["employer_id", "vacancy_id", "user_id", "resume_id"]
+                ),
+                with_vectors=False,
+            )
+
+            results = await asyncio.gather(
+                *[
+                    self._match_one(collection, point.payload or {}, semaphore)
+                    for point in points
+                ]
+            )
+
+            new_matches: list[MatchCreate] = []
+            for result in results:
+                if isinstance(result, str):
+                    progress.failed += 1
+                    progress.errors = (progress.errors + [result])[-20:]
+                else:
+                    new_matches.extend(result)
+
+            await self._save(collection, new_matches)
+
+            progress.processed += len(points)
+            progress.saved += len(new_matches)
+            # Чекпоинт пишется в JSON: UUID-идентификатор точки храним строкой
+            progress.offset = (
+                next_offset
+                if next_offset is None or isinstance(next_offset, int)
+                else str(next_offset)
+            )
+            progress.done = next_offset is None
+            self._save_checkpoint(progress)
+
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Пересчет {collection.value}: обработано {progress.processed}, "
+                f"ошибок {progress.failed}, матчей {progress.saved}, "
+                f"{elapsed:.1f} c"
+            )
+
+            if progress.done:
+                return progress
+
+    async def _match_one(
+        self,
+        collection: QdrantCollection,
+        payload: dict,
+        semaphore: asyncio.Semaphore,
+    ) -> list[MatchCreate] | str:
+        """Матчи одной вакансии/резюме, при ошибке - ее текст"""
+        async with semaphore:
+            try:
+                if collection is QdrantCollection.EMPLOYERS:
+                    return await self.matcher.matches_for_vacancy(
+                        employer_id=payload.get("employer_id", 0),
+                        vacancy_id=payload.get("vacancy_id", 0),
+                    )
+                return await self.matcher.matches_for_resume(
+                    resume_id=payload.get("resume_id", 0),
+                    user_id=payload.get("user_id", 0),
+                )
+            except MatchingError as e:
+                return f"{payload}: {e}"
+            except Exception as e:
+                logger.error(f"Ошибка пересчета {payload}: {e}", exc_info=True)
+                return f"{payload}: {e}"
+
+    async def _save(self, collection: QdrantCollection, new_matches: list[MatchCreate]):
+        """Сохранить матчи страницы"""
+        if not new_matches:
+            return
+
+        score_delta = (
+            VACANCY_SCORE_DELTA
+            if collection is QdrantCollection.EMPLOYERS
+            else RESUME_SCORE_DELTA
+        )
+        async with self.session_factory() as db:
+            await self.matcher.save_matches(db, new_matches, score_delta)
+
+    def _load_checkpoint(self, collection: QdrantCollection) -> RecalcProgress:
+        """Прочитать checkpoint коллекции, если он есть"""
+        path = self._checkpoint_file(collection.value)
+        if path and path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            logger.info(
+                f"Продолжаем пересчет {collection.value} "
+                f"с {data.get('processed', 0)} обработанных"
+            )
+            return RecalcProgress(**data)
+        return RecalcProgress(collection=collection.value)
+
+    def clear_checkpoint(self, collection: QdrantCollection):
+        """Удалить checkpoint коллекции, следующий запуск начнет пересчет заново"""
+        path = self._checkpoint_file(collection.value)
+        if path:
+            path.unlink(missing_ok=True)
+
+    def _save_checkpoint(self, progress: RecalcProgress):
+        path = self._checkpoint_file(progress.collection)
+        if not path:
+            return
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(asdict(progress)), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def _checkpoint_file(self, collection_name: str) -> Path | None:
+        """Отдельный checkpoint на каждую коллекцию"""
+        if not self.checkpoint_path:
+            return None
+        return self.checkpoint_path.with_name(
+            f"{self.checkpoint_path.stem}_{collection_name}{self.checkpoint_path.suffix}"
+        )
+
+
+TARGETS = {
+    "vacancies": QdrantCollection.EMPLOYERS,
+    "resumes": QdrantCollection.CANDIDATES,
+}
+
+
+async def main(args: argparse.Namespace):
+    engine = BulkRecalcEngine(
+        qdrant_api=async_qdrant_api,
+        concurrency=args.concurrency,
+        page_size=args.page_size,
+        checkpoint_path=args.checkpoint,
+    )
+    collections = [TARGETS[target] for target in args.targets]
+    try:
+        if args.restart:
+            for collection in collections:
+                engine.clear_checkpoint(collection)
+        for collection in collections:
+            await engine.run(collection)
+        # Все коллекции пересчитаны - следующий запуск должен начать с начала,
+        # а не вернуть "уже завершен"
+        for collection in collections:
+            engine.clear_checkpoint(collection)
+    finally:
+        await async_qdrant_api.close()
+
+
+if __name__ == "__main__":
+    # Использование:
+    # python -m app.services.bulk_recalc vacancies resumes --concurrency 8
+    parser = argparse.ArgumentParser(description="Массовый пересчет матчей")
+    parser.add_argument("targets", nargs="+", choices=list(TARGETS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument(
+        "--checkpoint", default=None, help="checkpoint для продолжения пересчета"
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="игнорировать checkpoint и начать заново"
+    )
+
+    asyncio.run(main(parser.parse_args()))
@@ -10,7 +10,7 @@ router = APIRouter(tags=["candidate_vectorization", "employer_vectorization"])
 
 @router.post("/candidate_vectorization/")
 async def vectorize_candidate(candidate: CandidateVector):
-    embeddings = members_embedding_system.vectorize_candidate_data(candidate)
+    embeddings = await members_embedding_system.avectorize_candidates_data([candidate])
 
     candidate_embedding = CandidateEmbedding(embeddings=embeddings)
     return candidate_embedding
@@ -18,7 +18,7 @@ async def vectorize_candidate(candidate: CandidateVector):
 
 @router.post("/employer_vectorization/")
 async def vectorize_employer(employer: EmployerVector):
-    embeddings = members_embedding_system.vectorize_employer_data(employer)
+    embeddings = await members_embedding_system.avectorize_employers_data([employer])
 
     employer_embedding = EmployerEmbedding(embeddings=embeddings)
     return employer_embedding
@@ -1,10 +1,12 @@
-from typing import TypeVar, Type
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar, Type
 
 from numpy import ndarray
 from qdrant_client.http.models import Filter, models
 from app import config
-from app.config import MembersDataType
-from app.db.infrastructure.database import QdrantAPI
+from app.config import MembersDataType, settings
+from app.db.infrastructure.database import AsyncQdrantAPI
+from app.db.infrastructure.qdrant_schema import search_params
 from app.models.filter import SearchRequest
 from app.models.match import (
     EmployerMatch,
@@ -13,10 +15,20 @@ from app.models.match import (
 from app.utils.embeddings import MembersEmbeddingSystem
 from app.utils.filter.collection_resolver import CollectionResolver
 from app.utils.filter.filter_builder import QdrantFilterBuilder
-from app.utils.filter.score import FilterScore
+from app.utils.filter.result_cache import SearchCursor, SearchResultSetCache
+from app.utils.filter.search_cache import filters_key, normalize_filters, search_cache
+from app.utils.filter.score import (
+    FilterScore,
+    SearchRecord,
+    assemble_records,
+    record_payload_fields,
+)
 
 T = TypeVar("T", EmployerMatch, CandidateMatch)
 
+# Лучших точек (summary + skills) вакансии/резюме для среднего score
+SEARCH_GROUP_SIZE = 5
+
 
 class SearchError(Exception):
     """Ошибка при поиске совпадений."""
@@ -24,46 +36,70 @@ class SearchError(Exception):
     pass
 
 
-class SearchFilter:
-    def __init__(self, qdrant_api: QdrantAPI, entity_cls: Type[T]):
+@dataclass
+class SearchPage:
+    """Страница выдачи поиска, next_cursor - None на последней странице"""
+
+    items: list[SearchRecord] = field(default_factory=list)
+    next_cursor: str | None = None
+
+
+class SearchFilter(Generic[T]):
+    def __init__(self, qdrant_api: AsyncQdrantAPI, entity_cls: Type[T]):
         self.qdrant_api = qdrant_api
         self.entity_cls: Type[T] = entity_cls
 
-    async def _filter_search_entities(
+    async def _rank_entities(
         self,
         target_collection: str,
-        hard_vector_not: ndarray | None = None,
-        soft_vector_not: ndarray | None = None,
+        hard_vector_not: list[ndarray] | None = None,
+        soft_vector_not: list[ndarray] | None = None,
         soft_vector: ndarray | None = None,
         hard_vector: ndarray | None = None,
         soft_filter: Filter | None = None,
         hard_filter: Filter | None = None,
         similarity_threshold: float = 0.4,
-        top_k: int = 20,
+        top_k: int = 100,
         alpha: float = 0.8,
-    ) -> list[T]:
-        """Ищем данные по векторам и фильтрам"""
+    ) -> list[tuple[int, float]]:
+        """
+        Ищем данные по векторам и фильтрам, возвращаем (ключ, score) по убыванию.
+
+        Слияние hard/soft поисков и группировка по вакансии/резюме - одним запросом
+        без payload и векторов. Затем одним постраничным scroll читаются точки
+        найденных вакансий/резюме: только поля для подсчета score, а векторы -
+        только если нужны для штрафов must_not. Поля ответа читаются позже,
+        только для отдаваемой страницы.
+        """
+        _, entity_field = self.entity_cls.key_fields
 
-        # Получаем все записи удовлетворяющие фильтрам
-        complex_result = self.qdrant_api.client.query_points(
+        # top_k вакансий/резюме, до SEARCH_GROUP_SIZE лучших точек в каждой,
+        # но не больше SEARCH_PREFETCH_LIMIT точек на каждый из поисков
+        prefetch_limit = min(top_k * SEARCH_GROUP_SIZE, settings.SEARCH_PREFETCH_LIMIT)
+        groups_result = await self.qdrant_api.client.query_points_groups(
             collection_name=target_collection,
             query=models.FusionQuery(fusion=models.Fusion.DBSF),
             prefetch=[
                 models.Prefetch(
-                    query=hard_vector,
+                    query=hard_vector.tolist() if hard_vector is not None else None,
                     using=MembersDataType.HARD_SKILL.value,
                     filter=hard_filter,
-                    limit=100,
+                    params=search_params(MembersDataType.HARD_SKILL.value),
+                    limit=prefetch_limit,
                 ),
                 models.Prefetch(
-                    query=soft_vector,
+                    query=soft_vector.tolist() if soft_vector is not None else None,
                     using=MembersDataType.SOFT_SKILL.value,
                     filter=soft_filter,
-                    limit=100,
+                    params=search_params(MembersDataType.SOFT_SKILL.value),
+                    limit=prefetch_limit,
                 ),
             ],
-            limit=100,
-            with_vectors=True,
+            group_by=entity_field,
+            group_size=SEARCH_GROUP_SIZE,
+            limit=top_k,
+            with_payload=False,
+            with_vectors=False,
             query_filter=soft_filter,
         )
         # Будем очищать score, если нет поисковых запросов
@@ -77,43 +113,46 @@ class SearchFilter:
             )
             else False
         )
-        complex_scores: dict[set, list] = {}
-        key_seed: set[int] = set()
-        keys_must = []
-
-        key_name = await self.entity_cls().get_key_name_value()
-        key_name = key_name[0]
-
-        # Соберем ключи и score в одно место
-        for com in complex_result.points:
-            keys = await self.entity_cls(**com.payload).get_key_name_value()
-            complex_scores.setdefault(keys, []).append(com.score)
-            key_seed.add(keys[1])
-        else:
-            keys_must.append(
-                models.FieldCondition(
-                    key=key_name, match=models.MatchAny(any=list(key_seed))
-                )
-            )
-        # Получаем среднее score по ключу,
-        # соберем фильтр
-        averaged_scores: dict[int, float] = {}
-        for item_id, scores in complex_scores.items():
-            item_id_list = list(item_id)
-            averaged_scores[item_id_list[1]] = sum(scores) / len(scores)
 
-        result_filter = Filter(must=keys_must or None)
+        # Score вакансии/резюме - среднее DBSF-score ее лучших точек, не больше
+        # SEARCH_GROUP_SIZE. Раньше усреднялись все ее точки среди 100 лучших
+        # точек общего поиска: для ключа с не более чем SEARCH_GROUP_SIZE точками
+        # это то же среднее, у остальных слабые точки сверх лучших не учитываются
+        averaged_scores: dict[int, float] = {
+            int(group.id): sum(hit.score for hit in group.hits) / len(group.hits)
+            for group in groups_result.groups
+            if group.hits
+        }
+        if not averaged_scores:
+            return []
 
-        result_points = self.qdrant_api.client.scroll(
+        # Векторы нужны только для штрафов по сходству с must_not
+        vector_names = [
+            vector_name
+            for vector_name, vector_not in (
+                (MembersDataType.HARD_SKILL.value, hard_vector_not),
+                (MembersDataType.SOFT_SKILL.value, soft_vector_not),
+            )
+            if vector_not is not None
+        ]
+        result_points = await self.qdrant_api.scroll_all(
             collection_name=target_collection,
-            scroll_filter=result_filter,
-            with_payload=True,
-            with_vectors=True,
-            limit=100,
+            scroll_filter=Filter(
+                must=[
+                    models.FieldCondition(
+                        key=entity_field,
+                        match=models.MatchAny(any=list(averaged_scores)),
+                    )
+                ]
+            ),
+            with_payload=models.PayloadSelectorInclude(
+                include=FilterScore.score_payload_fields(self.entity_cls)
+            ),
+            with_vectors=vector_names or False,
         )
 
         score_util = FilterScore(
-            points=result_points[0],
+            points=result_points,
             hard_filter=hard_filter,
             soft_filter=soft_filter,
             hard_vector_not=hard_vector_not,
@@ -125,34 +164,113 @@ class SearchFilter:
 
         await score_util.calc_score()
 
-        return score_util.assemble_results(clear_score)
+        return score_util.ranked_scores(clear_score)
+
+    async def _page_records(
+        self, target_collection: str, ranked: list[tuple[int, float]]
+    ) -> list[SearchRecord]:
+        """Записи выдачи для страницы ranked: payload только ее вакансий/резюме"""
+        if not ranked:
+            return []
+        _, entity_field = self.entity_cls.key_fields
+        points = await self.qdrant_api.scroll_all(
+            collection_name=target_collection,
+            scroll_filter=Filter(
+                must=[
+                    models.FieldCondition(
+                        key=entity_field,
+                        match=models.MatchAny(any=[key for key, _ in ranked]),
+                    )
+                ]
+            ),
+            with_payload=models.PayloadSelectorInclude(
+                include=record_payload_fields(self.entity_cls)
+            ),
+            with_vectors=False,
+        )
+        return assemble_records(self.entity_cls, points, ranked)
 
     async def filter_search(
         self,
         search_request: SearchRequest,
-    ) -> list[T]:
-        """Поиск соответствующих работодателей/кандидатов"""
+        cursor: str | None = None,
+        page_size: int | None = None,
+    ) -> SearchPage:
+        """
+        Поиск соответствующих работодателей/кандидатов, постранично.
+
+        Без курсора считается полный ранжированный набор ключей со score
+        (до SEARCH_MAX_RESULTS) и кладется в кэш, с курсором страница режется
+        из кэша. Если набор вытеснен из кэша, он пересчитывается по тому же
+        запросу. Payload для ответа читается только для ключей страницы.
+        """
+        page_size = page_size or settings.SEARCH_PAGE_SIZE
+        search_request = SearchRequest(
+            filters=normalize_filters(search_request.filters)
+        )
+        request_hash = SearchCursor.hash_request(
+            self.entity_cls.__name__, filters_key(search_request.filters)
+        )
 
         target_collection = CollectionResolver.resolve(self.entity_cls)
+        results = None
+        offset = 0
+        if cursor:
+            try:
+                position = SearchCursor.decode(cursor)
+            except ValueError as e:
+                raise SearchError(str(e))
+            if position.request_hash != request_hash:
+                raise SearchError("Курсор относится к другому поисковому запросу")
+            results = search_result_cache.get(position.result_set_id)
+            result_set_id = position.result_set_id
+            offset = position.offset
+
+        if results is None:
+            results = await self._search(target_collection, search_request)
+            result_set_id = search_result_cache.put(results)
+
+        page = results[offset : offset + page_size]
+        items = await self._page_records(target_collection, page)
+        next_offset = offset + len(page)
+        next_cursor = None
+        if next_offset < len(results):
+            next_cursor = SearchCursor(
+                result_set_id=result_set_id,
+                request_hash=request_hash,
+                offset=next_offset,
+            ).encode()
+        return SearchPage(items=items, next_cursor=next_cursor)
+
+    async def _search(
+        self, target_collection: str, search_request: SearchRequest
+    ) -> list[tuple[int, float]]:
+        """Полный ранжированный набор (ключ, score), повторные запросы - из кэша"""
+        cache_key = await search_cache.akey(target_collection, search_request.filters)
+        results = await search_cache.aget(cache_key)
+        if results is not None:
+            return results
 
         filter_builder = QdrantFilterBuilder(
             config=config, embedding_system=MembersEmbeddingSystem()
         )
-        (
-            soft_filter,
-            hard_filter,
-            soft_vector,
-            hard_vector,
-            hard_vector_not,
-            soft_vector_not,
-        ) = await filter_builder.build(search_request)
-
-        return await self._filter_search_entities(
+        query = await filter_builder.build(search_request)
+
+        results = await self._rank_entities(
             target_collection=target_collection,
-            hard_vector_not=hard_vector_not,
-            soft_vector_not=soft_vector_not,
-            soft_vector=soft_vector,
-            hard_vector=hard_vector,
-            soft_filter=soft_filter,
-            hard_filter=hard_filter,
+            hard_vector_not=query.hard_vector_not,
+            soft_vector_not=query.soft_vector_not,
+            soft_vector=query.soft_vector,
+            hard_vector=query.hard_vector,
+            soft_filter=query.soft_filter,
+            hard_filter=query.hard_filter,
+            top_k=settings.SEARCH_MAX_RESULTS,
         )
+        await search_cache.aput(cache_key, results)
+        return results
+
+
+search_result_cache = SearchResultSetCache(
+    ttl=settings.SEARCH_RESULT_CACHE_TTL,
+    max_items=settings.SEARCH_RESULT_CACHE_SIZE,
+)
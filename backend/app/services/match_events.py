@@ -0,0 +1,410 @@
+# Инкрементальное обновление матчей по событиям изменения резюме/вакансий
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import MatchEventType, QdrantCollection, settings
+from app.db.domain.unit_of_work import UnitOfWork
+from app.db.infrastructure.database import (
+    AsyncQdrantAPI,
+    AsyncSessionLocal,
+    async_qdrant_api,
+)
+from app.models.match import MatchCreate
+from app.services.matching import (
+    MATCHES_TOP_K,
+    RESUME_SCORE_DELTA,
+    VACANCY_SCORE_DELTA,
+    MatchingError,
+    MatchingService,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MatchEvent:
+    """
+    Изменение резюме (CANDIDATES) или вакансии (EMPLOYERS).
+
+    owner_id - кандидат/работодатель, entity_id - резюме/вакансия.
+    Для удаления counterpart_ids - вакансии/резюме, у которых был матч с удаленной сущностью
+    """
+
+    type: MatchEventType
+    collection: QdrantCollection
+    owner_id: int
+    entity_id: int
+    counterpart_ids: list[int] = field(default_factory=list)
+
+    @property
+    def key(self) -> tuple:
+        return self.type, self.collection, self.entity_id
+
+
+class MatchEventBus:
+    """
+    Очередь изменений резюме/вакансий и фоновые обработчики.
+
+    При изменении сущности пересчитываются ее top_k матчей и матчи тех
+    вакансий/резюме, в чей top_k она теперь попадает или с которыми у нее был
+    матч вне нового top_k. Матч удаляется, только если он не входит в top_k
+    ни одной из сторон.
+    При удалении пересчитываются вакансии/резюме, у которых был матч с ней.
+    Повторные события по одной сущности, еще не взятые в работу, схлопываются.
+    """
+
+    def __init__(
+        self,
+        qdrant_api: AsyncQdrantAPI,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        workers: int = 2,
+        max_size: int = 10_000,
+        reverse_top_k: int = 50,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.max_size = max_size
+        self.reverse_top_k = reverse_top_k
+        self.matcher = MatchingService(qdrant_api=qdrant_api)
+        self._queue: asyncio.Queue[MatchEvent] | None = None
+        self._pending: set[tuple] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Запустить обработчики событий"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._consume(), name=f"match-events-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Обработчики событий матчей запущены: {self.workers}")
+
+    async def stop(self):
+        """Остановить обработчики, необработанные события теряются"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._pending.clear()
+        self._queue = None
+
+    async def join(self):
+        """Дождаться обработки всех событий в очереди"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def publish(self, event: MatchEvent):
+        """Поставить событие в очередь (без ожидания)"""
+        if self._queue is None:
+            return
+        if event.type is MatchEventType.UPSERTED and event.key in self._pending:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"Очередь событий матчей переполнена, пропущено {event}")
+            return
+        self._pending.add(event.key)
+
+    def resume_upserted(self, candidate_id: int, resume_id: int):
+        self.publish(
+            MatchEvent(
+                MatchEventType.UPSERTED,
+                QdrantCollection.CANDIDATES,
+                candidate_id,
+                resume_id,
+            )
+        )
+
+    def vacancy_upserted(self, employer_id: int, vacancy_id: int):
+        self.publish(
+            MatchEvent(
+                MatchEventType.UPSERTED,
+                QdrantCollection.EMPLOYERS,
+                employer_id,
+                vacancy_id,
+            )
+        )
+
+    def resume_deleted(self, candidate_id: int, resume_id: int, vacancy_ids: list[int]):
+        self.publish(
+            MatchEvent(
+                MatchEventType.DELETED,
+                QdrantCollection.CANDIDATES,
+                candidate_id,
+                resume_id,
+                vacancy_ids,
+            )
+        )
+
+    def vacancy_deleted(self, employer_id: int, vacancy_id: int, resume_ids: list[int]):
+        self.publish(
+            MatchEvent(
+                MatchEventType.DELETED,
+                QdrantCollection.EMPLOYERS,
+                employer_id,
+                vacancy_id,
+                resume_ids,
+            )
+        )
+
+    async def _consume(self):
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            event = await queue.get()
+            self._pending.discard(event.key)
+            try:
+                await self.handle(event)
+            except MatchingError as e:
+                logger.info(f"Матчи не обновлены для {event}: {e}")
+            except Exception as e:
+                logger.error(f"Ошибка обработки {event}: {e}", exc_info=True)
+            finally:
+                queue.task_done()
+
+    async def handle(self, event: MatchEvent):
+        """Обработать одно событие"""
+        match event.type, event.collection:
+            case MatchEventType.UPSERTED, QdrantCollection.CANDIDATES:
+                await self._resume_upserted(event.owner_id, event.entity_id)
+            case MatchEventType.UPSERTED, QdrantCollection.EMPLOYERS:
+                await self._vacancy_upserted(event.owner_id, event.entity_id)
+            case MatchEventType.DELETED, QdrantCollection.CANDIDATES:
+                await self._recalc_vacancies(event.counterpart_ids)
+            case MatchEventType.DELETED, QdrantCollection.EMPLOYERS:
+                await self._recalc_resumes(event.counterpart_ids)
+
+    async def _resume_upserted(self, candidate_id: int, resume_id: int):
+        """
+        Матчи резюме + вакансии, в чей top_k оно попадает.
+
+        Прежний матч резюме вне нового top_k удаляется, только если резюме
+        не входит и в новый top_k вакансии; такие вакансии пересчитываются
+        """
+        best_employers = await self.matcher.find_best_employers_for_candidate(
+            top_k=self.reverse_top_k,
+            alpha=0.8,
+            user_id=candidate_id,
+            resume_id=resume_id,
+        )
+
+        # top_k самого резюме - начало того же списка
+        own_matches = [
+            MatchCreate(
+                resume_id=resume_id,
+                vacancy_id=e.vacancy_id,
+                score=e.score,
+                is_new=True,
+            )
+            for e in best_employers[:MATCHES_TOP_K]
+        ]
+        own_ids = [m.vacancy_id for m in own_matches]
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            async with uow.transaction():
+                await uow.matches.upsert_many(own_matches, RESUME_SCORE_DELTA)
+            stale_ids = await uow.matches.get_vacancy_ids_for_resume_except(
+                resume_id, own_ids
+            )
+            employers = await uow.vacancies.get_employer_ids(stale_ids)
+
+        # top_k вакансий с прежним матчем - до удаления: матч, оставшийся
+        # в top_k вакансии, не пересоздается (id, created_at, is_new)
+        stale_tops = {
+            vacancy_id: await self._vacancy_top(employers[vacancy_id], vacancy_id)
+            for vacancy_id in stale_ids
+            if vacancy_id in employers
+        }
+        kept_ids = [
+            vacancy_id
+            for vacancy_id, top in stale_tops.items()
+            if top is None or any(m.resume_id == resume_id for m in top)
+        ]
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            async with uow.transaction():
+                await uow.matches.delete_for_resume_except(
+                    resume_id, own_ids + kept_ids
+                )
+        for vacancy_id, top in stale_tops.items():
+            if top is not None:
+                await self._save_vacancy(vacancy_id, top)
+
+        # Пороги - уже без устаревших матчей резюме
+        async with self.session_factory() as db:
+            floors = await UnitOfWork(db).matches.get_vacancy_score_floors(
+                [e.vacancy_id for e in best_employers], MATCHES_TOP_K
+            )
+        affected = [
+            e
+            for e in best_employers
+            if e.vacancy_id not in stale_tops
+            and (e.vacancy_id not in floors or e.score > floors[e.vacancy_id])
+        ]
+        for employer in affected:
+            await self._recalc_vacancy(employer.employer_id, employer.vacancy_id)
+
+    async def _vacancy_upserted(self, employer_id: int, vacancy_id: int):
+        """
+        Матчи вакансии + резюме, в чей top_k она попадает.
+
+        Прежний матч вакансии вне нового top_k удаляется, только если вакансия
+        не входит и в новый top_k резюме; такие резюме пересчитываются
+        """
+        best_candidates = await self.matcher.find_best_candidates_for_employer(
+            top_k=self.reverse_top_k,
+            alpha=0.8,
+            employer_id=employer_id,
+            vacancy_id=vacancy_id,
+        )
+
+        # top_k самой вакансии - начало того же списка
+        own_matches = [
+            MatchCreate(
+                resume_id=c.resume_id,
+                vacancy_id=vacancy_id,
+                score=c.score,
+                is_new=True,
+            )
+            for c in best_candidates[:MATCHES_TOP_K]
+        ]
+        own_ids = [m.resume_id for m in own_matches]
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            async with uow.transaction():
+                await uow.matches.upsert_many(own_matches, VACANCY_SCORE_DELTA)
+            stale_ids = await uow.matches.get_resume_ids_for_vacancy_except(
+                vacancy_id, own_ids
+            )
+            candidates = await uow.resumes.get_candidate_ids(stale_ids)
+
+        # top_k резюме с прежним матчем - до удаления: матч, оставшийся
+        # в top_k резюме, не пересоздается (id, created_at, is_new)
+        stale_tops = {
+            resume_id: await self._resume_top(candidates[resume_id], resume_id)
+            for resume_id in stale_ids
+            if resume_id in candidates
+        }
+        kept_ids = [
+            resume_id
+            for resume_id, top in stale_tops.items()
+            if top is None or any(m.vacancy_id == vacancy_id for m in top)
+        ]
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            async with uow.transaction():
+                await uow.matches.delete_for_vacancy_except(
+                    vacancy_id, own_ids + kept_ids
+                )
+        for resume_id, top in stale_tops.items():
+            if top is not None:
+                await self._save_resume(resume_id, top)
+
+        # Пороги - уже без устаревших матчей вакансии
+        async with self.session_factory() as db:
+            floors = await UnitOfWork(db).matches.get_resume_score_floors(
+                [c.resume_id for c in best_candidates], MATCHES_TOP_K
+            )
+        affected = [
+            c
+            for c in best_candidates
+            if c.resume_id not in stale_tops
+            and (c.resume_id not in floors or c.score > floors[c.resume_id])
+        ]
+        for candidate in affected:
+            await self._recalc_resume(candidate.user_id, candidate.resume_id)
+
+    async def _recalc_vacancies(self, vacancy_ids: list[int]):
+        """Пересчитать вакансии, потерявшие матч с удаленным резюме"""
+        async with self.session_factory() as db:
+            employers = await UnitOfWork(db).vacancies.get_employer_ids(vacancy_ids)
+        for vacancy_id in dict.fromkeys(vacancy_ids):
+            if vacancy_id in employers:
+                await self._recalc_vacancy(employers[vacancy_id], vacancy_id)
+
+    async def _recalc_resumes(self, resume_ids: list[int]):
+        """Пересчитать резюме, потерявшие матч с удаленной вакансией"""
+        async with self.session_factory() as db:
+            candidates = await UnitOfWork(db).resumes.get_candidate_ids(resume_ids)
+        for resume_id in dict.fromkeys(resume_ids):
+            if resume_id in candidates:
+                await self._recalc_resume(candidates[resume_id], resume_id)
+
+    async def _recalc_vacancy(self, employer_id: int, vacancy_id: int):
+        new_matches = await self._vacancy_top(employer_id, vacancy_id)
+        if new_matches is not None:
+            await self._save_vacancy(vacancy_id, new_matches)
+
+    async def _recalc_resume(self, candidate_id: int, resume_id: int):
+        new_matches = await self._resume_top(candidate_id, resume_id)
+        if new_matches is not None:
+            await self._save_resume(resume_id, new_matches)
+
+    async def _vacancy_top(
+        self, employer_id: int, vacancy_id: int
+    ) -> list[MatchCreate] | None:
+        """Новый top_k вакансии, None - если не посчитан"""
+        try:
+            return await self.matcher.matches_for_vacancy(
+                employer_id=employer_id, vacancy_id=vacancy_id
+            )
+        except MatchingError as e:
+            logger.info(f"Вакансия {vacancy_id} не пересчитана: {e}")
+            return None
+
+    async def _resume_top(
+        self, candidate_id: int, resume_id: int
+    ) -> list[MatchCreate] | None:
+        """Новый top_k резюме, None - если не посчитан"""
+        try:
+            return await self.matcher.matches_for_resume(
+                resume_id=resume_id, user_id=candidate_id
+            )
+        except MatchingError as e:
+            logger.info(f"Резюме {resume_id} не пересчитано: {e}")
+            return None
+
+    async def _save_vacancy(self, vacancy_id: int, new_matches: list[MatchCreate]):
+        """
+        top_k вакансии одной транзакцией. Прочие ее матчи удаляются,
+        кроме входящих в top_k своих резюме
+        """
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            async with uow.transaction():
+                await uow.matches.upsert_many(new_matches, VACANCY_SCORE_DELTA)
+                await uow.matches.delete_for_vacancy_except(
+                    vacancy_id, [m.resume_id for m in new_matches], MATCHES_TOP_K
+                )
+
+    async def _save_resume(self, resume_id: int, new_matches: list[MatchCreate]):
+        """
+        top_k резюме одной транзакцией. Прочие его матчи удаляются,
+        кроме входящих в top_k своих вакансий
+        """
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            async with uow.transaction():
+                await uow.matches.upsert_many(new_matches, RESUME_SCORE_DELTA)
+                await uow.matches.delete_for_resume_except(
+                    resume_id, [m.vacancy_id for m in new_matches], MATCHES_TOP_K
+                )
+
+
+match_event_bus = MatchEventBus(
+    qdrant_api=async_qdrant_api,
+    workers=settings.MATCH_EVENTS_WORKERS,
+    max_size=settings.MATCH_EVENTS_QUEUE_SIZE,
+    reverse_top_k=settings.MATCH_REVERSE_TOP_K,
+)
@@ -1,13 +1,14 @@
 # Логика матчинга (LLM + Qdrant)
-from datetime import datetime
 from typing import TypeVar, Type
 
-from qdrant_client.http.models import Filter
+import numpy as np
+from qdrant_client.http.models import Filter, models
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import QdrantCollection, MembersDataType
+from app.config import QdrantCollection, MembersDataType, MatchMode
 from app.db.domain.unit_of_work import UnitOfWork
-from app.db.infrastructure.database import QdrantAPI
+from app.db.infrastructure.database import AsyncQdrantAPI
+from app.db.infrastructure.qdrant_schema import search_params
 from app.models.match import (
     MatchCreate,
     CandidateMatch,
@@ -16,6 +17,16 @@ from app.models.match import (
 
 T = TypeVar("T", EmployerMatch, CandidateMatch)
 
+# Максимум точек (summary + skills) одной вакансии/резюме
+SOURCE_POINTS_LIMIT = 500
+
+# Число матчей, хранимых для одной вакансии/резюме
+MATCHES_TOP_K = 10
+
+# Минимальное изменение score, при котором матч обновляется и помечается новым
+RESUME_SCORE_DELTA = 0.01
+VACANCY_SCORE_DELTA = 0.05
+
 
 class MatchingError(Exception):
     """Ошибка при поиске совпадений."""
@@ -24,7 +35,7 @@ class MatchingError(Exception):
 
 
 class MatchingService:
-    def __init__(self, qdrant_api: QdrantAPI):
+    def __init__(self, qdrant_api: AsyncQdrantAPI):
         self.qdrant_api = qdrant_api
         self.candidate_best_matches: list[CandidateMatch] = []
         self.employer_best_matches: list[EmployerMatch] = []
@@ -37,6 +48,7 @@ class MatchingService:
         hard_filter: Filter | None = None,
         top_k=10,
         alpha=0.7,
+        mode: MatchMode = MatchMode.CLIENT,
     ) -> list[CandidateMatch]:
         return await self._match_entities(
             source_collection=QdrantCollection.EMPLOYERS.value,
@@ -47,6 +59,7 @@ class MatchingService:
             hard_filter=hard_filter,
             top_k=top_k,
             alpha=alpha,
+            mode=mode,
         )
 
     async def find_best_employers_for_candidate(
@@ -57,6 +70,7 @@ class MatchingService:
         hard_filter: Filter | None = None,
         top_k=10,
         alpha=0.8,
+        mode: MatchMode = MatchMode.CLIENT,
     ) -> list[EmployerMatch]:
         return await self._match_entities(
             source_collection=QdrantCollection.CANDIDATES.value,
@@ -67,6 +81,7 @@ class MatchingService:
             hard_filter=hard_filter,
             top_k=top_k,
             alpha=alpha,
+            mode=mode,
         )
 
     async def _collect_vectors(self, points):
@@ -91,14 +106,15 @@ class MatchingService:
         hard_filter: Filter | None = None,
         top_k=10,
         alpha=0.8,
+        mode: MatchMode = MatchMode.CLIENT,
     ) -> list[T]:
         """Универсальный метод для поиска совпадений (candidates <-> employers)"""
 
         # достаём entity (работодатель или кандидат)
         # нужны embeddings для матча
-        source_points = self.qdrant_api.scroll(
+        source_points = await self.qdrant_api.scroll(
             collection_name=source_collection,
-            limit=20,
+            limit=SOURCE_POINTS_LIMIT,
             **source_filter,
         )
 
@@ -114,119 +130,240 @@ class MatchingService:
                 "Matching error: Entity does not have both hard and soft skills"
             )
 
-        # результаты поиска
-        scores: dict[str, float] = {}
-        matches: dict[str, T] = {}
-        search_counter = {}
-
-        # ищем по hard skills
-        for hard in hard_vectors:
-            result = self.qdrant_api.client.query_points(
-                collection_name=target_collection,
-                query=hard,
-                using=MembersDataType.HARD_SKILL.value,
-                query_filter=hard_filter,
+        if mode is MatchMode.SERVER:
+            return await self._match_entities_server(
+                target_collection=target_collection,
+                hard_vectors=hard_vectors,
+                soft_vectors=soft_vectors,
+                entity_cls=entity_cls,
+                soft_filter=soft_filter,
+                hard_filter=hard_filter,
+                top_k=top_k,
+                alpha=alpha,
+            )
+
+        # Все поиски по hard и soft skills - одним batch-запросом
+        payload_selector = models.PayloadSelectorInclude(
+            include=entity_cls.match_payload_fields
+        )
+        requests = [
+            models.QueryRequest(
+                query=vector,
+                using=vector_name,
+                filter=query_filter,
+                params=search_params(vector_name),
                 limit=100,
-                with_vectors=False,
-                with_payload=True,
+                with_vector=False,
+                with_payload=payload_selector,
             )
-            for res in result.points:
-                complex_key = await entity_cls(**res.payload).get_complex_key()
-                if complex_key not in matches:
-                    matches[complex_key] = entity_cls(**res.payload, id=complex_key)
-                    search_counter[complex_key] = 0
-                scores[complex_key] = scores.get(complex_key, 0) + res.score * alpha
-                search_counter[complex_key] += 1
-
-        # ищем по soft skills
-        for soft in soft_vectors:
-            # Ищем работодателей по soft_skill
-            result = self.qdrant_api.client.query_points(
-                collection_name=target_collection,
-                query=soft,
-                using=MembersDataType.SOFT_SKILL.value,
-                query_filter=soft_filter,
+            for vectors, vector_name, query_filter in (
+                (hard_vectors, MembersDataType.HARD_SKILL.value, hard_filter),
+                (soft_vectors, MembersDataType.SOFT_SKILL.value, soft_filter),
+            )
+            for vector in vectors
+        ]
+        responses = await self.qdrant_api.client.query_batch_points(
+            collection_name=target_collection, requests=requests
+        )
+
+        # Первые ответы - по hard skills, остальные - по soft skills
+        weights = [alpha] * len(hard_vectors) + [1 - alpha] * len(soft_vectors)
+        return self._aggregate_scores(responses, weights, entity_cls, top_k)
+
+    async def _match_entities_server(
+        self,
+        target_collection: str,
+        hard_vectors: list,
+        soft_vectors: list,
+        entity_cls: Type[T],
+        soft_filter: Filter | None = None,
+        hard_filter: Filter | None = None,
+        top_k=10,
+        alpha=0.8,
+    ) -> list[T]:
+        """
+        Матчинг одним запросом: prefetch по каждому вектору,
+        взвешенный RRF и группировка по вакансии/резюме на стороне Qdrant.
+
+        score здесь ранговый (RRF), а не косинусный, и несравним с режимом CLIENT -
+        режим только для сравнения выдачи, в matches такие score не сохраняются
+        """
+        owner_field, entity_field = entity_cls.key_fields
+
+        prefetch = [
+            models.Prefetch(
+                query=vector,
+                using=vector_name,
+                filter=query_filter,
+                params=search_params(vector_name),
                 limit=100,
-                with_vectors=False,
-                with_payload=True,
             )
-            for res in result.points:
-                complex_key = await entity_cls(**res.payload).get_complex_key()
-                if complex_key not in matches:
-                    matches[complex_key] = entity_cls(**res.payload, id=complex_key)
-                    search_counter[complex_key] = 0
-                scores[complex_key] = scores.get(complex_key, 0) + res.score * (
-                    1 - alpha
+            for vectors, vector_name, query_filter in (
+                (hard_vectors, MembersDataType.HARD_SKILL.value, hard_filter),
+                (soft_vectors, MembersDataType.SOFT_SKILL.value, soft_filter),
+            )
+            for vector in vectors
+        ]
+        weights = [alpha] * len(hard_vectors) + [1 - alpha] * len(soft_vectors)
+
+        result = await self.qdrant_api.client.query_points_groups(
+            collection_name=target_collection,
+            prefetch=prefetch,
+            query=models.RrfQuery(rrf=models.Rrf(weights=weights)),
+            group_by=entity_field,
+            group_size=1,
+            limit=top_k,
+            with_payload=models.PayloadSelectorInclude(
+                include=entity_cls.match_payload_fields
+            ),
+        )
+
+        matches: list[T] = []
+        for group in result.groups:
+            if not group.hits:
+                continue
+            hit = group.hits[0]
+            payload = hit.payload or {}
+            matches.append(
+                entity_cls(
+                    **payload,
+                    id=f"{payload.get(owner_field, 0)}_{payload.get(entity_field, 0)}",
+                    score=hit.score,
                 )
-                search_counter[complex_key] += 1
+            )
+        return matches
+
+    @staticmethod
+    def _aggregate_scores(
+        responses: list[models.QueryResponse],
+        weights: list[float],
+        entity_cls: Type[T],
+        top_k: int,
+    ) -> list[T]:
+        """
+        Агрегация score по (владелец, вакансия/резюме) на NumPy.
+
+        Итоговый score - среднее взвешенных score всех попаданий сущности,
+        чтобы не было перекосов, если у кого одних векторов больше чем других.
+        Модели создаются только для top_k.
+        """
+        owner_field, entity_field = entity_cls.key_fields
+
+        owner_ids: list[int] = []
+        entity_ids: list[int] = []
+        scores: list[float] = []
+        payloads: list[dict] = []
+        for result, weight in zip(responses, weights):
+            for res in result.points:
+                payload = res.payload or {}
+                owner_ids.append(payload.get(owner_field, 0))
+                entity_ids.append(payload.get(entity_field, 0))
+                scores.append(res.score * weight)
+                payloads.append(payload)
 
-        # проставляем итоговые score
-        for m in matches.values():
-            m.score = scores.get(m.id, 0)
-            # Усредним оценку, чтобы не было перекосов, если у кого одних векторов больше чем других
-            if search_counter[m.id] > 0:
-                m.score /= search_counter[m.id]
+        if not scores:
+            return []
+
+        keys = np.column_stack((owner_ids, entity_ids))
+        unique_keys, first_index, inverse = np.unique(
+            keys, axis=0, return_index=True, return_inverse=True
+        )
+        inverse = inverse.ravel()
+        mean_scores = np.bincount(inverse, weights=scores) / np.bincount(inverse)
 
         # сортировка и top_k
-        return sorted(matches.values(), key=lambda x: x.score, reverse=True)[:top_k]
+        top = np.argsort(-mean_scores, kind="stable")[:top_k]
+        return [
+            entity_cls(
+                **payloads[first_index[i]],
+                id=f"{unique_keys[i][0]}_{unique_keys[i][1]}",
+                score=float(mean_scores[i]),
+            )
+            for i in top
+        ]
 
-    async def recalc_matches_for_resume(
-        self, resume_id: int, user_id: int, db: AsyncSession
+    async def matches_for_resume(
+        self, resume_id: int, user_id: int
+    ) -> list[MatchCreate]:
+        """
+        Строки матчей резюме с лучшими вакансиями.
+        Всегда режим CLIENT: в matches хранятся только косинусные score
+        """
+        best_employers = await self.find_best_employers_for_candidate(
+            top_k=MATCHES_TOP_K,
+            alpha=0.8,
+            user_id=user_id,
+            resume_id=resume_id,
+        )
+        return [
+            MatchCreate(
+                resume_id=resume_id,
+                vacancy_id=employer.vacancy_id,
+                score=employer.score,
+                is_new=True,
+            )
+            for employer in best_employers
+        ]
+
+    async def matches_for_vacancy(
+        self, employer_id: int, vacancy_id: int
+    ) -> list[MatchCreate]:
+        """
+        Строки матчей вакансии с лучшими резюме.
+        Всегда режим CLIENT: в matches хранятся только косинусные score
+        """
+        best_candidates = await self.find_best_candidates_for_employer(
+            top_k=MATCHES_TOP_K,
+            alpha=0.8,
+            employer_id=employer_id,
+            vacancy_id=vacancy_id,
+        )
+        return [
+            MatchCreate(
+                resume_id=candidate.resume_id,
+                vacancy_id=vacancy_id,
+                score=candidate.score,
+                is_new=True,
+            )
+            for candidate in best_candidates
+        ]
+
+    @staticmethod
+    async def save_matches(
+        db: AsyncSession, new_matches: list[MatchCreate], score_delta: float
     ):
+        """
+        Сохранить матчи одной транзакцией.
+        Существующий матч обновляется, только если score изменился больше score_delta
+        """
         uow = UnitOfWork(db)
 
+        async with uow.transaction():
+            await uow.matches.upsert_many(new_matches, score_delta)
+
+    async def recalc_matches_for_resume(
+        self,
+        resume_id: int,
+        user_id: int,
+        db: AsyncSession,
+    ):
         # получаем лучших работодателей
-        best_employers = await self.find_best_employers_for_candidate(
-            top_k=10, alpha=0.8, user_id=user_id, resume_id=resume_id
+        new_matches = await self.matches_for_resume(
+            resume_id=resume_id, user_id=user_id
         )
-
-        async with uow.transaction():
-            for employer in best_employers:
-                match_ = await uow.matches.get_by_resume_vacancy(
-                    vacancy_id=employer.vacancy_id, resume_id=resume_id
-                )
-                if match_:
-                    if abs(match_.score - employer.score) > 0.01:
-                        match_.score = employer.score
-                        match_.is_new = True
-                else:
-                    await uow.matches.add(
-                        MatchCreate(
-                            resume_id=resume_id,
-                            vacancy_id=employer.vacancy_id,
-                            score=employer.score,
-                            updated_at=datetime.now(),
-                            is_new=True,
-                        )
-                    )
+        await self.save_matches(db, new_matches, RESUME_SCORE_DELTA)
 
     async def recalc_matches_for_vacancy(
-        self, employer_id: int, vacancy_id: int, db: AsyncSession
+        self,
+        employer_id: int,
+        vacancy_id: int,
+        db: AsyncSession,
     ):
-        uow = UnitOfWork(db)
-
         # получаем лучших кандидатов
-        best_candidates = await self.find_best_candidates_for_employer(
-            top_k=10, alpha=0.8, employer_id=employer_id, vacancy_id=vacancy_id
+        new_matches = await self.matches_for_vacancy(
+            employer_id=employer_id, vacancy_id=vacancy_id
         )
-
-        async with uow.transaction():
-            for candidate in best_candidates:
-                match_ = await uow.matches.get_by_resume_vacancy(
-                    vacancy_id=vacancy_id, resume_id=candidate.resume_id
-                )
-                if match_:
-                    if abs(match_.score - candidate.score) > 0.05:
-                        match_.score = candidate.score
-                        match_.is_new = True
-                else:
-                    new_match = MatchCreate(
-                        resume_id=candidate.resume_id,
-                        vacancy_id=vacancy_id,
-                        score=candidate.score,
-                        is_new=True,
-                    )
-                    await uow.matches.add(new_match)
+        await self.save_matches(db, new_matches, VACANCY_SCORE_DELTA)
 
 
 # async def match():
@@ -5,45 +5,27 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import QdrantCollection
 from app.db.domain.unit_of_work import UnitOfWork
-from app.db.infrastructure.database import qdrant_api
 from app.db.infrastructure.orm import CandidateORM, EmployerORM
 from app.models.candidate import (
     CandidateCreate,
-    CandidateEmbedding,
     ResumeUpsert,
-    ResumeBase,
     ResumeSkillBase,
-    CandidateVector,
     ResumeCreate,
     CandidateBase,
 )
 from app.models.employer import (
     EmployerCreate,
-    EmployerEmbedding,
     EmployerVacancyUpsert,
-    VacancyBase,
     VacancySkill,
-    EmployerVector,
     VacancyCreate,
     EmployerBase,
 )
-from app.services.embeddings import vectorize_candidate, vectorize_employer
+from app.models.job import VectorizationJobCreate
+from app.services.vectorization_worker import vectorization_worker
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Создание коллекций
-for collection in QdrantCollection:
-    collection_name = collection.value
-
-    vector_size = 0
-
-    if qdrant_api.client.collection_exists(collection_name):
-        continue
-
-    if not qdrant_api.create_collection(collection_name):
-        logger.error(f"Error creating collection {collection_name}")
-
 
 async def register_candidate(
     candidate: CandidateCreate, db: AsyncSession
@@ -92,31 +74,26 @@ async def upsert_resume(
         if not resume:
             raise Exception("Upsert resume: Resume not found")
 
-        # Удаление скиллов из БД и Qdrant
+        # Замена скиллов в БД, векторы пересоздаст воркер векторизации
         if skills:
             await uow.resume_skills.remove_skills_by_resume_id(resume.id)
 
-            await qdrant_api.remove_candidate_skills(candidate.id, resume.id)
-
             # Добавление скиллов
             for skill in skills:
                 if skill.resume_id == resume.id:
                     await uow.resume_skills.add(skill)
 
-        # векторизация
-        embedding: CandidateEmbedding = await vectorize_candidate(
-            CandidateVector(
-                **candidate.model_dump(exclude={"resumes", "skills"}),
-                resumes=[ResumeBase(**resume.model_dump())],
-                skills=skills,
+        job = await uow.vectorization_jobs.add(
+            VectorizationJobCreate(
+                collection=QdrantCollection.CANDIDATES.value,
+                owner_id=candidate.id,
+                entity_id=resume.id,
             )
         )
-        # добавление векторов в Qdrant
-        qdrant_api.add_vectors(
-            collection_name=QdrantCollection.CANDIDATES.value,
-            vectors=embedding.embeddings,
-        )
-    return resume
+        await uow.session.flush()
+
+    vectorization_worker.notify()
+    return resume, job
 
 
 async def register_employer(employer: EmployerCreate, db: AsyncSession) -> EmployerORM:
@@ -161,28 +138,23 @@ async def upsert_vacancy(
         if not vacancy:
             raise Exception("Upsert vacancy: Vacancy not found")
 
-        # Удаление скиллов из БД и Qdrant
+        # Замена скиллов в БД, векторы пересоздаст воркер векторизации
         if skills:
             await uow.vacancy_skills.remove_skills_by_vacancy_id(vacancy.id)
 
-            await qdrant_api.remove_employer_skills(employer.id, vacancy.id)
-
             # Добавление скиллов
             for skill in skills:
                 if skill.vacancy_id == vacancy.id:
                     await uow.vacancy_skills.add(skill)
 
-        # векторизация
-        embedding: EmployerEmbedding = await vectorize_employer(
-            EmployerVector(
-                **employer.model_dump(exclude={"vacancies", "skills"}),
-                vacancies=[VacancyBase(**vacancy.model_dump())],
-                skills=skills,
+        job = await uow.vectorization_jobs.add(
+            VectorizationJobCreate(
+                collection=QdrantCollection.EMPLOYERS.value,
+                owner_id=employer.id,
+                entity_id=vacancy.id,
             )
         )
-        # добавление векторов в Qdrant
-        qdrant_api.add_vectors(
-            collection_name=QdrantCollection.EMPLOYERS.value,
-            vectors=embedding.embeddings,
-        )
-    return vacancy
+        await uow.session.flush()
+
+    vectorization_worker.notify()
+    return vacancy, job
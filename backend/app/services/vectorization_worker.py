@@ -0,0 +1,326 @@
+# Фоновая векторизация резюме/вакансий из очереди задач в БД
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import QdrantCollection, settings
+from app.db.domain.unit_of_work import UnitOfWork
+from app.db.infrastructure.database import (
+    AsyncQdrantAPI,
+    AsyncSessionLocal,
+    async_qdrant_api,
+)
+from app.models.candidate import (
+    CandidateBase,
+    CandidateVector,
+    ResumeBase,
+    ResumeCreate,
+    ResumeSkillBase,
+)
+from app.models.employer import (
+    EmployerBase,
+    EmployerVector,
+    VacancyBase,
+    VacancyCreate,
+    VacancySkill,
+)
+from app.models.match import CandidateMatch, EmployerMatch
+from app.services.match_events import match_event_bus
+from app.utils.embeddings import PointDraft, members_embedding_system
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class VectorizationWorker:
+    """
+    Обработчик очереди vectorization_jobs.
+
+    Запрос на запись резюме/вакансии только сохраняет данные и ставит задачу,
+    воркер забирает задачи пачками (SELECT ... FOR UPDATE SKIP LOCKED),
+    векторизует только измененные тексты всех сущностей пачки одним вызовом модели
+    и пишет их одним upsert в Qdrant.
+    Упавшие задачи возвращаются в очередь до max_attempts попыток.
+    """
+
+    def __init__(
+        self,
+        qdrant_api: AsyncQdrantAPI,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        batch_size: int = 32,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+        job_timeout: int = 300,
+    ):
+        self.qdrant_api = qdrant_api
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.job_timeout = job_timeout
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        """Вернуть зависшие задачи в очередь и запустить обработку"""
+        if self._task is not None:
+            return
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            async with uow.transaction():
+                requeued = await uow.vectorization_jobs.requeue_stale(
+                    datetime.now() - timedelta(seconds=self.job_timeout)
+                )
+        if requeued:
+            logger.info(f"Возвращено в очередь зависших задач векторизации: {requeued}")
+
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._loop(), name="vectorization-worker")
+
+    async def stop(self):
+        """Остановить обработку, незавершенные задачи вернутся в очередь по таймауту"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def notify(self):
+        """Разбудить воркер, не дожидаясь следующего опроса"""
+        self._wakeup.set()
+
+    async def _loop(self):
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                logger.error(
+                    f"Ошибка обработки очереди векторизации: {e}", exc_info=True
+                )
+                processed = 0
+
+            # Полная пачка - в очереди, скорее всего, есть еще задачи
+            if processed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_once(self) -> int:
+        """Обработать одну пачку задач, вернуть число задач в ней"""
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            async with uow.transaction():
+                jobs = await uow.vectorization_jobs.claim_pending(self.batch_size)
+                claimed = [(job.id, job.collection, job.entity_id) for job in jobs]
+
+        if not claimed:
+            return 0
+
+        by_collection: dict[str, list[tuple[int, int]]] = {}
+        for job_id, collection, entity_id in claimed:
+            by_collection.setdefault(collection, []).append((job_id, entity_id))
+
+        for collection, jobs in by_collection.items():
+            job_ids = [job_id for job_id, _ in jobs]
+            # Несколько задач на одну сущность векторизуются один раз
+            entity_ids = list(dict.fromkeys(entity_id for _, entity_id in jobs))
+            try:
+                await self._vectorize(QdrantCollection(collection), entity_ids)
+            except Exception as e:
+                logger.error(
+                    f"Ошибка векторизации {collection} {entity_ids}: {e}",
+                    exc_info=True,
+                )
+                await self._finish(job_ids, error=str(e))
+                continue
+            await self._finish(job_ids)
+
+        return len(claimed)
+
+    async def _finish(self, job_ids: list[int], error: str | None = None):
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            async with uow.transaction():
+                if error is None:
+                    await uow.vectorization_jobs.finish(job_ids)
+                else:
+                    await uow.vectorization_jobs.fail(job_ids, error, self.max_attempts)
+
+    async def _vectorize(self, collection: QdrantCollection, entity_ids: list[int]):
+        """Обновить точки Qdrant для резюме/вакансий"""
+        if collection is QdrantCollection.CANDIDATES:
+            await self._vectorize_resumes(entity_ids)
+        else:
+            await self._vectorize_vacancies(entity_ids)
+
+    async def _vectorize_resumes(self, resume_ids: list[int]):
+        async with self.session_factory() as db:
+            resumes = await UnitOfWork(db).resumes.get_for_vectorization(resume_ids)
+            candidates = [
+                CandidateVector(
+                    **CandidateBase.model_validate(resume.candidate).model_dump(),
+                    resumes=[
+                        ResumeBase(**ResumeCreate.model_validate(resume).model_dump())
+                    ],
+                    skills=[ResumeSkillBase.model_validate(s) for s in resume.skills],
+                )
+                for resume in resumes
+                if resume.candidate is not None
+            ]
+        if not candidates:
+            return
+
+        entities = [(c.id, c.resumes[0].id) for c in candidates]
+        changed = await self._sync_points(
+            QdrantCollection.CANDIDATES,
+            CandidateMatch.key_fields,
+            members_embedding_system.candidates_point_drafts(candidates),
+            entities,
+        )
+        changed -= await self._drop_deleted(QdrantCollection.CANDIDATES, entities)
+        for candidate_id, resume_id in changed:
+            match_event_bus.resume_upserted(candidate_id, resume_id)
+
+    async def _vectorize_vacancies(self, vacancy_ids: list[int]):
+        async with self.session_factory() as db:
+            vacancies = await UnitOfWork(db).vacancies.get_for_vectorization(
+                vacancy_ids
+            )
+            employers = [
+                EmployerVector(
+                    **EmployerBase.model_validate(vacancy.employer).model_dump(),
+                    vacancies=[
+                        VacancyBase(
+                            **VacancyCreate.model_validate(vacancy).model_dump()
+                        )
+                    ],
+                    skills=[VacancySkill.model_validate(s) for s in vacancy.skills],
+                )
+                for vacancy in vacancies
+                if vacancy.employer is not None
+            ]
+        if not employers:
+            return
+
+        entities = [(e.id, e.vacancies[0].id) for e in employers]
+        changed = await self._sync_points(
+            QdrantCollection.EMPLOYERS,
+            EmployerMatch.key_fields,
+            members_embedding_system.employers_point_drafts(employers),
+            entities,
+        )
+        changed -= await self._drop_deleted(QdrantCollection.EMPLOYERS, entities)
+        for employer_id, vacancy_id in changed:
+            match_event_bus.vacancy_upserted(employer_id, vacancy_id)
+
+    async def _sync_points(
+        self,
+        collection: QdrantCollection,
+        key_fields: tuple[str, str],
+        drafts: list[PointDraft],
+        entities: list[tuple[int, int]],
+    ) -> set[tuple[int, int]]:
+        """
+        Привести точки сущностей к drafts с минимумом работы.
+
+        Текст не изменился (тот же content_hash) - векторизация не нужна,
+        при изменении остального payload он заменяется без векторов.
+        Точки, которых нет в drafts, удаляются.
+        Возвращает сущности (owner_id, entity_id), у которых изменились векторы.
+        """
+        owner_field, entity_field = key_fields
+        current: dict[str, dict] = {}
+        for payloads in await asyncio.gather(
+            *[
+                self.qdrant_api.entity_payloads(
+                    collection.value,
+                    **{owner_field: owner_id, entity_field: entity_id},
+                )
+                for owner_id, entity_id in entities
+            ]
+        ):
+            current.update(payloads)
+
+        to_encode: list[PointDraft] = []
+        to_overwrite: dict[str, dict] = {}
+        for draft in drafts:
+            payload = current.get(draft.id)
+            if (
+                payload is None
+                or payload.get("content_hash") != draft.payload["content_hash"]
+            ):
+                to_encode.append(draft)
+            elif payload != draft.payload:
+                to_overwrite[draft.id] = draft.payload
+        draft_ids = {draft.id for draft in drafts}
+        stale = [id_ for id_ in current if id_ not in draft_ids]
+
+        if to_encode:
+            points = await members_embedding_system.aencode_drafts(to_encode)
+            await self.qdrant_api.add_vectors(
+                collection_name=collection.value, vectors=points
+            )
+        if to_overwrite:
+            await self.qdrant_api.overwrite_payloads(collection.value, to_overwrite)
+        if stale:
+            await self.qdrant_api.delete_points(collection.value, stale)
+
+        logger.info(
+            f"Векторизация {collection.value}: новых/измененных точек {len(to_encode)}, "
+            f"payload {len(to_overwrite)}, удалено {len(stale)}, "
+            f"без изменений {len(drafts) - len(to_encode) - len(to_overwrite)}"
+        )
+
+        changed = {(d.payload[owner_field], d.payload[entity_field]) for d in to_encode}
+        changed.update(
+            (current[id_].get(owner_field), current[id_].get(entity_field))
+            for id_ in stale
+        )
+        return changed
+
+    async def _drop_deleted(
+        self, collection: QdrantCollection, entities: list[tuple[int, int]]
+    ) -> set[tuple[int, int]]:
+        """
+        Удалить точки сущностей, которые удалили из БД, пока шла векторизация.
+
+        Запрос на удаление мог убрать точки до нашего upsert, тогда без этой
+        проверки в Qdrant остались бы точки несуществующего резюме/вакансии.
+        Возвращает удаленные сущности (owner_id, entity_id).
+        """
+        entity_ids = [entity_id for _, entity_id in entities]
+        remove: Callable[[int, int], Awaitable[Any]]
+        async with self.session_factory() as db:
+            uow = UnitOfWork(db)
+            if collection is QdrantCollection.CANDIDATES:
+                existing = await uow.resumes.get_existing_ids(entity_ids)
+                remove = self.qdrant_api.remove_candidate_skills
+            else:
+                existing = await uow.vacancies.get_existing_ids(entity_ids)
+                remove = self.qdrant_api.remove_employer_skills
+
+        deleted = {entity for entity in entities if entity[1] not in existing}
+        if deleted:
+            await asyncio.gather(
+                *[remove(owner_id, entity_id) for owner_id, entity_id in deleted]
+            )
+            logger.info(
+                f"Векторизация {collection.value}: удалены точки сущностей, "
+                f"удаленных во время обработки: {sorted(deleted)}"
+            )
+        return deleted
+
+
+vectorization_worker = VectorizationWorker(
+    qdrant_api=async_qdrant_api,
+    batch_size=settings.VECTORIZATION_BATCH_SIZE,
+    poll_interval=settings.VECTORIZATION_POLL_INTERVAL,
+    max_attempts=settings.VECTORIZATION_MAX_ATTEMPTS,
+    job_timeout=settings.VECTORIZATION_JOB_TIMEOUT,
+)
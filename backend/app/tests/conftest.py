@@ -0,0 +1,26 @@
+"""
+Общие фикстуры тестов
+"""
+
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Настройки по умолчанию до импорта app: любой модуль тестов собирается сам по себе,
+# без настоящих моделей векторизации и кэша эмбеддингов на диске
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./test.db")
+os.environ.setdefault("EMBEDDING_STUB", "true")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+from app.db.infrastructure.orm import Base
+
+
+@pytest.fixture
+async def engine():
+    """Пустая in-memory SQLite со всеми таблицами ORM"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
@@ -0,0 +1,214 @@
+"""
+Тесты инфраструктуры векторизации: кэш, реестр моделей, микробатчинг, id точек
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app import config
+from app.config import MembersDataType
+from app.utils.embedding_cache import EmbeddingCache
+from app.models.candidate import CandidateVector, ResumeBase, ResumeSkillBase
+from app.utils import embeddings
+from app.utils.embedding_coalescer import EmbeddingCoalescer
+from app.utils.embeddings import MembersEmbeddingSystem
+from app.utils.model_registry import ModelRegistry, StubEncoder
+
+
+def test_cache_miss_then_hit():
+    cache = EmbeddingCache()
+
+    assert cache.get_many("model", ["python, backend"]) == [None]
+
+    cache.put_many("model", ["python, backend"], np.ones((1, 4)))
+    result = cache.get_many("model", ["python,  backend "])
+
+    assert np.allclose(result[0], np.ones(4))
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_key_depends_on_model():
+    cache = EmbeddingCache()
+    cache.put_many("soft", ["text"], np.ones((1, 4)))
+
+    assert cache.get_many("hard", ["text"]) == [None]
+
+
+def test_cache_lru_eviction():
+    cache = EmbeddingCache(max_items=2)
+    cache.put_many("model", ["a", "b", "c"], np.eye(3))
+
+    assert cache.get_many("model", ["a"]) == [None]
+    assert cache.stats()["memory_items"] == 2
+
+
+def test_cache_persists_on_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(path=path).put_many("model", ["sql"], np.full((1, 3), 0.5))
+
+    result = EmbeddingCache(path=path).get_many("model", ["sql"])
+
+    assert result[0].dtype == np.float32
+    assert np.allclose(result[0], 0.5)
+
+
+def test_registry_loads_lazily():
+    registry = ModelRegistry(use_stub=True)
+    registry.register("hard", dimension=8)
+
+    assert not registry.is_loaded("hard")
+
+    model = registry.get("hard")
+
+    assert registry.is_loaded("hard")
+    assert registry.get("hard") is model
+    assert "hard" in registry.load_times
+
+
+def test_stub_encoder_is_deterministic():
+    registry = ModelRegistry(use_stub=True)
+    registry.register("soft", dimension=16)
+    model = registry.get("soft")
+
+    vectors = model.encode(["python", "python", "java"])
+
+    assert vectors.shape == (3, 16)
+    assert np.allclose(vectors[0], vectors[1])
+    assert not np.allclose(vectors[0], vectors[2])
+
+
+def test_unregistered_model():
+    with pytest.raises(KeyError):
+        ModelRegistry(use_stub=True).get("unknown")
+
+
+async def test_coalescer_batches_concurrent_requests():
+    calls = []
+
+    async def encode_batch(texts, model_name):
+        calls.append((list(texts), model_name))
+        return np.array([[float(len(text))] for text in texts])
+
+    coalescer = EmbeddingCoalescer(encode_batch, max_batch_size=10, max_wait_ms=5)
+
+    first, second = await asyncio.gather(
+        coalescer.encode("ab", "hard"),
+        coalescer.encode_many(["abc", "a"], "hard"),
+    )
+
+    assert len(calls) == 1
+    assert first[0] == 2
+    assert [v[0] for v in second] == [3, 1]
+
+
+async def test_coalescer_flushes_full_batch():
+    calls = []
+
+    async def encode_batch(texts, model_name):
+        calls.append(len(texts))
+        return np.zeros((len(texts), 1))
+
+    coalescer = EmbeddingCoalescer(encode_batch, max_batch_size=2, max_wait_ms=1000)
+
+    await coalescer.encode_many(["a", "b", "c"], "soft")
+
+    assert calls == [2, 1]
+
+
+async def test_coalescer_propagates_errors():
+    async def encode_batch(texts, model_name):
+        raise RuntimeError("model failed")
+
+    coalescer = EmbeddingCoalescer(encode_batch, max_wait_ms=1)
+
+    with pytest.raises(RuntimeError):
+        await coalescer.encode("a", "soft")
+
+
+def test_batched_encoding_matches_per_item():
+    model = StubEncoder(dimension=8)
+    # пустой текст, один chunk и несколько перекрывающихся chunks
+    texts = ["", "python", "python fastapi postgres docker kafka redis", "sql joins"]
+
+    batched = MembersEmbeddingSystem.encode_long_texts(
+        texts, model, chunk_size=3, overlap=1
+    )
+
+    assert batched.shape == (4, 8)
+    for text, vector in zip(texts, batched):
+        chunks = MembersEmbeddingSystem.split_chunks(text, chunk_size=3, overlap=1)
+        expected = np.mean([model.encode(chunk) for chunk in chunks], axis=0)
+        assert np.allclose(vector, expected)
+
+
+def test_encode_drafts_matches_per_item(monkeypatch):
+    system = MembersEmbeddingSystem()
+    registry = ModelRegistry(use_stub=True)
+    registry.register(system.soft_model_name, dimension=8)
+    registry.register(system.hard_model_name, dimension=8)
+    monkeypatch.setattr(config, "model_registry", registry)
+    monkeypatch.setattr(embeddings, "embedding_cache", EmbeddingCache())
+
+    # описание длиннее chunk_size: у hard-точки Python несколько chunks
+    description = " ".join(f"word{i}" for i in range(1200))
+    drafts = MembersEmbeddingSystem.candidates_point_drafts([_candidate(description)])
+    model_names = {
+        MembersDataType.SOFT_SKILL.value: system.soft_model_name,
+        MembersDataType.HARD_SKILL.value: system.hard_model_name,
+    }
+
+    points = {point.id: point for point in system.encode_drafts(drafts)}
+
+    assert len(points) == len(drafts)
+    for draft in drafts:
+        model = registry.get(model_names[draft.vector_name])
+        expected = MembersEmbeddingSystem.encode_long_text(draft.text, model)
+        vector = points[draft.id].vector[draft.vector_name]
+        assert np.allclose(vector, expected, atol=1e-6)
+
+
+def _candidate(description: str) -> CandidateVector:
+    return CandidateVector(
+        id=1,
+        first_name="a",
+        last_name="b",
+        age=30,
+        phone=1,
+        resumes=[ResumeBase(id=10, candidate_id=1, summary="team player")],
+        skills=[
+            ResumeSkillBase(resume_id=10, skill_name="Python", description=description),
+            ResumeSkillBase(resume_id=10, skill_name="SQL", description="joins"),
+        ],
+    )
+
+
+def test_point_ids_are_deterministic():
+    before = MembersEmbeddingSystem.candidates_point_drafts([_candidate("django")])
+    after = MembersEmbeddingSystem.candidates_point_drafts([_candidate("fastapi")])
+
+    # id точки не зависит от текста, хэш меняется только у измененного скилла
+    assert [d.id for d in before] == [d.id for d in after]
+    assert len({d.id for d in before}) == 3
+    changed = [
+        b.payload["skill_name"]
+        for b, a in zip(before, after)
+        if b.payload["content_hash"] != a.payload["content_hash"]
+    ]
+    assert changed == ["Python"]
+
+
+def test_duplicate_skill_names_get_distinct_points():
+    candidate = _candidate("django")
+    candidate.skills.append(
+        candidate.skills[0].model_copy(update={"skill_name": " python "})
+    )
+
+    drafts = MembersEmbeddingSystem.candidates_point_drafts([candidate])
+
+    # у каждого скилла своя точка, первая точка Python сохраняет прежний id
+    assert len({d.id for d in drafts}) == 4
+    before = MembersEmbeddingSystem.candidates_point_drafts([_candidate("django")])
+    assert [d.id for d in drafts[:3]] == [d.id for d in before]
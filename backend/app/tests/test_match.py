@@ -0,0 +1,435 @@
+"""
+Тесты агрегации и сохранения результатов матчинга
+"""
+
+import uuid
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import (
+    Distance,
+    PointStruct,
+    QueryResponse,
+    ScoredPoint,
+    VectorParams,
+)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import MatchEventType, MatchMode, MembersDataType, QdrantCollection
+from app.db.infrastructure.database import AsyncQdrantAPI
+from app.db.infrastructure.orm import EmployerORM, MatchORM, VacancyORM
+from app.db.infrastructure.repositories import MatchRepository
+from app.models.match import CandidateMatch, EmployerMatch, MatchCreate
+from app.services.bulk_recalc import BulkRecalcEngine
+from app.services import match_events
+from app.services.match_events import MatchEvent, MatchEventBus
+from app.services.matching import MatchingService
+
+
+def _response(*hits: tuple[int, int, float]) -> QueryResponse:
+    return QueryResponse(
+        points=[
+            ScoredPoint(
+                id=i,
+                version=0,
+                score=score,
+                payload={"type": "hard_skill", "user_id": user_id, "resume_id": rid},
+            )
+            for i, (user_id, rid, score) in enumerate(hits)
+        ]
+    )
+
+
+def test_aggregate_scores_weighted_mean():
+    responses = [
+        _response((1, 10, 0.9), (2, 20, 0.5)),
+        _response((1, 10, 0.5)),
+    ]
+
+    result = MatchingService._aggregate_scores(
+        responses, [0.8, 0.2], CandidateMatch, top_k=10
+    )
+
+    assert [m.resume_id for m in result] == [10, 20]
+    assert result[0].id == "1_10"
+    assert abs(result[0].score - (0.9 * 0.8 + 0.5 * 0.2) / 2) < 1e-9
+    assert abs(result[1].score - 0.5 * 0.8) < 1e-9
+
+
+def test_aggregate_scores_top_k():
+    responses = [_response((1, 10, 0.1), (2, 20, 0.3), (3, 30, 0.2))]
+
+    result = MatchingService._aggregate_scores(
+        responses, [1.0], CandidateMatch, top_k=2
+    )
+
+    assert [m.resume_id for m in result] == [20, 30]
+
+
+def test_aggregate_scores_empty():
+    assert MatchingService._aggregate_scores([], [], CandidateMatch, top_k=5) == []
+
+
+async def test_upsert_many_applies_score_delta(engine):
+    async with AsyncSession(engine) as session:
+        repo = MatchRepository(session)
+        await repo.upsert_many(
+            [
+                MatchCreate(resume_id=1, vacancy_id=1, score=0.5),
+                MatchCreate(resume_id=1, vacancy_id=2, score=0.5),
+            ]
+        )
+        # Первый матч почти не изменился, второй изменился сильнее порога
+        await repo.upsert_many(
+            [
+                MatchCreate(resume_id=1, vacancy_id=1, score=0.505),
+                MatchCreate(resume_id=1, vacancy_id=2, score=0.7),
+                MatchCreate(resume_id=2, vacancy_id=1, score=0.3, is_new=True),
+            ],
+            score_delta=0.01,
+        )
+        await session.commit()
+
+        rows = (
+            await session.execute(
+                select(MatchORM).order_by(MatchORM.resume_id, MatchORM.vacancy_id)
+            )
+        ).scalars()
+        result = [(m.resume_id, m.vacancy_id, m.score, m.is_new) for m in rows]
+
+    assert result == [
+        (1, 1, 0.5, False),
+        (1, 2, 0.7, True),
+        (2, 1, 0.3, True),
+    ]
+
+
+async def test_score_floors_only_for_full_top_k(engine):
+    async with AsyncSession(engine) as session:
+        repo = MatchRepository(session)
+        await repo.upsert_many(
+            [
+                MatchCreate(resume_id=1, vacancy_id=1, score=0.9),
+                MatchCreate(resume_id=2, vacancy_id=1, score=0.4),
+                MatchCreate(resume_id=3, vacancy_id=1, score=0.7),
+                MatchCreate(resume_id=1, vacancy_id=2, score=0.5),
+            ]
+        )
+        floors = await repo.get_vacancy_score_floors([1, 2], top_k=2)
+
+    # У вакансии 2 меньше top_k матчей - в нее попадает любое резюме
+    assert floors == {1: 0.7}
+
+
+async def test_list_vacancies_for_resume_keyset_pages(engine):
+    async with AsyncSession(engine) as session:
+        session.add(EmployerORM(id=1, company_name="Acme"))
+        session.add_all(
+            VacancyORM(id=i, employer_id=1, title=f"v{i}") for i in range(1, 6)
+        )
+        repo = MatchRepository(session)
+        # Одинаковый score у вакансий 2 и 3 - порядок между ними задает id
+        await repo.upsert_many(
+            [
+                MatchCreate(resume_id=1, vacancy_id=1, score=0.9),
+                MatchCreate(resume_id=1, vacancy_id=2, score=0.5, is_new=True),
+                MatchCreate(resume_id=1, vacancy_id=3, score=0.5),
+                MatchCreate(resume_id=1, vacancy_id=4, score=0.1, is_new=True),
+                MatchCreate(resume_id=2, vacancy_id=5, score=1.0),
+            ]
+        )
+
+        pages, after = [], None
+        while True:
+            rows = await repo.list_vacancies_for_resume(1, limit=2, after=after)
+            if not rows:
+                break
+            pages.append([(row["vacancy_id"], row["title"]) for row in rows])
+            after = rows[-1]["score"], rows[-1]["id"]
+        new_only = await repo.list_vacancies_for_resume(1, limit=10, is_new=True)
+
+    assert pages == [[(1, "v1"), (3, "v3")], [(2, "v2"), (4, "v4")]]
+    assert [row["vacancy_id"] for row in new_only] == [2, 4]
+    assert new_only[0]["company_name"] == "Acme"
+
+
+class _LocalQdrantAPI(AsyncQdrantAPI):
+    """AsyncQdrantAPI поверх локального Qdrant в памяти"""
+
+    def __init__(self):
+        self.client = AsyncQdrantClient(":memory:")
+
+
+async def _matching_fixture() -> MatchingService:
+    """Резюме 10 и три вакансии: 100 ближе всех, 300 дальше всех"""
+    hard, soft = MembersDataType.HARD_SKILL.value, MembersDataType.SOFT_SKILL.value
+    api = _LocalQdrantAPI()
+    points = {
+        QdrantCollection.CANDIDATES: [
+            (hard, [1.0, 0.0, 0.0], {"user_id": 1, "resume_id": 10}),
+            (hard, [0.9, 0.1, 0.0], {"user_id": 1, "resume_id": 10}),
+            (soft, [0.0, 0.0, 1.0], {"user_id": 1, "resume_id": 10}),
+        ],
+        QdrantCollection.EMPLOYERS: [
+            (kind, vector, {"employer_id": 1, "vacancy_id": vacancy_id})
+            for vacancy_id, hard_vector, soft_vector in (
+                (100, [1.0, 0.0, 0.0], [0.0, 0.2, 1.0]),
+                (200, [0.6, 0.4, 0.0], [0.0, 1.0, 0.5]),
+                (300, [0.0, 1.0, 0.0], [0.0, 1.0, 0.0]),
+            )
+            for kind, vector in ((hard, hard_vector), (soft, soft_vector))
+        ],
+    }
+    for collection, rows in points.items():
+        await api.client.create_collection(
+            collection.value,
+            vectors_config={
+                name: VectorParams(size=3, distance=Distance.COSINE)
+                for name in (hard, soft)
+            },
+        )
+        await api.client.upsert(
+            collection.value,
+            points=[
+                PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector={kind: vector},
+                    payload={"type": kind, **payload},
+                )
+                for kind, vector, payload in rows
+            ],
+        )
+    return MatchingService(qdrant_api=api)
+
+
+async def test_server_mode_ranks_like_client_but_is_not_persisted():
+    matcher = await _matching_fixture()
+
+    client = await matcher.find_best_employers_for_candidate(
+        user_id=1, resume_id=10, mode=MatchMode.CLIENT
+    )
+    server = await matcher.find_best_employers_for_candidate(
+        user_id=1, resume_id=10, mode=MatchMode.SERVER
+    )
+    saved = await matcher.matches_for_resume(resume_id=10, user_id=1)
+
+    assert [m.vacancy_id for m in client] == [100, 200, 300]
+    assert [m.vacancy_id for m in server] == [100, 200, 300]
+    # score сервера ранговый (RRF) - в matches уходят только score режима CLIENT
+    assert [m.score for m in server] != pytest.approx([m.score for m in client])
+    assert [(m.vacancy_id, m.score) for m in saved] == [
+        (m.vacancy_id, m.score) for m in client
+    ]
+
+
+class _FakeMatcher(MatchingService):
+    """Лучшие вакансии резюме и top_k вакансий заданы заранее, пересчеты запоминаются"""
+
+    def __init__(
+        self,
+        best_employers: list[EmployerMatch],
+        vacancy_tops: dict[int, list[MatchCreate]] | None = None,
+    ):
+        super().__init__(qdrant_api=_LocalQdrantAPI())
+        self.best_employers = best_employers
+        self.vacancy_tops = vacancy_tops or {}
+        self.recalculated: list[int] = []
+
+    async def find_best_employers_for_candidate(self, **kwargs):
+        return self.best_employers
+
+    async def matches_for_vacancy(self, employer_id: int, vacancy_id: int):
+        self.recalculated.append(vacancy_id)
+        return self.vacancy_tops.get(vacancy_id, [])
+
+
+async def test_resume_upsert_prunes_stale_matches(engine):
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_factory() as session:
+        session.add(EmployerORM(id=1))
+        session.add_all(
+            VacancyORM(id=i, employer_id=1, title=f"v{i}") for i in (1, 2, 3)
+        )
+        await MatchRepository(session).upsert_many(
+            [
+                MatchCreate(resume_id=10, vacancy_id=1, score=0.9),
+                MatchCreate(resume_id=10, vacancy_id=2, score=0.5),
+                # После правки резюме вакансия 3 выпадает из его top_k
+                MatchCreate(resume_id=10, vacancy_id=3, score=0.7),
+                MatchCreate(resume_id=11, vacancy_id=3, score=0.3),
+            ]
+        )
+        await session.commit()
+
+    bus = MatchEventBus(qdrant_api=_LocalQdrantAPI(), session_factory=session_factory)
+    bus.matcher = matcher = _FakeMatcher(
+        [
+            EmployerMatch(employer_id=1, vacancy_id=1, score=0.8),
+            EmployerMatch(employer_id=1, vacancy_id=2, score=0.6),
+        ]
+    )
+    await bus.handle(
+        MatchEvent(MatchEventType.UPSERTED, QdrantCollection.CANDIDATES, 1, 10)
+    )
+
+    async with session_factory() as session:
+        rows = (
+            await session.execute(
+                select(MatchORM).order_by(MatchORM.resume_id, MatchORM.vacancy_id)
+            )
+        ).scalars()
+        result = [(m.resume_id, m.vacancy_id, m.score) for m in rows]
+
+    assert result == [(10, 1, 0.8), (10, 2, 0.6), (11, 3, 0.3)]
+    # Вакансия 3 потеряла матч с резюме - ее top_k пересчитан
+    assert matcher.recalculated == [3, 1, 2]
+
+
+async def test_resume_upsert_keeps_match_in_vacancy_top_k(engine, monkeypatch):
+    monkeypatch.setattr(match_events, "MATCHES_TOP_K", 2)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_factory() as session:
+        session.add(EmployerORM(id=1))
+        session.add_all(
+            VacancyORM(id=i, employer_id=1, title=f"v{i}") for i in (1, 2, 3)
+        )
+        await MatchRepository(session).upsert_many(
+            [
+                MatchCreate(resume_id=10, vacancy_id=1, score=0.9),
+                MatchCreate(resume_id=10, vacancy_id=3, score=0.7),
+                MatchCreate(resume_id=11, vacancy_id=1, score=0.95),
+                MatchCreate(resume_id=11, vacancy_id=2, score=0.9),
+                # Не в top_k ни вакансии 3, ни резюме 11
+                MatchCreate(resume_id=11, vacancy_id=3, score=0.3),
+            ]
+        )
+        await session.commit()
+        kept = await MatchRepository(session).get_by_resume_vacancy(10, 3)
+
+    bus = MatchEventBus(qdrant_api=_LocalQdrantAPI(), session_factory=session_factory)
+    bus.matcher = matcher = _FakeMatcher(
+        [
+            EmployerMatch(employer_id=1, vacancy_id=1, score=0.8),
+            EmployerMatch(employer_id=1, vacancy_id=2, score=0.6),
+        ],
+        # Вакансия 3 выпала из top_k резюме, но резюме осталось в ее top_k
+        {3: [MatchCreate(resume_id=10, vacancy_id=3, score=0.6)]},
+    )
+    await bus.handle(
+        MatchEvent(MatchEventType.UPSERTED, QdrantCollection.CANDIDATES, 1, 10)
+    )
+
+    async with session_factory() as session:
+        rows = (
+            await session.execute(
+                select(MatchORM).order_by(MatchORM.resume_id, MatchORM.vacancy_id)
+            )
+        ).scalars()
+        result = {(m.resume_id, m.vacancy_id): m for m in rows}
+
+    assert {pair: m.score for pair, m in result.items()} == {
+        (10, 1): 0.8,
+        (10, 2): 0.6,
+        (10, 3): 0.6,
+        (11, 1): 0.95,
+        (11, 2): 0.9,
+    }
+    # Матч не пересоздан, а обновлен
+    assert (result[10, 3].id, result[10, 3].created_at) == (kept.id, kept.created_at)
+    assert matcher.recalculated == [3]
+
+
+class _PagedQdrantAPI(AsyncQdrantAPI):
+    """Четыре вакансии в Qdrant, scroll отдает их по две"""
+
+    def __init__(self):
+        self.client = self
+        self.offsets: list[int | None] = []
+
+    async def scroll(self, offset=None, **kwargs):
+        self.offsets.append(offset)
+        start = offset or 0
+        points = [
+            ScoredPoint(
+                id=vacancy_id,
+                version=0,
+                score=0,
+                payload={"employer_id": 1, "vacancy_id": vacancy_id},
+            )
+            for vacancy_id in range(start + 1, start + 3)
+        ]
+        return points, (start + 2 if start + 2 < 4 else None)
+
+
+class _RecalcMatcher(MatchingService):
+    """Матчинг вакансии 2 падает, остальные дают по одному матчу"""
+
+    def __init__(self):
+        super().__init__(qdrant_api=_PagedQdrantAPI())
+        self.vacancy_ids: list[int] = []
+
+    async def matches_for_vacancy(self, employer_id: int, vacancy_id: int):
+        self.vacancy_ids.append(vacancy_id)
+        if vacancy_id == 2:
+            raise RuntimeError("qdrant timeout")
+        return [MatchCreate(resume_id=1, vacancy_id=vacancy_id, score=0.5)]
+
+    @staticmethod
+    async def save_matches(db, new_matches, score_delta):
+        pass
+
+
+def _recalc_engine(checkpoint_path) -> BulkRecalcEngine:
+    engine = BulkRecalcEngine(
+        qdrant_api=_PagedQdrantAPI(),
+        page_size=2,
+        checkpoint_path=str(checkpoint_path),
+    )
+    engine.matcher = _RecalcMatcher()
+    return engine
+
+
+def _stop_after_first_page(scroll):
+    async def wrapper(offset=None, **kwargs):
+        if offset is not None:
+            raise ConnectionError("qdrant is down")
+        return await scroll(offset=offset, **kwargs)
+
+    return wrapper
+
+
+async def test_bulk_recalc_isolates_entity_failures(tmp_path):
+    engine = _recalc_engine(tmp_path / "checkpoint.json")
+
+    progress = await engine.run(QdrantCollection.EMPLOYERS)
+
+    # Ошибка вакансии 2 не прервала пересчет остальных
+    assert engine.matcher.vacancy_ids == [1, 2, 3, 4]
+    assert (progress.processed, progress.failed, progress.saved) == (4, 1, 3)
+    assert "qdrant timeout" in progress.errors[0]
+
+
+async def test_bulk_recalc_resumes_from_checkpoint(tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    first = _recalc_engine(checkpoint)
+    # Прерываем пересчет после первой страницы
+    first.qdrant_api.scroll = _stop_after_first_page(first.qdrant_api.scroll)
+    with pytest.raises(ConnectionError):
+        await first.run(QdrantCollection.EMPLOYERS)
+
+    second = _recalc_engine(checkpoint)
+    progress = await second.run(QdrantCollection.EMPLOYERS)
+
+    # Второй запуск начал со второй страницы и досчитал коллекцию
+    assert second.qdrant_api.offsets == [2]
+    assert second.matcher.vacancy_ids == [3, 4]
+    assert (progress.processed, progress.done) == (4, True)
+
+    # После сброса checkpoint пересчет снова идет с начала
+    second.clear_checkpoint(QdrantCollection.EMPLOYERS)
+    third = _recalc_engine(checkpoint)
+    await third.run(QdrantCollection.EMPLOYERS)
+    assert third.qdrant_api.offsets == [None, 2]
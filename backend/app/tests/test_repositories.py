@@ -0,0 +1,119 @@
+"""
+Тесты планов запросов репозиториев: выборки идут по индексам, а не полным сканом
+"""
+
+import inspect
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.domain.repositories import BaseRepository
+from app.db.infrastructure import repositories
+from app.db.infrastructure.orm import Base
+
+# Методы-выборки репозиториев и аргументы для них
+LOOKUP_CASES = [
+    (repositories.CandidateRepository, "get_by_user_id", (1,)),
+    (repositories.ResumeRepository, "get_by_candidate_id", (1,)),
+    (repositories.ResumeRepository, "get_by_user_id", (1,)),
+    (repositories.ResumeRepository, "get_for_vectorization", ([1],)),
+    (repositories.ResumeRepository, "get_existing_ids", ([1, 2],)),
+    (repositories.ResumeRepository, "get_candidate_ids", ([1, 2],)),
+    (repositories.ResumeRepository, "get_resumes_skills", (1,)),
+    (repositories.ResumeSkillRepository, "remove_skills_by_resume_id", (1,)),
+    (repositories.ResumeSkillRepository, "get_all_by_resume_id", (1,)),
+    (repositories.EmployerRepository, "get_by_user_id", (1,)),
+    (repositories.VacancyRepository, "get_by_employer_id", (1,)),
+    (repositories.VacancyRepository, "get_for_vectorization", ([1],)),
+    (repositories.VacancyRepository, "get_existing_ids", ([1, 2],)),
+    (repositories.VacancyRepository, "get_employer_ids", ([1, 2],)),
+    (repositories.VacancyRepository, "get_vacancies_skills", (1,)),
+    (repositories.VacancySkillRepository, "remove_skills_by_vacancy_id", (1,)),
+    (repositories.VacancySkillRepository, "get_skills_by_vacancy_id", (1,)),
+    (repositories.MatchRepository, "get_vacancy_ids_for_resume_except", (1, [1])),
+    (repositories.MatchRepository, "get_resume_ids_for_vacancy_except", (1, [])),
+    (repositories.MatchRepository, "delete_for_resume_except", (1, [1, 2], 10)),
+    (repositories.MatchRepository, "delete_for_vacancy_except", (1, [], 10)),
+    (repositories.MatchRepository, "get_by_resume_vacancy", (1, 1)),
+    (repositories.MatchRepository, "get_vacancy_score_floors", ([1], 2)),
+    (repositories.MatchRepository, "get_resume_score_floors", ([1], 2)),
+    (repositories.MatchRepository, "get_resumes_by_vacancy_id", (1,)),
+    (repositories.MatchRepository, "get_vacancies_by_resume_id", (1,)),
+    (repositories.MatchRepository, "list_vacancies_for_resume", (1, 10, (0.5, 3))),
+    (repositories.MatchRepository, "list_resumes_for_vacancy", (1, 10, None, True)),
+    (repositories.VectorizationJobRepository, "claim_pending", (10,)),
+    (repositories.VectorizationJobRepository, "finish", ([1],)),
+    (repositories.VectorizationJobRepository, "fail", ([1], "error", 3)),
+    (repositories.VectorizationJobRepository, "requeue_stale", (datetime.now(),)),
+    (repositories.UserRepository, "get_by_email", ("user@example.com",)),
+    (repositories.UserRepository, "get_by_id", (1,)),
+]
+
+# Методы, которые не ищут строки (вставка)
+NON_LOOKUP_METHODS = {("MatchRepository", "upsert_many")}
+
+
+@pytest.fixture
+async def engine(engine):
+    async with engine.begin() as conn:
+        # По строке в родительских таблицах, чтобы selectinload выполнял свои запросы
+        for statement in (
+            "INSERT INTO users (id, email, password) VALUES (1, 'a', 'b')",
+            "INSERT INTO candidates (id, user_id) VALUES (1, 1)",
+            "INSERT INTO employers (id, user_id) VALUES (1, 1)",
+            "INSERT INTO resumes (id, candidate_id, title) VALUES (1, 1, 'r')",
+            "INSERT INTO vacancies (id, employer_id, title) VALUES (1, 1, 'v')",
+        ):
+            await conn.execute(text(statement))
+    return engine
+
+
+def test_every_lookup_method_is_checked():
+    covered = {(cls.__name__, name) for cls, name, _ in LOOKUP_CASES}
+    declared = {
+        (cls.__name__, name)
+        for cls in vars(repositories).values()
+        if inspect.isclass(cls)
+        and issubclass(cls, BaseRepository)
+        and cls.__module__ == repositories.__name__
+        for name, member in vars(cls).items()
+        if inspect.iscoroutinefunction(member) and not name.startswith("_")
+    }
+
+    assert declared - NON_LOOKUP_METHODS == covered
+
+
+@pytest.mark.parametrize(
+    "repository_cls, method, args",
+    LOOKUP_CASES,
+    ids=[f"{cls.__name__}.{name}" for cls, name, _ in LOOKUP_CASES],
+)
+async def test_lookup_uses_index(engine, repository_cls, method, args):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with AsyncSession(engine) as session:
+            await getattr(repository_cls(session), method)(*args)
+            await session.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    assert statements
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            plan = [row[3] for row in result.all()]
+            # SCAN допустим только по подзапросам, не по таблицам
+            scanned = {
+                line.split()[1] for line in plan if line.startswith("SCAN ")
+            } & set(Base.metadata.tables)
+            assert not scanned, f"{statement}\n{plan}"
+            assert any(line.startswith("SEARCH ") for line in plan), plan
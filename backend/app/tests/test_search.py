@@ -0,0 +1,350 @@
+"""
+Тесты поиска: фильтры навыков, курсоры, кэши выдачи, штрафы и совпадения FilterScore
+"""
+
+import asyncio
+import re
+import time
+import uuid
+
+import numpy as np
+import pytest
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import (
+    Distance,
+    Filter,
+    PointStruct,
+    Record,
+    TokenizerType,
+    VectorParams,
+)
+from rapidfuzz import fuzz
+
+from app.config import MembersDataType
+from app.db.infrastructure.database import AsyncQdrantAPI
+from app.db.infrastructure.qdrant_schema import (
+    COMMON_INDEXES,
+    TEXT_INDEX,
+    normalize_index_text,
+)
+from app.models.filter import SearchFilters, SearchRequest
+from app.models.match import CandidateMatch
+from app.services.fiter import SearchFilter
+from app.utils.filter.filter_builder import QdrantFilterBuilder
+from app.utils.filter.result_cache import SearchCursor, SearchResultSetCache
+from app.utils.filter.score import FilterScore
+from app.utils.filter.search_cache import (
+    MemorySearchCacheStore,
+    SearchCache,
+    SqliteSearchCacheStore,
+    filters_key,
+)
+from app.utils.filter.term_matcher import TermMatcher
+
+
+def test_cursor_roundtrip():
+    cursor = SearchCursor(result_set_id="abc", request_hash="f00", offset=20)
+
+    assert SearchCursor.decode(cursor.encode()) == cursor
+
+
+@pytest.mark.parametrize("raw", ["bad", "e30=", "eyJycyI6MX0="])
+def test_cursor_rejects_garbage(raw):
+    with pytest.raises(ValueError):
+        SearchCursor.decode(raw)
+
+
+def test_result_set_cache_ttl_and_eviction(monkeypatch):
+    cache = SearchResultSetCache(ttl=10, max_items=2)
+    first = cache.put([1, 2, 3])
+    second = cache.put([4])
+
+    assert cache.get(first) == [1, 2, 3]
+
+    # first использован последним - вытесняется second
+    third = cache.put([5])
+    assert cache.get(second) is None
+    assert cache.get(third) == [5]
+
+    now = time.monotonic()
+    monkeypatch.setattr(
+        "app.utils.filter.result_cache.time.monotonic", lambda: now + 11
+    )
+    assert cache.get(first) is None
+
+
+def test_filters_key_is_canonical():
+    first = SearchFilters(
+        skills={"must_have": ["Python", "SQL"]},
+        demographics={"locations": ["Москва", "Казань"]},
+    )
+    second = SearchFilters(
+        skills={"must_have": [" sql", "python", "python"]},
+        demographics={"locations": ["Казань", "Москва"]},
+    )
+    other = SearchFilters(demographics={"locations": ["москва", "казань"]})
+
+    assert filters_key(first) == filters_key(second)
+    assert filters_key(first) != filters_key(other)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_search_cache_invalidated_by_write(backend, tmp_path):
+    if backend == "memory":
+        store = MemorySearchCacheStore()
+    else:
+        store = SqliteSearchCacheStore(str(tmp_path / "search.sqlite3"))
+    cache = SearchCache(store=store, ttl=60)
+    filters = SearchFilters(skills={"must_have": ["python"]})
+
+    key = cache.key("candidates", filters)
+    assert cache.get(key) is None
+    cache.put(key, ["result"])
+    assert cache.get(cache.key("candidates", filters)) == ["result"]
+
+    cache.invalidate("candidates")
+    assert cache.get(cache.key("candidates", filters)) is None
+    assert cache.stats()["hits"] == 1
+
+
+async def test_sqlite_search_cache_from_event_loop(tmp_path):
+    store = SqliteSearchCacheStore(str(tmp_path / "search.sqlite3"))
+    cache = SearchCache(store=store, ttl=60)
+    keys = [
+        await cache.akey("candidates", SearchFilters(skills={"must_have": [name]}))
+        for name in ("python", "sql", "go")
+    ]
+
+    # Параллельные обращения из корутин идут в потоках через одно соединение
+    await asyncio.gather(
+        *[cache.aput(key, [(i, 0.5), (i + 1, 0.25)]) for i, key in enumerate(keys)]
+    )
+    values = await asyncio.gather(*[cache.aget(key) for key in keys])
+
+    # Значения хранятся в JSON, пары (ключ, score) возвращаются списками
+    assert values == [[[i, 0.5], [i + 1, 0.25]] for i in range(3)]
+    await cache.ainvalidate("candidates")
+    assert await cache.aget(await cache.akey("candidates", SearchFilters())) is None
+
+
+def test_similarity_penalties_for_several_exclusions():
+    points = [
+        Record(
+            id=i,
+            payload={"type": "soft_skill", "resume_id": resume_id},
+            vector={"soft_skill": vector},
+        )
+        for i, (resume_id, vector) in enumerate(
+            [(1, [1.0, 0.0, 0.0]), (2, [0.0, 1.0, 0.0]), (3, [0.0, 0.0, 1.0])]
+        )
+    ]
+    score = FilterScore(
+        points=points,
+        hard_filter=None,
+        soft_filter=None,
+        hard_vector_not=None,
+        soft_vector_not=[np.array([1.0, 0.0, 0.0]), np.array([0.0, 2.0, 0.0])],
+        entity_cls=CandidateMatch,
+        averaged_scores={1: 1.0, 2: 1.0, 3: 1.0},
+        similarity_threshold=0.4,
+    )
+
+    asyncio.run(score.calc_score())
+
+    assert score.decrease_score == pytest.approx({1: 0.15, 2: 0.15})
+
+
+def test_term_matcher_matches_per_term_search():
+    terms = ["java", "java script", "c++", "sql"]
+    names = ["java script", "javascript", "c++ developer", "postgresql", "sql", "go"]
+
+    matched = TermMatcher(terms).match_many(names + names)
+
+    for name in names:
+        matches = sum(
+            bool(re.search(rf"\b{re.escape(term)}\b", name)) for term in terms
+        )
+        fuzzy_score = sum(fuzz.partial_ratio(term, name) for term in terms)
+        assert matched[name] == (matches, bool(matches) or fuzzy_score > 85)
+
+
+class _ZeroEncoder:
+    async def aencode_queries(self, texts, model_name):
+        return [np.zeros(3) for _ in texts]
+
+
+class _Config:
+    HARD_MODEL_NAME = "hard"
+    SOFT_MODEL_NAME = "soft"
+
+
+def _query(**filters):
+    request = SearchRequest(filters=SearchFilters(**filters))
+    builder = QdrantFilterBuilder(config=_Config, embedding_system=_ZeroEncoder())
+    return asyncio.run(builder.build(request))
+
+
+def _hard_filter(**skills):
+    return _query(skills=skills).hard_filter
+
+
+# Навык, summary резюме и описание навыка - как в payload точек
+FILTER_RECORDS = [
+    ("Python 3.11", "Backend: Python, Django.", "REST (FastAPI)"),
+    ("Python/Django", "Go; Kafka", "kafka, grpc"),
+    ("C++", "Embedded, C++/Qt", "STL."),
+    ("C#", "ASP.NET, .NET", "LINQ"),
+]
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({"skills": {"must_have": ["python"]}}, {"Python 3.11", "Python/Django"}),
+        ({"skills": {"must_have": ["Django"]}}, {"Python/Django"}),
+        ({"skills": {"must_not_have": ["python"]}}, {"C++", "C#"}),
+        ({"summary": {"must_have": ["django"]}}, {"Python 3.11"}),
+        ({"summary": {"must_have": [".net"]}}, {"C#"}),
+        (
+            {"description": {"must_not_have": ["Kafka"]}},
+            {"Python 3.11", "C++", "C#"},
+        ),
+    ],
+)
+def test_text_filters_ignore_punctuation(filters, expected):
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        "points", vectors_config=VectorParams(size=3, distance=Distance.COSINE)
+    )
+    # Индексы - как в схеме коллекций; локальный Qdrant их не строит
+    # и токенизирует MatchText по словам, поэтому "c++"/"c#" - в тесте ниже
+    for field_name, index in COMMON_INDEXES.items():
+        client.create_payload_index("points", field_name, field_schema=index)
+    client.upsert(
+        "points",
+        points=[
+            PointStruct(
+                id=i,
+                vector=[1.0, 0.0, 0.0],
+                payload={
+                    "skill_name": skill_name,
+                    "skill_name_norm": normalize_index_text(skill_name),
+                    "summary_norm": normalize_index_text(summary),
+                    "description_norm": normalize_index_text(description),
+                },
+            )
+            for i, (skill_name, summary, description) in enumerate(FILTER_RECORDS)
+        ],
+    )
+    query = _query(**filters)
+    scroll_filter = Filter(
+        must=[f for f in (query.hard_filter, query.soft_filter) if f is not None]
+    )
+
+    points, _ = client.scroll("points", scroll_filter=scroll_filter)
+
+    assert {point.payload["skill_name"] for point in points} == expected
+
+
+@pytest.mark.parametrize(
+    "query, text, matches",
+    [
+        ("C++", "c++, c#", True),
+        ("c++", "C#", False),
+        ("c", "C++/Qt", False),
+        ("c#", "(C#)", True),
+        (".NET", "ASP.NET, .NET", True),
+        ("python", "Python/Django", True),
+        ("django", "Django.", True),
+        ("python 3.11", "Python 3.11.", True),
+    ],
+)
+def test_text_index_tokens(query, text, matches):
+    # MatchText по TEXT_INDEX: все слова запроса должны быть среди слов текста
+    assert TEXT_INDEX.tokenizer == TokenizerType.WHITESPACE
+    query_tokens = set(normalize_index_text(query).split())
+    text_tokens = set(normalize_index_text(text).split())
+
+    assert (query_tokens <= text_tokens) is matches
+
+
+def test_skill_filter_terms_adjust_score():
+    points = [
+        Record(
+            id=i,
+            payload={
+                "type": "hard_skill",
+                "resume_id": resume_id,
+                "skill_name_norm": name,
+            },
+        )
+        for i, (resume_id, name) in enumerate([(1, "c++"), (2, "go"), (3, "java")])
+    ]
+    score = FilterScore(
+        points=points,
+        hard_filter=_hard_filter(must_have=["C++"], must_not_have=["go"]),
+        soft_filter=None,
+        hard_vector_not=None,
+        soft_vector_not=None,
+        entity_cls=CandidateMatch,
+        averaged_scores={1: 1.0, 2: 1.0, 3: 1.0},
+    )
+
+    asyncio.run(score.calc_score())
+
+    # Бонус за must_have и штраф за must_not_have по названию навыка целиком
+    assert score.increase_score == {1: 0.1}
+    assert score.decrease_score == pytest.approx({2: 0.1})
+
+
+class _LocalQdrantAPI(AsyncQdrantAPI):
+    """AsyncQdrantAPI поверх локального Qdrant в памяти"""
+
+    def __init__(self):
+        self.client = AsyncQdrantClient(":memory:")
+
+
+async def test_search_ranks_by_mean_of_best_points():
+    hard, soft = MembersDataType.HARD_SKILL.value, MembersDataType.SOFT_SKILL.value
+    api = _LocalQdrantAPI()
+    await api.client.create_collection(
+        "candidates",
+        vectors_config={
+            name: VectorParams(size=3, distance=Distance.COSINE)
+            for name in (hard, soft)
+        },
+    )
+    # Резюме 2 - как резюме 1, но с лишним навыком не по запросу
+    rows = [
+        (1, hard, [1.0, 0.0, 0.0]),
+        (1, soft, [0.0, 0.3, 1.0]),
+        (2, hard, [1.0, 0.0, 0.0]),
+        (2, hard, [0.0, 1.0, 0.0]),
+        (2, soft, [0.0, 0.3, 1.0]),
+        (3, hard, [0.8, 0.6, 0.0]),
+        (3, soft, [0.0, 1.0, 0.3]),
+    ]
+    await api.client.upsert(
+        "candidates",
+        points=[
+            PointStruct(
+                id=str(uuid.uuid4()),
+                vector={kind: vector},
+                payload={"type": kind, "user_id": 1, "resume_id": resume_id},
+            )
+            for resume_id, kind, vector in rows
+        ],
+    )
+
+    ranked = await SearchFilter(api, CandidateMatch)._rank_entities(
+        "candidates",
+        hard_vector=np.array([1.0, 0.0, 0.0]),
+        soft_vector=np.array([0.0, 0.0, 1.0]),
+        top_k=10,
+    )
+
+    # Score - среднее DBSF-score лучших точек резюме, слабый навык тянет его вниз
+    assert [resume_id for resume_id, _ in ranked] == [1, 2, 3]
+    assert [score for _, score in ranked] == pytest.approx(
+        [0.6006, 0.4854, 0.4213], abs=1e-4
+    )
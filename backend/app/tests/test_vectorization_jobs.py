@@ -0,0 +1,102 @@
+"""
+Тесты очереди задач векторизации
+"""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import QdrantCollection, VectorizationJobStatus
+from app.db.infrastructure.repositories import VectorizationJobRepository
+from app.models.job import VectorizationJobCreate
+from app.services import vectorization_worker as worker_module
+from app.services.vectorization_worker import VectorizationWorker
+
+
+async def test_claim_retry_and_fail(engine):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        repo = VectorizationJobRepository(session)
+        for entity_id in (1, 2):
+            await repo.add(
+                VectorizationJobCreate(
+                    collection=QdrantCollection.CANDIDATES.value,
+                    owner_id=10,
+                    entity_id=entity_id,
+                )
+            )
+        await session.commit()
+
+        # Забранные задачи больше не выдаются
+        first = await repo.claim_pending(limit=1)
+        await session.commit()
+        assert [job.entity_id for job in first] == [1]
+        assert [job.entity_id for job in await repo.claim_pending(limit=5)] == [2]
+        await session.commit()
+
+        # Первая неудача возвращает задачу в очередь, вторая - помечает упавшей
+        await repo.fail([first[0].id], "boom", max_attempts=2)
+        await session.commit()
+        retried = await repo.claim_pending(limit=5)
+        assert [job.attempts for job in retried] == [2]
+        await repo.fail([first[0].id], "boom", max_attempts=2)
+        await session.commit()
+
+        job = await repo.get(first[0].id)
+        await session.refresh(job)
+
+    assert job.status == VectorizationJobStatus.FAILED.value
+    assert job.error == "boom"
+
+
+class _DeletingQdrantAPI:
+    """Qdrant без точек, резюме удаляется из БД во время upsert"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.removed: list[tuple[int, int]] = []
+
+    async def entity_payloads(self, collection_name: str, **kwargs):
+        return {}
+
+    async def add_vectors(self, collection_name: str, vectors):
+        async with self.engine.begin() as conn:
+            await conn.execute(text("DELETE FROM resumes WHERE id = 10"))
+
+    async def remove_candidate_skills(self, candidate_id: int, resume_id: int):
+        self.removed.append((candidate_id, resume_id))
+
+
+async def test_points_of_resume_deleted_during_vectorization_are_dropped(
+    engine, monkeypatch
+):
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO candidates (id, first_name, last_name, age, phone) "
+                "VALUES (1, 'a', 'b', 30, 1)"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO resumes (id, candidate_id, title, summary, "
+                "experience_age, location, salary_from, salary_to, "
+                "employment_type, status) "
+                "VALUES (10, 1, 'r', 'team player', 3, 'msk', 1, 2, 'full', 'active')"
+            )
+        )
+
+    upserted = []
+    monkeypatch.setattr(
+        worker_module.match_event_bus,
+        "resume_upserted",
+        lambda *args: upserted.append(args),
+    )
+    qdrant_api = _DeletingQdrantAPI(engine)
+    worker = VectorizationWorker(
+        qdrant_api=qdrant_api, session_factory=async_sessionmaker(engine)
+    )
+
+    await worker._vectorize_resumes([10])
+
+    # Точки удаленного резюме убраны, пересчет матчей для него не запускается
+    assert qdrant_api.removed == [(1, 10)]
+    assert upserted == []
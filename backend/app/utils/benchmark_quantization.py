@@ -0,0 +1,249 @@
+# Сравнение квантизации векторов Qdrant: recall@k, задержка и память
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import cast
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import (
+    Distance,
+    OptimizersConfigDiff,
+    PointStruct,
+    QuantizationSearchParams,
+    SearchParams,
+    VectorParams,
+)
+
+from app.config import MembersDataType, QdrantCollection, QuantizationMode, settings
+from app.db.infrastructure.qdrant_schema import quantization_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BENCH_PREFIX = "bench_quantization"
+
+
+@dataclass
+class BenchResult:
+    """Результат одной конфигурации"""
+
+    mode: QuantizationMode
+    on_disk: bool
+    recall: float
+    p50_ms: float
+    p95_ms: float
+    ram_mb: float
+
+
+def ram_estimate_mb(count: int, dim: int, mode: QuantizationMode, on_disk: bool):
+    """Оценка памяти под векторы без HNSW-графа (оригиналы float32 + квантованные)"""
+    original = 0 if on_disk else count * dim * 4
+    quantized = {
+        QuantizationMode.NONE: 0,
+        QuantizationMode.SCALAR: count * dim,
+        QuantizationMode.BINARY: count * dim / 8,
+    }[mode]
+    return (original + quantized) / 1024 / 1024
+
+
+async def load_vectors(
+    client: AsyncQdrantClient, collection: str, vector_name: str, limit: int
+) -> np.ndarray:
+    """Векторы из рабочей коллекции"""
+    vectors: list[list[float]] = []
+    if not await client.collection_exists(collection):
+        return np.asarray(vectors, dtype=np.float32)
+    offset = None
+    while len(vectors) < limit:
+        points, offset = await client.scroll(
+            collection_name=collection,
+            limit=min(256, limit - len(vectors)),
+            offset=offset,
+            with_payload=False,
+            with_vectors=[vector_name],
+        )
+        for point in points:
+            if isinstance(point.vector, dict) and vector_name in point.vector:
+                vectors.append(cast(list[float], point.vector[vector_name]))
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Точный top_k по косинусу - эталон для recall"""
+    scores = normalize(queries) @ normalize(data).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+async def bench_config(
+    client: AsyncQdrantClient,
+    data: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    mode: QuantizationMode,
+    on_disk: bool,
+    k: int,
+    oversampling: float,
+    rescore: bool,
+) -> BenchResult:
+    """Создать временную коллекцию с конфигурацией и замерить поиск"""
+    name = f"{BENCH_PREFIX}_{mode.value}{'_disk' if on_disk else ''}"
+    if await client.collection_exists(name):
+        await client.delete_collection(name)
+    await client.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(
+            size=data.shape[1],
+            distance=Distance.COSINE,
+            on_disk=on_disk,
+            quantization_config=quantization_config(mode),
+        ),
+        # Индексируем сразу, иначе маленькая коллекция ищется перебором
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=0),
+    )
+    try:
+        for start in range(0, len(data), 512):
+            await client.upsert(
+                collection_name=name,
+                points=[
+                    PointStruct(id=start + i, vector=vector.tolist())
+                    for i, vector in enumerate(data[start : start + 512])
+                ],
+                wait=True,
+            )
+        await wait_indexed(client, name)
+
+        params = None
+        if mode is not QuantizationMode.NONE:
+            params = SearchParams(
+                quantization=QuantizationSearchParams(
+                    rescore=rescore, oversampling=oversampling
+                )
+            )
+
+        latencies: list[float] = []
+        hits = 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            response = await client.query_points(
+                collection_name=name,
+                query=query.tolist(),
+                limit=k,
+                search_params=params,
+                with_payload=False,
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += len({p.id for p in response.points} & set(expected.tolist()))
+    finally:
+        await client.delete_collection(name)
+
+    return BenchResult(
+        mode=mode,
+        on_disk=on_disk,
+        recall=hits / (len(queries) * k),
+        p50_ms=float(np.percentile(latencies, 50)),
+        p95_ms=float(np.percentile(latencies, 95)),
+        ram_mb=ram_estimate_mb(len(data), data.shape[1], mode, on_disk),
+    )
+
+
+async def wait_indexed(client: AsyncQdrantClient, name: str, timeout: float = 300):
+    """Дождаться окончания оптимизации (построения индекса и квантизации)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = await client.get_collection(name)
+        if info.status.value == "green":
+            return
+        await asyncio.sleep(0.5)
+    logger.warning(f"Коллекция {name} не проиндексирована за {timeout} c")
+
+
+async def main(args: argparse.Namespace):
+    client = AsyncQdrantClient(location=args.url)
+    try:
+        rng = np.random.default_rng(args.seed)
+        vectors = await load_vectors(
+            client, args.collection, args.vector, args.limit + args.queries
+        )
+        if len(vectors) <= args.queries:
+            logger.info("В коллекции мало векторов, используем случайные")
+            vectors = rng.standard_normal(
+                (args.limit + args.queries, args.dim), dtype=np.float32
+            )
+        rng.shuffle(vectors)
+        queries, data = vectors[: args.queries], vectors[args.queries :]
+        truth = exact_top_k(data, queries, args.k)
+        logger.info(
+            f"Векторов {len(data)} x {data.shape[1]}, запросов {len(queries)}, k={args.k}"
+        )
+
+        results = [
+            await bench_config(
+                client,
+                data,
+                queries,
+                truth,
+                QuantizationMode(mode),
+                on_disk,
+                args.k,
+                args.oversampling,
+                not args.no_rescore,
+            )
+            for mode in args.modes
+            for on_disk in ([False, True] if args.on_disk else [False])
+        ]
+    finally:
+        await client.close()
+
+    print(
+        f"{'mode':<8} {'on_disk':<8} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'RAM MB':>8}"
+    )
+    for r in results:
+        print(
+            f"{r.mode.value:<8} {str(r.on_disk):<8} {r.recall:>7.3f} "
+            f"{r.p50_ms:>8.2f} {r.p95_ms:>8.2f} {r.ram_mb:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    # Использование:
+    # python -m app.utils.benchmark_quantization --vector soft_skill --limit 20000
+    parser = argparse.ArgumentParser(description="Бенчмарк квантизации векторов")
+    parser.add_argument("--url", default=settings.QDRANT_URL)
+    parser.add_argument("--collection", default=QdrantCollection.CANDIDATES.value)
+    parser.add_argument(
+        "--vector",
+        default=MembersDataType.SOFT_SKILL.value,
+        choices=[MembersDataType.SOFT_SKILL.value, MembersDataType.HARD_SKILL.value],
+    )
+    parser.add_argument("--limit", type=int, default=10_000, help="размер выборки")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--dim", type=int, default=1024, help="размерность случайных векторов"
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=[m.value for m in QuantizationMode],
+        choices=[m.value for m in QuantizationMode],
+    )
+    parser.add_argument(
+        "--on-disk", action="store_true", help="также замерить оригиналы на диске"
+    )
+    parser.add_argument(
+        "--oversampling", type=float, default=settings.QDRANT_QUANTIZATION_OVERSAMPLING
+    )
+    parser.add_argument("--no-rescore", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+
+    asyncio.run(main(parser.parse_args()))
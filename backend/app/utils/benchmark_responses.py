@@ -0,0 +1,142 @@
+# Сравнение сериализации ответов: jsonable_encoder + json и FastJSONResponse
+import argparse
+import time
+from datetime import datetime
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.db.infrastructure.orm import MatchORM
+from app.models.candidate import (
+    ResumeBase,
+    ResumeSkillBase,
+    ResumesList,
+    ResumesResponseList,
+)
+from app.models.match import (
+    MatchRecord,
+    ResumeMatchResponse,
+    ResumeSearchRecord,
+    SkillMatch,
+    SkillRecord,
+)
+from app.utils.responses import FastJSONResponse
+
+
+def best_time_ms(encode: Callable[[], object], repeat: int) -> float:
+    """Лучшее время из repeat запусков, мс"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def default_path(content: Any) -> bytes | memoryview:
+    """Как FastAPI сериализует возвращенные из маршрута данные"""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def search_payloads(count: int) -> tuple[list, list]:
+    skills: list[dict[str, Any]] = [
+        {
+            "skill_name": f"skill {i}",
+            "description": "описание навыка",
+            "experience_age": i,
+        }
+        for i in range(8)
+    ]
+    fields: dict[str, Any] = {
+        "user_id": 1,
+        "title": "Python разработчик",
+        "summary": "Опыт коммерческой разработки " * 10,
+        "age": 30,
+        "location": "Москва",
+        "salary_from": 100_000,
+        "salary_to": 200_000,
+        "employment_type": "full",
+        "experience_age": 5,
+        "status": "active",
+    }
+    models = [
+        ResumeMatchResponse(
+            **fields,
+            resume_id=i,
+            skills=[SkillMatch(**skill) for skill in skills],
+            score=0.5,
+        )
+        for i in range(count)
+    ]
+    records = [
+        ResumeSearchRecord(
+            **fields,
+            resume_id=i,
+            skills=[SkillRecord(**skill) for skill in skills],
+            score=0.5,
+        )
+        for i in range(count)
+    ]
+    return models, records
+
+
+def match_payloads(count: int) -> tuple[list, list]:
+    now = datetime.now()
+    rows = [
+        MatchORM(
+            id=i,
+            resume_id=i,
+            vacancy_id=i + 1,
+            score=0.5,
+            created_at=now,
+            updated_at=now,
+            is_new=True,
+        )
+        for i in range(count)
+    ]
+    return rows, [MatchRecord.from_orm(row) for row in rows]
+
+
+def my_resumes_payload(count: int) -> ResumesResponseList:
+    return ResumesResponseList(
+        resumes=[
+            ResumesList(
+                resumes_base=ResumeBase(id=i, title="Python разработчик"),
+                skills=[
+                    ResumeSkillBase(resume_id=i, skill_name=f"skill {j}")
+                    for j in range(8)
+                ],
+            )
+            for i in range(count)
+        ]
+    )
+
+
+def main(args: argparse.Namespace):
+    search_models, search_records = search_payloads(args.count)
+    match_rows, match_records = match_payloads(args.count)
+    my_resumes = my_resumes_payload(args.count)
+
+    cases = [
+        ("/resumes/search", search_models, search_records),
+        ("/matches/*", match_rows, match_records),
+        ("/resumes/my/", my_resumes, my_resumes),
+    ]
+    print(f"{'endpoint':<16} {'default ms':>11} {'fast ms':>9} {'speedup':>8}")
+    for name, default_content, fast_content in cases:
+        default_ms = best_time_ms(lambda: default_path(default_content), args.repeat)
+        fast_ms = best_time_ms(lambda: FastJSONResponse(fast_content).body, args.repeat)
+        print(
+            f"{name:<16} {default_ms:>11.2f} {fast_ms:>9.2f} "
+            f"{default_ms / fast_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    # Использование: python -m app.utils.benchmark_responses --count 500
+    parser = argparse.ArgumentParser(description="Бенчмарк сериализации ответов")
+    parser.add_argument("--count", type=int, default=500, help="записей в ответе")
+    parser.add_argument("--repeat", type=int, default=20)
+
+    main(parser.parse_args())
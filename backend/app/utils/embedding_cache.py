@@ -0,0 +1,149 @@
+# Кэш embeddings по содержимому текста
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from numpy import ndarray
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Кэш embeddings с ключом (имя модели, хэш нормализованного текста).
+
+    Первый уровень - LRU в памяти процесса, второй - SQLite на диске,
+    который переживает рестарт и разделяется между воркерами.
+    """
+
+    def __init__(self, path: str | None = None, max_items: int = 50_000):
+        self.path = path
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._lru: OrderedDict[tuple[str, str], ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Нормализация текста перед хэшированием"""
+        return " ".join(text.split())
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> tuple[str, str]:
+        """Ключ кэша: модель + sha256 нормализованного текста"""
+        digest = hashlib.sha256(
+            EmbeddingCache.normalize(text).encode("utf-8")
+        ).hexdigest()
+        return model_name, digest
+
+    def _connection(self) -> sqlite3.Connection | None:
+        """Ленивое открытие SQLite хранилища"""
+        if not self.path:
+            return None
+        if self._conn is None:
+            try:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "model TEXT NOT NULL, "
+                    "text_hash TEXT NOT NULL, "
+                    "vector BLOB NOT NULL, "
+                    "PRIMARY KEY (model, text_hash))"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Embedding cache storage unavailable: {e}")
+                self.path = None
+                self._conn = None
+        return self._conn
+
+    def _remember(self, key: tuple[str, str], vector: ndarray):
+        """Положить вектор в LRU"""
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model_name: str, texts: list[str]) -> list[ndarray | None]:
+        """Получить embeddings для текстов, None - промах"""
+        keys = [self.make_key(model_name, text) for text in texts]
+        result: list[ndarray | None] = [None] * len(keys)
+        missing: dict[str, list[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    result[i] = vector
+                else:
+                    missing.setdefault(key[1], []).append(i)
+
+            conn = self._connection()
+            if missing and conn is not None:
+                hashes = list(missing)
+                # Ограничение SQLite на число параметров в запросе
+                for start in range(0, len(hashes), 500):
+                    part = hashes[start : start + 500]
+                    rows = conn.execute(
+                        "SELECT text_hash, vector FROM embeddings "
+                        f"WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                        [model_name, *part],
+                    ).fetchall()
+                    for text_hash, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._remember((model_name, text_hash), vector)
+                        for i in missing.pop(text_hash):
+                            result[i] = vector
+
+            misses = sum(len(v) for v in missing.values())
+            self.misses += misses
+            self.hits += len(keys) - misses
+
+        return result
+
+    def put_many(self, model_name: str, texts: list[str], vectors: ndarray):
+        """Сохранить embeddings текстов"""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(model_name, text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key[0], key[1], vector.tobytes()))
+
+            conn = self._connection()
+            if rows and conn is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) "
+                    "VALUES (?, ?, ?)",
+                    rows,
+                )
+                conn.commit()
+
+    def stats(self) -> dict:
+        """Счетчики попаданий/промахов"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_items": len(self._lru),
+        }
+
+    def clear(self):
+        """Очистить кэш и счетчики"""
+        with self._lock:
+            self._lru.clear()
+            self.hits = 0
+            self.misses = 0
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM embeddings")
+                conn.commit()
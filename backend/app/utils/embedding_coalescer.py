@@ -0,0 +1,87 @@
+# Объединение запросов на векторизацию в батчи
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from numpy import ndarray
+
+logger = logging.getLogger(__name__)
+
+EncodeBatch = Callable[[list[str], str], Awaitable[ndarray]]
+
+
+class EmbeddingCoalescer:
+    """
+    Микробатчинг векторизации запросов.
+
+    Тексты, пришедшие от конкурентных поисков в течение max_wait_ms,
+    кодируются одним батчем на модель, каждый вызывающий получает свой вектор.
+    Батч отправляется сразу, как только набралось max_batch_size текстов.
+    """
+
+    def __init__(
+        self,
+        encode_batch: EncodeBatch,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: dict[str, list[tuple[str, asyncio.Future]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def encode(self, text: str, model_name: str) -> ndarray:
+        """Векторизация одного текста"""
+        vectors = await self.encode_many([text], model_name)
+        return vectors[0]
+
+    async def encode_many(self, texts: list[str], model_name: str) -> list[ndarray]:
+        """Векторизация нескольких текстов в общем батче"""
+        if not texts:
+            return []
+
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(model_name, [])
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            pending.append((text, future))
+            futures.append(future)
+
+        if len(pending) >= self.max_batch_size:
+            self._flush(model_name)
+        elif model_name not in self._timers:
+            self._timers[model_name] = loop.call_later(
+                self.max_wait, self._flush, model_name
+            )
+
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self, model_name: str):
+        """Отправить накопленные тексты модели на векторизацию"""
+        timer = self._timers.pop(model_name, None)
+        if timer is not None:
+            timer.cancel()
+
+        pending = self._pending.pop(model_name, [])
+        for start in range(0, len(pending), self.max_batch_size):
+            batch = pending[start : start + self.max_batch_size]
+            task = asyncio.ensure_future(self._run(model_name, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, model_name: str, batch: list[tuple[str, asyncio.Future]]):
+        try:
+            vectors = await self.encode_batch([text for text, _ in batch], model_name)
+        except Exception as e:
+            logger.error(f"Ошибка векторизации батча ({model_name}): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
@@ -0,0 +1,70 @@
+# Выделенный пул для векторизации вне event loop
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+
+class EmbeddingExecutor:
+    """
+    Пул потоков для CPU-bound инференса моделей.
+
+    torch отпускает GIL во время вычислений, поэтому потоков достаточно,
+    а модели не дублируются в памяти, как было бы с пулом процессов.
+    """
+
+    def __init__(self, max_workers: int = 2, torch_threads: int = 0):
+        self.max_workers = max_workers
+        self.torch_threads = torch_threads
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._configure_torch()
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="embedding",
+                    )
+        return self._pool
+
+    def _configure_torch(self):
+        """Ограничить число потоков torch, чтобы воркеры не конкурировали за ядра"""
+        if not self.torch_threads:
+            return
+        try:
+            import torch
+
+            torch.set_num_threads(self.torch_threads)
+        except ImportError:
+            logger.info("torch не установлен, число потоков не настроено")
+
+    async def run(self, func: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+        """Выполнить функцию в пуле и дождаться результата"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.pool, functools.partial(func, *args, **kwargs)
+        )
+
+    def shutdown(self):
+        """Остановить пул"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+embedding_executor = EmbeddingExecutor(
+    max_workers=settings.EMBEDDING_WORKERS,
+    torch_threads=settings.EMBEDDING_TORCH_THREADS,
+)
@@ -1,11 +1,13 @@
 import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 from numpy import ndarray
 from qdrant_client.models import PointStruct
-from sentence_transformers import SentenceTransformer
 
 from app import config
-from app.config import MembersDataType
+from app.config import MembersDataType, QdrantCollection
+from app.db.infrastructure.qdrant_schema import normalize_index_text
 import numpy as np
 
 from app.models.candidate import CandidateVector
@@ -16,166 +18,399 @@ from app.models.embeddings import (
     EmployerPayloadHard,
 )
 from app.models.employer import EmployerVector
+from app.utils.embedding_cache import EmbeddingCache
+from app.utils.embedding_coalescer import EmbeddingCoalescer
+from app.utils.embedding_executor import embedding_executor
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+embedding_cache = EmbeddingCache(
+    path=config.settings.EMBEDDING_CACHE_PATH or None,
+    max_items=config.settings.EMBEDDING_CACHE_SIZE,
+)
+
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "points.job-matcher")
+
+
+def make_point_id(
+    collection: QdrantCollection, entity_id: int, vector_name: str, key: str = ""
+) -> str:
+    """Детерминированный id точки: резюме/вакансия + тип вектора + ключ скилла"""
+    return str(
+        uuid.uuid5(
+            POINT_ID_NAMESPACE, f"{collection.value}:{entity_id}:{vector_name}:{key}"
+        )
+    )
+
+
+def skill_point_key(skill_name: str, seen: dict[str, int]) -> str:
+    """Ключ точки скилла: имя в нижнем регистре (не skill_name_norm, чтобы id точек
+    не зависели от нормализации для индекса), у повторов имени в той же
+    сущности добавляется порядковый номер, чтобы точки не затирали друг друга"""
+    ordinal = seen.get(skill_name, 0)
+    seen[skill_name] = ordinal + 1
+    return skill_name if ordinal == 0 else f"{skill_name}#{ordinal}"
+
+
+@dataclass
+class PointDraft:
+    """Точка до векторизации: id, текст для модели и payload с хэшем текста"""
+
+    id: str
+    vector_name: str
+    text: str
+    payload: dict
+
+    @classmethod
+    def create(
+        cls,
+        collection: QdrantCollection,
+        entity_id: int,
+        vector_name: str,
+        text: str,
+        payload: dict,
+        key: str = "",
+    ) -> "PointDraft":
+        payload["content_hash"] = EmbeddingCache.make_key(vector_name, text)[1]
+        return cls(
+            id=make_point_id(collection, entity_id, vector_name, key),
+            vector_name=vector_name,
+            text=text,
+            payload=payload,
+        )
 
 
 class MembersEmbeddingSystem:
     def __init__(self):
-        self.soft_model = config.SOFT_MODEL
-        self.hard_model = config.HARD_MODEL
+        self.soft_model_name = config.SOFT_MODEL_NAME
+        self.hard_model_name = config.HARD_MODEL_NAME
+
+    @property
+    def soft_model(self) -> "SentenceTransformer":
+        return config.model_registry.get(self.soft_model_name)
+
+    @property
+    def hard_model(self) -> "SentenceTransformer":
+        return config.model_registry.get(self.hard_model_name)
 
     def vectorize_candidate_data(self, candidate: CandidateVector) -> list[PointStruct]:
-        point_struct: list[PointStruct] = []
+        return self.vectorize_candidates_data([candidate])
 
-        for resume in candidate.resumes:
-            embedding_soft = MembersEmbeddingSystem.encode_long_text(
-                resume.summary, self.soft_model
-            )
+    async def avectorize_candidates_data(
+        self, candidates: list[CandidateVector]
+    ) -> list[PointStruct]:
+        """Векторизация кандидатов в пуле, не блокируя event loop"""
+        return await embedding_executor.run(self.vectorize_candidates_data, candidates)
 
-            payload = CandidatePayloadSoft(
-                type=MembersDataType.SOFT_SKILL.value,
-                user_id=candidate.id,
-                resume_id=resume.id,
-                title=resume.title,
-                summary=resume.summary,
-                age=candidate.age,
-                location=resume.location,
-                salary_from=resume.salary_from,
-                salary_to=resume.salary_to,
-                employment_type=resume.employment_type,
-                experience_age=resume.experience_age,
-                status=resume.status,
-                summary_norm=resume.summary.lower().strip(),
-                location_norm=resume.location.lower().strip(),
-                employment_type_norm=resume.employment_type.lower().strip(),
-            )
+    def vectorize_candidates_data(
+        self, candidates: list[CandidateVector]
+    ) -> list[PointStruct]:
+        """Векторизация нескольких кандидатов одним батчем на модель"""
+        return self.encode_drafts(self.candidates_point_drafts(candidates))
 
-            point_struct.append(
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector={
-                        MembersDataType.SOFT_SKILL.value: embedding_soft.tolist(),
-                    },
-                    payload=payload.model_dump(),
-                )
-            )
-            skills = [x for x in candidate.skills if x.resume_id == resume.id]
-            for skill in skills:
-                embedding_hard = MembersEmbeddingSystem.encode_long_text(
-                    f"{skill.skill_name.lower().strip()}, {skill.description.lower().strip()}",
-                    self.hard_model,
-                )
+    @staticmethod
+    def candidates_point_drafts(candidates: list[CandidateVector]) -> list[PointDraft]:
+        """Точки кандидатов без векторов: summary резюме и по точке на скилл"""
+        drafts: list[PointDraft] = []
+        collection = QdrantCollection.CANDIDATES
 
-                payload = CandidatePayloadHard(
-                    type=MembersDataType.HARD_SKILL.value,
+        for candidate in candidates:
+            for resume in candidate.resumes:
+                payload = CandidatePayloadSoft(
+                    type=MembersDataType.SOFT_SKILL.value,
                     user_id=candidate.id,
                     resume_id=resume.id,
-                    skill_name=skill.skill_name,
-                    experience_age=skill.experience_age,
-                    description=skill.description,
-                    skill_name_norm=skill.skill_name.lower().strip(),
-                    description_norm=skill.description.lower().strip(),
+                    title=resume.title,
+                    summary=resume.summary,
+                    age=candidate.age,
+                    location=resume.location,
+                    salary_from=resume.salary_from,
+                    salary_to=resume.salary_to,
+                    employment_type=resume.employment_type,
+                    experience_age=resume.experience_age,
+                    status=resume.status,
+                    summary_norm=normalize_index_text(resume.summary),
+                    location_norm=resume.location.lower().strip(),
+                    employment_type_norm=resume.employment_type.lower().strip(),
                 )
-
-                point_struct.append(
-                    PointStruct(
-                        id=str(uuid.uuid4()),
-                        vector={
-                            MembersDataType.HARD_SKILL.value: embedding_hard.tolist(),
-                        },
-                        payload=payload.model_dump(),
+                drafts.append(
+                    PointDraft.create(
+                        collection,
+                        resume.id,
+                        MembersDataType.SOFT_SKILL.value,
+                        resume.summary,
+                        payload.model_dump(),
                     )
                 )
 
-        return point_struct
+                skills = [x for x in candidate.skills if x.resume_id == resume.id]
+                seen: dict[str, int] = {}
+                for skill in skills:
+                    payload_hard = CandidatePayloadHard(
+                        type=MembersDataType.HARD_SKILL.value,
+                        user_id=candidate.id,
+                        resume_id=resume.id,
+                        skill_name=skill.skill_name,
+                        experience_age=skill.experience_age,
+                        description=skill.description,
+                        skill_name_norm=normalize_index_text(skill.skill_name),
+                        description_norm=normalize_index_text(skill.description),
+                    )
+                    drafts.append(
+                        PointDraft.create(
+                            collection,
+                            resume.id,
+                            MembersDataType.HARD_SKILL.value,
+                            f"{skill.skill_name.lower().strip()}, {skill.description.lower().strip()}",
+                            payload_hard.model_dump(),
+                            key=skill_point_key(skill.skill_name.lower().strip(), seen),
+                        )
+                    )
+
+        return drafts
 
     def vectorize_employer_data(self, employer: EmployerVector) -> list[PointStruct]:
-        point_struct: list[PointStruct] = []
+        return self.vectorize_employers_data([employer])
 
-        for vacancy in employer.vacancies:
-            embedding_soft = MembersEmbeddingSystem.encode_long_text(
-                vacancy.summary, self.soft_model
-            )
+    async def avectorize_employers_data(
+        self, employers: list[EmployerVector]
+    ) -> list[PointStruct]:
+        """Векторизация работодателей в пуле, не блокируя event loop"""
+        return await embedding_executor.run(self.vectorize_employers_data, employers)
 
-            payload = EmployerPayloadSoft(
-                type=MembersDataType.SOFT_SKILL.value,
-                employer_id=employer.id,
-                vacancy_id=vacancy.id,
-                title=vacancy.title,
-                summary=vacancy.summary,
-                experience_age_from=vacancy.experience_age_from,
-                experience_age_to=vacancy.experience_age_to,
-                location=vacancy.location,
-                salary_from=vacancy.salary_from,
-                salary_to=vacancy.salary_to,
-                employment_type=vacancy.employment_type,
-                work_mode=vacancy.work_mode,
-                summary_norm=vacancy.summary.lower().strip(),
-                location_norm=vacancy.location.lower().strip(),
-                employment_type_norm=vacancy.employment_type.lower().strip(),
-            )
+    def vectorize_employers_data(
+        self, employers: list[EmployerVector]
+    ) -> list[PointStruct]:
+        """Векторизация нескольких работодателей одним батчем на модель"""
+        return self.encode_drafts(self.employers_point_drafts(employers))
 
-            point_struct.append(
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector={
-                        MembersDataType.SOFT_SKILL.value: embedding_soft.tolist(),
-                    },
-                    payload=payload.model_dump(),
-                )
-            )
-            skills = [x for x in employer.skills if x.vacancy_id == vacancy.id]
-            for skill in skills:
-                embedding_hard = MembersEmbeddingSystem.encode_long_text(
-                    f"{skill.skill_name.lower().strip()}, {skill.description.lower().strip()}",
-                    self.hard_model,
-                )
+    @staticmethod
+    def employers_point_drafts(employers: list[EmployerVector]) -> list[PointDraft]:
+        """Точки работодателей без векторов: summary вакансии и по точке на скилл"""
+        drafts: list[PointDraft] = []
+        collection = QdrantCollection.EMPLOYERS
 
-                payload = EmployerPayloadHard(
-                    type=MembersDataType.HARD_SKILL.value,
+        for employer in employers:
+            for vacancy in employer.vacancies:
+                payload = EmployerPayloadSoft(
+                    type=MembersDataType.SOFT_SKILL.value,
                     employer_id=employer.id,
                     vacancy_id=vacancy.id,
-                    skill_name=skill.skill_name,
-                    experience_age=skill.experience_age,
-                    description=skill.description,
-                    description_hidden=skill.description_hidden,
-                    description_hidden_norm=skill.description_hidden.lower().strip(),
-                    skill_name_norm=skill.skill_name.lower().strip(),
-                    description_norm=skill.description.lower().strip(),
+                    title=vacancy.title,
+                    summary=vacancy.summary,
+                    experience_age_from=vacancy.experience_age_from,
+                    experience_age_to=vacancy.experience_age_to,
+                    location=vacancy.location,
+                    salary_from=vacancy.salary_from,
+                    salary_to=vacancy.salary_to,
+                    employment_type=vacancy.employment_type,
+                    work_mode=vacancy.work_mode,
+                    summary_norm=normalize_index_text(vacancy.summary),
+                    location_norm=vacancy.location.lower().strip(),
+                    employment_type_norm=vacancy.employment_type.lower().strip(),
+                )
+                drafts.append(
+                    PointDraft.create(
+                        collection,
+                        vacancy.id,
+                        MembersDataType.SOFT_SKILL.value,
+                        vacancy.summary,
+                        payload.model_dump(),
+                    )
                 )
 
+                skills = [x for x in employer.skills if x.vacancy_id == vacancy.id]
+                seen: dict[str, int] = {}
+                for skill in skills:
+                    payload_hard = EmployerPayloadHard(
+                        type=MembersDataType.HARD_SKILL.value,
+                        employer_id=employer.id,
+                        vacancy_id=vacancy.id,
+                        skill_name=skill.skill_name,
+                        experience_age=skill.experience_age,
+                        description=skill.description,
+                        description_hidden=skill.description_hidden,
+                        description_hidden_norm=normalize_index_text(
+                            skill.description_hidden
+                        ),
+                        skill_name_norm=normalize_index_text(skill.skill_name),
+                        description_norm=normalize_index_text(skill.description),
+                    )
+                    drafts.append(
+                        PointDraft.create(
+                            collection,
+                            vacancy.id,
+                            MembersDataType.HARD_SKILL.value,
+                            f"{skill.skill_name.lower().strip()}, {skill.description.lower().strip()}",
+                            payload_hard.model_dump(),
+                            key=skill_point_key(skill.skill_name.lower().strip(), seen),
+                        )
+                    )
+
+        return drafts
+
+    async def aencode_drafts(self, drafts: list[PointDraft]) -> list[PointStruct]:
+        """Векторизация точек в пуле, не блокируя event loop"""
+        return await embedding_executor.run(self.encode_drafts, drafts)
+
+    def encode_drafts(self, drafts: list[PointDraft]) -> list[PointStruct]:
+        """Кодируем тексты одним вызовом на модель и раскладываем по PointStruct"""
+        point_struct: list[PointStruct] = []
+
+        for vector_name, model_name in (
+            (MembersDataType.SOFT_SKILL.value, self.soft_model_name),
+            (MembersDataType.HARD_SKILL.value, self.hard_model_name),
+        ):
+            items = [d for d in drafts if d.vector_name == vector_name]
+            if not items:
+                continue
+
+            embeddings = MembersEmbeddingSystem.encode_long_texts(
+                [d.text for d in items],
+                config.model_registry.get(model_name),
+                model_name=model_name,
+            )
+            for draft, embedding in zip(items, embeddings):
                 point_struct.append(
                     PointStruct(
-                        id=str(uuid.uuid4()),
-                        vector={
-                            MembersDataType.HARD_SKILL.value: embedding_hard.tolist(),
-                        },
-                        payload=payload.model_dump(),
+                        id=draft.id,
+                        vector={vector_name: embedding.tolist()},
+                        payload=draft.payload,
                     )
                 )
 
         return point_struct
 
+    @staticmethod
+    def split_chunks(text: str, chunk_size=512, overlap=50) -> list[str]:
+        """
+        Разбиение текста на overlapping chunks по словам
+        """
+        words = text.split()
+        if not words:
+            # Пустой текст кодируем как есть, чтобы не получить nan при усреднении
+            return [""]
+
+        return [
+            " ".join(words[i : i + chunk_size])
+            for i in range(0, len(words), chunk_size - overlap)
+        ]
+
+    @staticmethod
+    def encode_long_texts(
+        texts: list[str],
+        model: "SentenceTransformer",
+        chunk_size=512,
+        overlap=50,
+        batch_size=64,
+        model_name: str | None = None,
+    ) -> ndarray:
+        """
+        Батчевая векторизация списка длинных текстов.
+
+        Если передано имя модели, embeddings берутся из кэша,
+        кодируются только уникальные промахи.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        use_cache = bool(model_name) and config.settings.EMBEDDING_CACHE_ENABLED
+        by_text: dict[str, ndarray] = {}
+        if use_cache:
+            cached = embedding_cache.get_many(str(model_name), texts)
+            by_text = {t: v for t, v in zip(texts, cached) if v is not None}
+
+        pending = list(dict.fromkeys(t for t in texts if t not in by_text))
+        if pending:
+            encoded = MembersEmbeddingSystem._encode_chunked(
+                pending, model, chunk_size, overlap, batch_size
+            )
+            if use_cache:
+                embedding_cache.put_many(str(model_name), pending, encoded)
+
+            by_text.update(zip(pending, encoded))
+
+        return np.vstack([by_text[t] for t in texts])
+
+    @staticmethod
+    def _encode_chunked(
+        texts: list[str],
+        model: "SentenceTransformer",
+        chunk_size: int,
+        overlap: int,
+        batch_size: int,
+    ) -> ndarray:
+        """
+        Chunks всех текстов кодируются одним вызовом model.encode,
+        затем embeddings усредняются по каждому исходному тексту.
+        """
+        chunks: list[str] = []
+        starts: list[int] = []
+        for text in texts:
+            starts.append(len(chunks))
+            chunks.extend(
+                MembersEmbeddingSystem.split_chunks(text, chunk_size, overlap)
+            )
+
+        # Кодируем все chunks
+        chunk_embeddings = np.asarray(model.encode(chunks, batch_size=batch_size))
+
+        # Усредняем embeddings chunks по каждому тексту
+        counts = np.diff(np.append(starts, len(chunks)))
+        sums = np.add.reduceat(chunk_embeddings, starts, axis=0)
+        return sums / counts[:, None]
+
     @staticmethod
     def encode_long_text(
-        text, model: SentenceTransformer, chunk_size=512, overlap=50
+        text,
+        model: "SentenceTransformer",
+        chunk_size=512,
+        overlap=50,
+        model_name: str | None = None,
     ) -> ndarray:
         """
         Векторизация длинного текста с разбиением на chunks
         """
-        # Разбиваем текст на предложения или слова
-        words = text.split()
-        chunks = []
+        return MembersEmbeddingSystem.encode_long_texts(
+            [text],
+            model,
+            chunk_size=chunk_size,
+            overlap=overlap,
+            model_name=model_name,
+        )[0]
 
-        # Создаем overlapping chunks
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = " ".join(words[i : i + chunk_size])
-            chunks.append(chunk)
+    @staticmethod
+    async def aencode_long_texts(texts: list[str], model_name: str) -> ndarray:
+        """
+        Векторизация текстов в пуле; модель берется из реестра
+        уже внутри пула, чтобы ее загрузка тоже не блокировала event loop
+        """
+        return await embedding_executor.run(
+            lambda: MembersEmbeddingSystem.encode_long_texts(
+                texts, config.model_registry.get(model_name), model_name=model_name
+            )
+        )
 
-        # Кодируем все chunks
-        chunk_embeddings = model.encode(chunks)
+    @staticmethod
+    async def aencode_long_text(text: str, model_name: str) -> ndarray:
+        """Векторизация одного текста в пуле"""
+        vectors = await MembersEmbeddingSystem.aencode_long_texts([text], model_name)
+        return vectors[0]
 
-        # Усредняем embeddings всех chunks
-        return np.mean(chunk_embeddings, axis=0)
+    @staticmethod
+    async def aencode_queries(texts: list[str], model_name: str) -> list[ndarray]:
+        """
+        Векторизация поисковых запросов: тексты конкурентных поисков
+        объединяются в общий батч
+        """
+        return await embedding_coalescer.encode_many(texts, model_name)
 
 
 members_embedding_system = MembersEmbeddingSystem()
+
+embedding_coalescer = EmbeddingCoalescer(
+    encode_batch=MembersEmbeddingSystem.aencode_long_texts,
+    max_batch_size=config.settings.EMBEDDING_COALESCE_MAX_BATCH,
+    max_wait_ms=config.settings.EMBEDDING_COALESCE_MAX_WAIT_MS,
+)
@@ -1,26 +1,31 @@
-from typing import Tuple
+import asyncio
+from dataclasses import dataclass
 
 from numpy import ndarray
 from qdrant_client.http.models import Filter, models
 
+from app.db.infrastructure.qdrant_schema import normalize_index_text
 from app.models.filter import SearchRequest, SearchFilters
 
 
+@dataclass
+class SearchQuery:
+    """Фильтры и векторы запроса, *_vector_not - векторы исключений must_not"""
+
+    soft_filter: Filter | None = None
+    hard_filter: Filter | None = None
+    soft_vector: ndarray | None = None
+    hard_vector: ndarray | None = None
+    hard_vector_not: list[ndarray] | None = None
+    soft_vector_not: list[ndarray] | None = None
+
+
 class QdrantFilterBuilder:
     def __init__(self, config, embedding_system):
         self.config = config
         self.embedding_system = embedding_system
 
-    async def build(
-        self, search_request: SearchRequest
-    ) -> Tuple[
-        Filter | None,
-        Filter | None,
-        ndarray | None,
-        ndarray | None,
-        ndarray | None,
-        ndarray | None,
-    ]:
+    async def build(self, search_request: SearchRequest) -> SearchQuery:
         # Весь код из _build_qdrant_filters
         soft_skills_must: list[models.FieldCondition] = []
         soft_skills_should: list[models.FieldCondition] = []
@@ -50,13 +55,6 @@ class QdrantFilterBuilder:
             ]
         ).strip()
 
-        if text_hard:
-            hard_vector = self.embedding_system.encode_long_text(
-                model=self.config.HARD_MODEL, text=text_hard
-            )
-        else:
-            hard_vector = None
-
         summary_must = filters.summary.must_have if filters.summary else []
         summary_should = filters.summary.should_have if filters.summary else []
 
@@ -68,61 +66,55 @@ class QdrantFilterBuilder:
             ]
         ).strip()
 
-        if text_soft:
-            soft_vector = self.embedding_system.encode_long_text(
-                model=self.config.SOFT_MODEL, text=text_soft
-            )
-        else:
-            soft_vector = None
-
-        # Векторизуем skills must_not_have для исключения в post-обработке
+        # skills и summary must_not_have векторизуем для исключения в post-обработке
         skills_must_not = filters.skills.must_not_have if filters.skills else []
-        hard_vector_not = []
-        for skill in skills_must_not:
-            vector = self.embedding_system.encode_long_text(
-                model=self.config.HARD_MODEL, text=skill.lower()
-            )
-            hard_vector_not.append(vector)
-
-        if not hard_vector_not:
-            hard_vector_not = None  # type: ignore[assignment]
-
-        # Векторизуем summary must_not_have для исключения в post-обработке
         summary_must_not = filters.summary.must_not_have if filters.summary else []
-        soft_vector_not = []
-        for summary in summary_must_not:
-            vector = self.embedding_system.encode_long_text(
-                model=self.config.SOFT_MODEL, text=summary.lower()
-            )
-            soft_vector_not.append(vector)
 
-        if not soft_vector_not:
-            soft_vector_not = None  # type: ignore[assignment]
+        hard_texts = [text_hard] if text_hard else []
+        hard_texts.extend(skill.lower() for skill in skills_must_not)
+        soft_texts = [text_soft] if text_soft else []
+        soft_texts.extend(summary.lower() for summary in summary_must_not)
+
+        # Все тексты запроса уходят в общий батч на модель
+        hard_vectors, soft_vectors = await asyncio.gather(
+            self.embedding_system.aencode_queries(
+                hard_texts, self.config.HARD_MODEL_NAME
+            ),
+            self.embedding_system.aencode_queries(
+                soft_texts, self.config.SOFT_MODEL_NAME
+            ),
+        )
+
+        hard_vector = hard_vectors.pop(0) if text_hard else None
+        soft_vector = soft_vectors.pop(0) if text_soft else None
+        hard_vector_not = hard_vectors or None
+        soft_vector_not = soft_vectors or None
 
         # Соберем фильтры
 
         # 1 Hard skills фильтры
 
-        # Дополнительно жестко ограничим навыки, если они пришли в фильтре
+        # Дополнительно жестко ограничим навыки, если они пришли в фильтре.
+        # MatchText - по словам названия: "python" найдет и "python 3.11",
+        # а "c++" не совпадет с "c#" (см. normalize_index_text)
         if filters.skills:
             if filters.skills.must_have:
                 hard_skills_must.extend(
                     [
                         models.FieldCondition(
                             key="skill_name_norm",
-                            match=models.MatchText(text=skill.lower()),
+                            match=models.MatchText(text=normalize_index_text(skill)),
                         )
                         for skill in filters.skills.must_have
                     ]
                 )
 
-            # MatchText работает как полнотекстовый поиск
             if filters.skills.must_not_have:
                 hard_skills_must_not.extend(
                     [
                         models.FieldCondition(
                             key="skill_name_norm",
-                            match=models.MatchText(text=skill.lower()),
+                            match=models.MatchText(text=normalize_index_text(skill)),
                         )
                         for skill in filters.skills.must_not_have
                     ]
@@ -133,7 +125,7 @@ class QdrantFilterBuilder:
                     [
                         models.FieldCondition(
                             key="skill_name_norm",
-                            match=models.MatchText(text=skill.lower()),
+                            match=models.MatchText(text=normalize_index_text(skill)),
                         )
                         for skill in filters.skills.should_have
                     ]
@@ -148,7 +140,7 @@ class QdrantFilterBuilder:
                     [
                         models.FieldCondition(
                             key="summary_norm",
-                            match=models.MatchText(text=skill.lower().strip()),
+                            match=models.MatchText(text=normalize_index_text(skill)),
                         )
                         for skill in filters.summary.must_have
                     ]
@@ -183,7 +175,7 @@ class QdrantFilterBuilder:
                     [
                         models.FieldCondition(
                             key="description_norm",
-                            match=models.MatchText(text=skill.lower()),
+                            match=models.MatchText(text=normalize_index_text(skill)),
                         )
                         for skill in filters.description.must_not_have
                     ]
@@ -294,11 +286,11 @@ class QdrantFilterBuilder:
         soft_filter = Filter(**filter_soft) if filter_soft else None
         hard_filter = Filter(**filter_hard) if filter_hard else None
 
-        return (
-            soft_filter,
-            hard_filter,
-            soft_vector,
-            hard_vector,
-            hard_vector_not,
-            soft_vector_not,
+        return SearchQuery(
+            soft_filter=soft_filter,
+            hard_filter=hard_filter,
+            soft_vector=soft_vector,
+            hard_vector=hard_vector,
+            hard_vector_not=hard_vector_not,
+            soft_vector_not=soft_vector_not,
         )
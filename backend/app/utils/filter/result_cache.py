@@ -0,0 +1,92 @@
+# Кэш наборов результатов поиска для постраничной выдачи
+import base64
+import binascii
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class SearchCursor:
+    """
+    Позиция в выдаче поиска.
+
+    result_set_id - набор результатов в кэше, request_hash - запрос, для которого
+    он посчитан, offset - сколько результатов уже отдано.
+    """
+
+    result_set_id: str
+    request_hash: str
+    offset: int
+
+    def encode(self) -> str:
+        """Непрозрачная строка курсора для клиента"""
+        raw = json.dumps(
+            {"rs": self.result_set_id, "rh": self.request_hash, "o": self.offset},
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "SearchCursor":
+        """Разобрать курсор, ValueError - если он поврежден"""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return cls(
+                result_set_id=str(data["rs"]),
+                request_hash=str(data["rh"]),
+                offset=max(int(data["o"]), 0),
+            )
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Некорректный курсор: {e}")
+
+    @staticmethod
+    def hash_request(*parts: str) -> str:
+        """Хэш запроса, к которому привязан курсор"""
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class SearchResultSetCache:
+    """
+    LRU с TTL для полных ранжированных наборов результатов поиска.
+
+    Первая страница считает весь набор (embeddings, слияние, штрафы) и кладет
+    его сюда, следующие страницы режутся из кэша по курсору.
+    """
+
+    def __init__(self, ttl: float = 300, max_items: int = 256):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._items: OrderedDict[str, tuple[float, list[Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, results: list[Any]) -> str:
+        """Сохранить набор, вернуть его id"""
+        result_set_id = uuid.uuid4().hex
+        with self._lock:
+            self._items[result_set_id] = (time.monotonic() + self.ttl, results)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return result_set_id
+
+    def get(self, result_set_id: str) -> list[Any] | None:
+        """Набор по id, None - если его нет или он устарел"""
+        with self._lock:
+            item = self._items.get(result_set_id)
+            if item is None:
+                return None
+            expires_at, results = item
+            if expires_at < time.monotonic():
+                del self._items[result_set_id]
+                return None
+            self._items.move_to_end(result_set_id)
+            return results
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
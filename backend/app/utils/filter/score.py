@@ -1,29 +1,50 @@
-import re
-from typing import List, TypeVar, Type
-
-from qdrant_client.http.models import ScoredPoint, Filter
-from rapidfuzz import fuzz
+from dataclasses import fields
+from typing import Generic, Sequence, TypeVar, Type
+
+import numpy as np
+from numpy import ndarray
+from qdrant_client.http.models import (
+    Filter,
+    MatchText,
+    Record,
+    ScoredPoint,
+)
 
 from app.config import MembersDataType
 from app.models.match import (
     EmployerMatch,
     CandidateMatch,
-    SkillMatch,
-    ResumeMatchResponse,
-    VacancyMatchResponse,
+    SkillRecord,
+    ResumeSearchRecord,
+    VacancySearchRecord,
 )
+from app.utils.filter.term_matcher import TermMatcher
 
 T = TypeVar("T", EmployerMatch, CandidateMatch)
 
+SearchRecord = ResumeSearchRecord | VacancySearchRecord
+
+RECORD_CLASSES = {
+    CandidateMatch: ResumeSearchRecord,
+    EmployerMatch: VacancySearchRecord,
+}
+# Поля записи, которые берутся из payload soft-точки
+RECORD_PAYLOAD_FIELDS = {
+    entity_cls: tuple(
+        f.name for f in fields(record_cls) if f.name not in ("skills", "score")
+    )
+    for entity_cls, record_cls in RECORD_CLASSES.items()
+}
 
-class FilterScore:
+
+class FilterScore(Generic[T]):
     def __init__(
         self,
-        points: List["ScoredPoint"],
-        hard_filter: Filter,
-        soft_filter: Filter,
-        hard_vector_not: list[float] | None,
-        soft_vector_not: list[float] | None,
+        points: Sequence[ScoredPoint | Record],
+        hard_filter: Filter | None,
+        soft_filter: Filter | None,
+        hard_vector_not: list[ndarray] | None,
+        soft_vector_not: list[ndarray] | None,
         entity_cls: Type[T],
         averaged_scores: dict[int, float],
         similarity_threshold: float = 0.4,
@@ -43,165 +64,198 @@ class FilterScore:
         self.hards: dict[int, list] = {}
         self.softs: dict = {}
 
+    @staticmethod
+    def score_payload_fields(entity_cls: Type[T]) -> list[str]:
+        """Поля payload, нужные для подсчета score"""
+        return sorted({"type", "skill_name_norm"} | set(entity_cls.key_fields))
+
     async def calc_score(self):
+        _, entity_field = self.entity_cls.key_fields
+        # Векторы точек для штрафов по сходству с must_not: ключи и строки матрицы
+        soft_keys: list[int] = []
+        soft_vectors: list[list[float]] = []
+        hard_keys: list[int] = []
+        hard_vectors: list[list[float]] = []
+        # Названия hard-навыков для совпадений с must/must_not
+        term_keys: list[int] = []
+        term_names: list[str] = []
+
         # Соберем результат в {ключ,score} -> payload
         for res in self.points:
-            keys = await self.entity_cls(**res.payload).get_key_name_value()
+            keys = (entity_field, res.payload.get(entity_field))
+            vectors = res.vector or {}
             if res.payload.get("type", "") == "soft_skill":
                 self.softs[keys[1]] = res.payload
 
-                curr_vector = res.vector.get(MembersDataType.SOFT_SKILL.value, [])
-
-                # По сходству COS, будем штрафовать
-                if (curr_vector and self.soft_vector_not) and (
-                    cos_sim := self._cosine_similarity(
-                        self.soft_vector_not, curr_vector
-                    )
-                ) > self.similarity_threshold:
-                    penalty = (cos_sim - self.similarity_threshold) * 0.25
-                    self.decrease_score[keys[1]] = (
-                        self.decrease_score.get(keys[1], 0) + penalty
-                    )
+                curr_vector = vectors.get(MembersDataType.SOFT_SKILL.value)
+                if curr_vector is not None and self.soft_vector_not is not None:
+                    soft_keys.append(keys[1])
+                    soft_vectors.append(curr_vector)
 
             elif res.payload.get("type", "") == "hard_skill":
                 self.hards.setdefault(keys[1], []).append(res.payload)
 
-                curr_vector = res.vector.get(MembersDataType.HARD_SKILL.value, [])
-
-                skill_name = res.payload.get("skill_name_norm", "")
-
-                # Найдем вхождения
-
-                # За каждое совпадение будем штрафовать
-                if self.hard_filter and self.hard_filter.must_not:
-                    matches = sum(
-                        bool(
-                            re.search(
-                                rf"\b{re.escape(must_not.match.text)}\b", skill_name
-                            )
-                        )
-                        for must_not in self.hard_filter.must_not
-                    )
-                    fuzzy_score = sum(
-                        fuzz.partial_ratio(must_not.match.text, skill_name)
-                        for must_not in self.hard_filter.must_not
-                    )
-
-                    if matches or fuzzy_score > 85:
-                        self.decrease_score[keys[1]] = (
-                            self.decrease_score.get(keys[1], 0) + 0.1 * matches
-                        )
-
-                # За каждое совпадение будем увеличивать score
-                if self.hard_filter and self.hard_filter.must:
-                    matches = sum(
-                        bool(
-                            re.search(rf"\b{re.escape(must.match.text)}\b", skill_name)
-                        )
-                        for must in self.hard_filter.must
-                    )
-                    fuzzy_score = sum(
-                        fuzz.partial_ratio(must.match.text, skill_name)
-                        for must in self.hard_filter.must
-                    )
+                curr_vector = vectors.get(MembersDataType.HARD_SKILL.value)
+                if curr_vector is not None and self.hard_vector_not is not None:
+                    hard_keys.append(keys[1])
+                    hard_vectors.append(curr_vector)
 
-                    if matches or fuzzy_score > 85:
-                        self.increase_score[keys[1]] = (
-                            self.decrease_score.get(keys[1], 0) + 0.1
-                        )
-
-                # По сходству COS, будем штрафовать
-                if (self.hard_vector_not and curr_vector) and (
-                    cos_sim := self._cosine_similarity(
-                        self.hard_vector_not, curr_vector
-                    )
-                ) > self.similarity_threshold:
-                    penalty = (cos_sim - self.similarity_threshold) * 0.25
-                    self.decrease_score[keys[1]] = (
-                        self.decrease_score.get(keys[1], 0) + penalty
-                    )
+                term_keys.append(keys[1])
+                term_names.append(res.payload.get("skill_name_norm", ""))
 
             self.result_scores[keys[1]] = self.averaged_scores.get(keys[1], 0)
 
-    def assemble_results(self, first_call: bool) -> list[T]:
-        result = []
-
-        for s_key, soft in self.softs.items():
-            skills: list[SkillMatch] = []
-            for k, v in self.hards.items():
-                if k == s_key:
-                    skills.extend([SkillMatch(**skill2) for skill2 in v])
+        self._add_term_scores(term_keys, term_names)
+
+        # По сходству COS, будем штрафовать
+        self._add_similarity_penalties(soft_keys, soft_vectors, self.soft_vector_not)
+        self._add_similarity_penalties(hard_keys, hard_vectors, self.hard_vector_not)
+
+    def _add_term_scores(self, keys: list[int], names: list[str]):
+        """Штрафы за must_not и бонус за must по названиям навыков"""
+        if not keys or not self.hard_filter:
+            return
+        must_not = TermMatcher(_filter_terms(self.hard_filter.must_not))
+        must = TermMatcher(_filter_terms(self.hard_filter.must))
+
+        # За каждое совпадение будем штрафовать
+        if must_not:
+            matched = must_not.match_many(names)
+            for key, name in zip(keys, names):
+                matches, hit = matched[name]
+                if hit and matches:
+                    self.decrease_score[key] = (
+                        self.decrease_score.get(key, 0) + 0.1 * matches
+                    )
 
-            max_penalty = 0.5
-            penalty = 0.0
+        # Есть совпадение - увеличиваем score
+        if must:
+            matched = must.match_many(names)
+            for key, name in zip(keys, names):
+                if matched[name][1]:
+                    self.increase_score[key] = 0.1
 
+    def _add_similarity_penalties(
+        self,
+        keys: list[int],
+        vectors: list[list[float]],
+        vectors_not: list[ndarray] | None,
+    ):
+        """
+        Штрафы за сходство точек с исключающими векторами.
+
+        Все косинусы считаются одним матричным произведением
+        (точки x исключения), за каждое исключение сверх similarity_threshold
+        точка штрафуется на (cos - threshold) * 0.25, штрафы суммируются по ключу.
+        """
+        if not keys or not vectors_not:
+            return
+
+        points = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        exclusions = _normalize_rows(np.asarray(vectors_not, dtype=np.float32))
+        excess = points @ exclusions.T - self.similarity_threshold
+        penalties = np.clip(excess, 0, None).sum(axis=1) * 0.25
+
+        for index in np.flatnonzero(penalties):
+            key = keys[index]
+            self.decrease_score[key] = self.decrease_score.get(key, 0) + float(
+                penalties[index]
+            )
+
+    def ranked_scores(self, first_call: bool) -> list[tuple[int, float]]:
+        """
+        (ключ, score) найденных вакансий/резюме по убыванию score.
+
+        Ключ попадает в выдачу, только если у него есть soft-точка.
+        """
+        max_penalty = 0.5
+        ranked: list[tuple[int, float]] = []
+
+        for s_key in self.softs:
             if first_call:
                 score = 0.0
             else:
                 score = self.result_scores.get(s_key, 0.0)
 
-                # Получим все штрафы
-                if s_key in self.decrease_score:
-                    penalty += self.decrease_score[s_key]
-
-                # Ограничим максимум
-                penalty = min(penalty, max_penalty)
+                # Получим все штрафы и ограничим максимум
+                penalty = min(self.decrease_score.get(s_key, 0.0), max_penalty)
 
                 # Если ключ в поиске, увеличиваем score
                 score += self.increase_score.get(s_key, 0)
 
                 score = score * (1 - penalty)
 
-            if self.entity_cls is CandidateMatch:
-                result.append(
-                    ResumeMatchResponse(
-                        user_id=soft.get("user_id", ""),
-                        resume_id=soft.get("resume_id", ""),
-                        title=soft.get("title", ""),
-                        summary=soft.get("summary", ""),
-                        age=soft.get("age", ""),
-                        location=soft.get("location", ""),
-                        salary_from=soft.get("salary_from", ""),
-                        salary_to=soft.get("salary_to", ""),
-                        employment_type=soft.get("employment_type", ""),
-                        experience_age=soft.get("experience_age", ""),
-                        status=soft.get("status", ""),
-                        skills=skills,
-                        score=score,
-                    )
-                )
-            elif self.entity_cls is EmployerMatch:
-                result.append(
-                    VacancyMatchResponse(
-                        employer_id=soft.get("employer_id", ""),
-                        vacancy_id=soft.get("vacancy_id", ""),
-                        title=soft.get("title", ""),
-                        summary=soft.get("summary", ""),
-                        experience_age_from=soft.get("experience_age_from", ""),
-                        experience_age_to=soft.get("experience_age_to", ""),
-                        location=soft.get("location", ""),
-                        salary_from=soft.get("salary_from", ""),
-                        salary_to=soft.get("salary_to", ""),
-                        employment_type=soft.get("employment_type", ""),
-                        work_mode=soft.get("work_mode", ""),
-                        skills=skills,
-                        score=score,
-                    )
+            ranked.append((s_key, score))
+
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+
+def record_payload_fields(entity_cls: Type[T]) -> list[str]:
+    """Поля payload, нужные для сборки записей выдачи"""
+    payload_fields = set(RECORD_PAYLOAD_FIELDS[entity_cls])
+    payload_fields |= {f.name for f in fields(SkillRecord)}
+    payload_fields |= {"type"} | set(entity_cls.key_fields)
+    return sorted(payload_fields)
+
+
+def assemble_records(
+    entity_cls: Type[T],
+    points: Sequence[ScoredPoint | Record],
+    ranked: list[tuple[int, float]],
+) -> list[SearchRecord]:
+    """
+    Записи выдачи в порядке ranked: одна на soft-точку, навыки - из hard-точек
+    того же ключа. Ключи без soft-точки (удалены после ранжирования) пропускаются.
+    """
+    _, entity_field = entity_cls.key_fields
+    record_cls = RECORD_CLASSES[entity_cls]
+    record_fields = RECORD_PAYLOAD_FIELDS[entity_cls]
+
+    softs: dict[int, dict] = {}
+    skills: dict[int, list[SkillRecord]] = {}
+    for point in points:
+        payload = point.payload or {}
+        key = payload.get(entity_field)
+        if key is None:
+            continue
+        if payload.get("type", "") == MembersDataType.SOFT_SKILL.value:
+            softs[key] = payload
+        elif payload.get("type", "") == MembersDataType.HARD_SKILL.value:
+            skills.setdefault(key, []).append(
+                SkillRecord(
+                    skill_name=payload.get("skill_name", ""),
+                    description=payload.get("description", ""),
+                    experience_age=payload.get("experience_age", 0),
                 )
-        return result
-
-    def _cosine_similarity(self, vec1: list[float], vec2: list[float]) -> float:
-        """Вычисляет косинусную схожесть между векторами."""
-        import numpy as np
-
-        v1 = np.array(vec1)
-        v2 = np.array(vec2)
-
-        dot_product = np.dot(v1, v2)
-        norm1 = np.linalg.norm(v1)
-        norm2 = np.linalg.norm(v2)
-
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-
-        return dot_product / (norm1 * norm2)
+            )
+
+    return [
+        record_cls(
+            **{name: soft[name] for name in record_fields if name in soft},
+            skills=skills.get(key, []),
+            score=score,
+        )
+        for key, score in ranked
+        if (soft := softs.get(key)) is not None
+    ]
+
+
+def _filter_terms(conditions) -> list[str]:
+    """Тексты MatchText из условий фильтра"""
+    if not conditions:
+        return []
+    if not isinstance(conditions, list):
+        conditions = [conditions]
+    return [
+        condition.match.text
+        for condition in conditions
+        if isinstance(getattr(condition, "match", None), MatchText)
+    ]
+
+
+def _normalize_rows(matrix: ndarray) -> ndarray:
+    """Строки единичной длины, нулевые строки остаются нулевыми"""
+    matrix = np.atleast_2d(matrix)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
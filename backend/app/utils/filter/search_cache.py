@@ -0,0 +1,302 @@
+# Кэш результатов поиска по нормализованному запросу
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, TypeVar
+
+import orjson
+
+from app.config import SearchCacheBackend, settings
+from app.models.filter import SearchFilters
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+# Текстовые условия, которые сравниваются без учета регистра
+TEXT_SEARCH_FIELDS = ("skills", "summary", "description")
+
+
+def normalize_filters(filters: SearchFilters) -> SearchFilters:
+    """
+    Канонический вид фильтров.
+
+    Списки без дублей и в отсортированном порядке, текстовые условия
+    в нижнем регистре без лишних пробелов. Поиск выполняется по этому же виду,
+    поэтому одинаковые по смыслу запросы дают одинаковый результат и ключ кэша.
+    """
+    data = filters.model_dump()
+    for name, value in data.items():
+        if not isinstance(value, dict):
+            continue
+        for key, items in value.items():
+            if not isinstance(items, list):
+                continue
+            if name in TEXT_SEARCH_FIELDS:
+                items = [" ".join(str(item).lower().split()) for item in items]
+            value[key] = sorted({item for item in items if item != ""})
+    return SearchFilters.model_validate(data)
+
+
+def filters_key(filters: SearchFilters) -> str:
+    """sha256 канонического JSON фильтров"""
+    raw = normalize_filters(filters).model_dump_json(exclude_defaults=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemorySearchCacheStore:
+    """
+    LRU в памяти процесса, версии коллекций видны только этому процессу.
+
+    Запись в коллекцию из другого процесса (другой воркер uvicorn, bulk_recalc)
+    этот кэш не инвалидирует, и до SEARCH_CACHE_TTL он может отдавать старую
+    выдачу. При нескольких воркерах нужен SearchCacheBackend.SQLITE.
+    """
+
+    def __init__(self, max_items: int = 1024):
+        self.max_items = max_items
+        self._items: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+
+    def get(self, key: str) -> Any | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.time():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any, ttl: float):
+        self._items[key] = (time.time() + ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def version(self, collection: str) -> int:
+        return self._versions.get(collection, 0)
+
+    def bump(self, collection: str):
+        self._versions[collection] = self.version(collection) + 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def clear(self):
+        self._items.clear()
+
+
+class SqliteSearchCacheStore:
+    """
+    Общее для воркеров хранилище в SQLite.
+
+    Версии коллекций тоже лежат в нем, поэтому запись в любом процессе
+    инвалидирует кэш всех процессов. Значения хранятся в JSON (orjson),
+    соединение одно на процесс и используется под блокировкой.
+    """
+
+    def __init__(self, path: str, max_items: int = 1024):
+        self.path = path
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_results ("
+            "key TEXT PRIMARY KEY, "
+            "expires_at REAL NOT NULL, "
+            "value BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS collection_versions ("
+            "collection TEXT PRIMARY KEY, "
+            "version INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM search_results WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def put(self, key: str, value: Any, ttl: float):
+        blob = orjson.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results (key, expires_at, value) "
+                "VALUES (?, ?, ?)",
+                (key, now + ttl, blob),
+            )
+            # Сначала устаревшие, затем самые старые сверх лимита
+            self._conn.execute(
+                "DELETE FROM search_results WHERE expires_at < ?", (now,)
+            )
+            self._conn.execute(
+                "DELETE FROM search_results WHERE key NOT IN ("
+                "SELECT key FROM search_results ORDER BY expires_at DESC LIMIT ?)",
+                (self.max_items,),
+            )
+            self._conn.commit()
+
+    def version(self, collection: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM collection_versions WHERE collection = ?",
+                (collection,),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, collection: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO collection_versions (collection, version) VALUES (?, 1) "
+                "ON CONFLICT(collection) DO UPDATE SET version = version + 1",
+                (collection,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT count(*) FROM search_results").fetchone()
+        return row[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM search_results")
+            self._conn.commit()
+
+
+SearchCacheStore = MemorySearchCacheStore | SqliteSearchCacheStore
+
+
+class SearchCache:
+    """
+    Кэш полных наборов результатов поиска.
+
+    Ключ - коллекция, версия записи в нее и хэш нормализованных фильтров.
+    Любая запись в коллекцию (upsert/удаление точек) увеличивает ее версию,
+    и старые записи кэша перестают находиться, не дожидаясь TTL.
+    Из async-кода - методы a*: запросы к SQLite идут в потоке, не блокируя
+    event loop.
+    """
+
+    def __init__(self, store: SearchCacheStore | None, ttl: float = 60.0):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, collection: str, filters: SearchFilters) -> str | None:
+        """
+        Ключ запроса для текущей версии коллекции.
+
+        Берется до выполнения поиска: если во время поиска была запись,
+        результат сохранится под старой версией и не будет найден.
+        """
+        if self.store is None:
+            return None
+        with self._lock:
+            try:
+                version = self.store.version(collection)
+            except sqlite3.Error as e:
+                logger.error(f"Search cache storage unavailable: {e}")
+                return None
+        return f"{collection}:{version}:{filters_key(filters)}"
+
+    def get(self, key: str | None) -> Any | None:
+        """Результаты запроса, None - промах"""
+        if self.store is None or key is None:
+            return None
+        with self._lock:
+            try:
+                value = self.store.get(key)
+            except sqlite3.Error as e:
+                logger.error(f"Search cache storage unavailable: {e}")
+                value = None
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: str | None, value: Any):
+        if self.store is None or key is None:
+            return
+        with self._lock:
+            try:
+                self.store.put(key, value, self.ttl)
+            except sqlite3.Error as e:
+                logger.error(f"Search cache storage unavailable: {e}")
+
+    def invalidate(self, collection: str):
+        """Новая версия коллекции после записи в нее"""
+        if self.store is None:
+            return
+        with self._lock:
+            try:
+                self.store.bump(collection)
+            except sqlite3.Error as e:
+                logger.error(f"Search cache storage unavailable: {e}")
+
+    async def akey(self, collection: str, filters: SearchFilters) -> str | None:
+        return await self._call(self.key, collection, filters)
+
+    async def aget(self, key: str | None) -> Any | None:
+        return await self._call(self.get, key)
+
+    async def aput(self, key: str | None, value: Any):
+        await self._call(self.put, key, value)
+
+    async def ainvalidate(self, collection: str):
+        await self._call(self.invalidate, collection)
+
+    async def _call(self, method: Callable[..., R], *args: Any) -> R:
+        """Память - сразу, SQLite - в потоке"""
+        if isinstance(self.store, SqliteSearchCacheStore):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    def stats(self) -> dict:
+        """Счетчики попаданий/промахов"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "items": len(self.store) if self.store is not None else 0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            if self.store is not None:
+                self.store.clear()
+
+
+def create_store() -> SearchCacheStore | None:
+    """Хранилище кэша по настройкам"""
+    if not settings.SEARCH_CACHE_ENABLED:
+        return None
+    if settings.SEARCH_CACHE_BACKEND is SearchCacheBackend.SQLITE:
+        try:
+            return SqliteSearchCacheStore(
+                settings.SEARCH_CACHE_PATH, settings.SEARCH_CACHE_SIZE
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Search cache storage unavailable, using memory: {e}")
+    return MemorySearchCacheStore(settings.SEARCH_CACHE_SIZE)
+
+
+search_cache = SearchCache(store=create_store(), ttl=settings.SEARCH_CACHE_TTL)
@@ -0,0 +1,58 @@
+# Совпадения навыков с терминами must/must_not фильтра
+import re
+
+from rapidfuzz import fuzz, process
+
+
+class TermMatcher:
+    """
+    Сопоставление названий навыков с набором терминов, строится один раз на поиск.
+
+    Точные совпадения - целые слова (\\bтермин\\b): одна скомпилированная
+    альтернатива отсекает названия без совпадений, для остальных считается,
+    сколько разных терминов найдено. Нечеткие - сумма partial_ratio по терминам,
+    все уникальные названия считаются одним вызовом rapidfuzz.process.cdist.
+    Результат запоминается по названию навыка.
+    """
+
+    def __init__(self, terms: list[str], fuzzy_threshold: float = 85):
+        self.terms = list(dict.fromkeys(term for term in terms if term))
+        self.fuzzy_threshold = fuzzy_threshold
+        self._patterns = [re.compile(rf"\b{re.escape(term)}\b") for term in self.terms]
+        # Длинные термины первыми, чтобы альтернатива не останавливалась на префиксе
+        alternation = "|".join(
+            re.escape(term) for term in sorted(self.terms, key=len, reverse=True)
+        )
+        self._any = re.compile(rf"\b(?:{alternation})\b") if self.terms else None
+        self._cache: dict[str, tuple[int, bool]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.terms)
+
+    def match_many(self, names: list[str]) -> dict[str, tuple[int, bool]]:
+        """
+        Для каждого названия: (число найденных терминов, есть ли совпадение).
+
+        Совпадение - точное вхождение хотя бы одного термина
+        или сумма нечетких оценок выше fuzzy_threshold.
+        """
+        new_names = [name for name in dict.fromkeys(names) if name not in self._cache]
+        if new_names and self.terms:
+            fuzzy_scores = process.cdist(
+                new_names, self.terms, scorer=fuzz.partial_ratio
+            ).sum(axis=1)
+            for name, fuzzy_score in zip(new_names, fuzzy_scores):
+                matches = self._count_exact(name)
+                self._cache[name] = (
+                    matches,
+                    bool(matches) or float(fuzzy_score) > self.fuzzy_threshold,
+                )
+        elif new_names:
+            self._cache.update((name, (0, False)) for name in new_names)
+
+        return {name: self._cache[name] for name in names}
+
+    def _count_exact(self, name: str) -> int:
+        if self._any is None or self._any.search(name) is None:
+            return 0
+        return sum(pattern.search(name) is not None for pattern in self._patterns)
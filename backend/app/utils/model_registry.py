@@ -0,0 +1,100 @@
+# Реестр моделей векторизации с ленивой загрузкой
+import hashlib
+import logging
+import threading
+import time
+from typing import Any
+
+import numpy as np
+from numpy import ndarray
+
+logger = logging.getLogger(__name__)
+
+
+class StubEncoder:
+    """
+    Легковесный детерминированный энкодер для тестов.
+
+    Повторяет интерфейс SentenceTransformer.encode: одинаковый текст
+    дает одинаковый нормированный вектор нужной размерности.
+    """
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences: list[str] | str, **kwargs) -> ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if isinstance(sentences, str) else sentences
+
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8])
+            vector = np.random.default_rng(seed).standard_normal(self.dimension)
+            vectors[i] = vector / np.linalg.norm(vector)
+
+        return vectors[0] if single else vectors
+
+
+class ModelRegistry:
+    """
+    Общий реестр энкодеров.
+
+    Модель загружается при первом обращении (или в warm_up),
+    время загрузки сохраняется в load_times.
+    """
+
+    def __init__(self, use_stub: bool = False):
+        self.use_stub = use_stub
+        self.load_times: dict[str, float] = {}
+        self._dimensions: dict[str, int] = {}
+        self._models: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, dimension: int):
+        """Зарегистрировать модель без загрузки"""
+        self._dimensions[name] = dimension
+
+    def dimension(self, name: str) -> int:
+        """Размерность векторов модели"""
+        return self._dimensions[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str) -> Any:
+        """Получить модель, загрузив ее при первом обращении"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+            return self._models[name]
+
+    def warm_up(self, names: list[str] | None = None):
+        """Заранее загрузить модели (например, при старте приложения)"""
+        for name in names or list(self._dimensions):
+            self.get(name)
+
+    def _load(self, name: str) -> Any:
+        if name not in self._dimensions:
+            raise KeyError(f"Model {name} is not registered")
+
+        start = time.perf_counter()
+        if self.use_stub:
+            model: Any = StubEncoder(self._dimensions[name])
+        else:
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(name)
+
+        self.load_times[name] = time.perf_counter() - start
+        logger.info(
+            f"Модель {name} загружена за {self.load_times[name]:.2f} c"
+            f"{' (stub)' if self.use_stub else ''}"
+        )
+        return model
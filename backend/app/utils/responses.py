@@ -0,0 +1,37 @@
+# Быстрый JSON-ответ на orjson для всего приложения
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    """Типы, которые orjson не сериализует сам"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    JSON в bytes: dataclass, dict, datetime, numpy - нативно в orjson,
+    pydantic-модели - через model_dump без jsonable_encoder
+    """
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Ответ по умолчанию для всех маршрутов.
+
+    Если маршрут возвращает данные, FastAPI валидирует их по response_model
+    и прогоняет через jsonable_encoder, этот класс только ускоряет рендер.
+    Горячие маршруты возвращают FastJSONResponse сами - тогда jsonable_encoder
+    не вызывается вовсе, а response_model остается только для схемы OpenAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,35 @@
+"""Unique match per resume and vacancy
+
+Revision ID: 9c1d2e7f4a10
+Revises: e181e9a37a34
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c1d2e7f4a10"
+down_revision: Union[str, Sequence[str], None] = "e181e9a37a34"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Оставляем только последний матч для каждой пары резюме + вакансия
+    op.execute(
+        "DELETE FROM matches WHERE id NOT IN "
+        "(SELECT MAX(id) FROM matches GROUP BY resume_id, vacancy_id)"
+    )
+    op.create_unique_constraint(
+        "uq_matches_resume_vacancy", "matches", ["resume_id", "vacancy_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("uq_matches_resume_vacancy", "matches", type_="unique")
@@ -0,0 +1,34 @@
+"""Match score indexes for keyset listing
+
+Revision ID: c4a8d1e6b203
+Revises: b7e3f0c2d915
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a8d1e6b203"
+down_revision: Union[str, Sequence[str], None] = "b7e3f0c2d915"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_matches_resume_id_score", "matches", ["resume_id", "score"], unique=False
+    )
+    op.create_index(
+        "ix_matches_vacancy_id_score", "matches", ["vacancy_id", "score"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_matches_vacancy_id_score", table_name="matches")
+    op.drop_index("ix_matches_resume_id_score", table_name="matches")
@@ -0,0 +1,39 @@
+"""Indexes on foreign keys of hot lookups
+
+Revision ID: d2f7a9c3e418
+Revises: c4a8d1e6b203
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2f7a9c3e418"
+down_revision: Union[str, Sequence[str], None] = "c4a8d1e6b203"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# candidates.user_id / employers.user_id уже уникальны,
+# matches покрыт uq_matches_resume_vacancy и индексами (resume_id|vacancy_id, score)
+FOREIGN_KEY_INDEXES = [
+    ("resumes", "candidate_id"),
+    ("resume_skills", "resume_id"),
+    ("vacancies", "employer_id"),
+    ("vacancy_skills", "vacancy_id"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in FOREIGN_KEY_INDEXES:
+        op.create_index(op.f(f"ix_{table}_{column}"), table, [column], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in reversed(FOREIGN_KEY_INDEXES):
+        op.drop_index(op.f(f"ix_{table}_{column}"), table_name=table)